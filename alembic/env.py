@@ -5,6 +5,7 @@ from logging.config import fileConfig
 from sqlalchemy.ext.asyncio import create_async_engine
 from alembic import context
 from app.models.user_model import Base
+from app.models.email_outbox_model import EmailOutbox  # noqa: F401  registers the table on Base.metadata
 from dotenv import load_dotenv
 
 # Load environment variables
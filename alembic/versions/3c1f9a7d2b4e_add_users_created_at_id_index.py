@@ -0,0 +1,26 @@
+"""Add (created_at, id) index to users for keyset pagination
+
+Revision ID: 3c1f9a7d2b4e
+Revises: 98a6e9435540
+Create Date: 2026-10-18 10:50:12.418305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c1f9a7d2b4e'
+down_revision: Union[str, None] = '98a6e9435540'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_users_created_at_id', 'users', ['created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_created_at_id', table_name='users')
@@ -0,0 +1,41 @@
+"""Add indexes backing the filtered and sorted user listing
+
+Revision ID: 7b4d2e9a1c36
+Revises: 5e2a8c4f1d90
+Create Date: 2026-10-18 14:05:37.912046
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b4d2e9a1c36'
+down_revision: Union[str, None] = '5e2a8c4f1d90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_users_role_created_at_id', 'users', ['role', 'created_at', 'id'], unique=False)
+    op.create_index('ix_users_locked_created_at_id', 'users', ['created_at', 'id'], unique=False,
+                    postgresql_where=sa.text('is_locked'))
+    op.create_index('ix_users_unverified_created_at_id', 'users', ['created_at', 'id'], unique=False,
+                    postgresql_where=sa.text('NOT email_verified'))
+    op.create_index('ix_users_professional_created_at_id', 'users', ['created_at', 'id'], unique=False,
+                    postgresql_where=sa.text('is_professional'))
+    op.create_index('ix_users_email_lower_prefix', 'users', [sa.func.lower(sa.column('email')).label('email_lower')],
+                    unique=False, postgresql_ops={'email_lower': 'text_pattern_ops'})
+    op.create_index('ix_users_nickname_lower_prefix', 'users', [sa.func.lower(sa.column('nickname')).label('nickname_lower')],
+                    unique=False, postgresql_ops={'nickname_lower': 'text_pattern_ops'})
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_nickname_lower_prefix', table_name='users')
+    op.drop_index('ix_users_email_lower_prefix', table_name='users')
+    op.drop_index('ix_users_professional_created_at_id', table_name='users')
+    op.drop_index('ix_users_unverified_created_at_id', table_name='users')
+    op.drop_index('ix_users_locked_created_at_id', table_name='users')
+    op.drop_index('ix_users_role_created_at_id', table_name='users')
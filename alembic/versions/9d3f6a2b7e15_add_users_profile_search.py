@@ -0,0 +1,66 @@
+"""Add full-text and trigram search over user profiles
+
+Revision ID: 9d3f6a2b7e15
+Revises: 7b4d2e9a1c36
+Create Date: 2026-10-18 15:21:09.406733
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d3f6a2b7e15'
+down_revision: Union[str, None] = '7b4d2e9a1c36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_DOCUMENT = """
+    setweight(to_tsvector('simple', coalesce({row}nickname, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce({row}first_name, '') || ' ' || coalesce({row}last_name, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce({row}bio, '')), 'B')
+"""
+
+
+def trigram_available() -> bool:
+    """pg_trgm ships with Postgres contrib, which not every server has installed."""
+    if context.is_offline_mode():
+        return True
+    query = sa.text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+    return op.get_bind().execute(query).first() is not None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION users_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector := {SEARCH_DOCUMENT.format(row='NEW.')};
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER users_search_vector_trigger
+        BEFORE INSERT OR UPDATE OF nickname, first_name, last_name, bio ON users
+        FOR EACH ROW EXECUTE FUNCTION users_search_vector_update()
+    """)
+    op.execute(f"UPDATE users SET search_vector = {SEARCH_DOCUMENT.format(row='')}")
+    op.create_index('ix_users_search_vector', 'users', ['search_vector'], unique=False, postgresql_using='gin')
+    if trigram_available():
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.create_index('ix_users_nickname_trgm', 'users', ['nickname'], unique=False, postgresql_using='gin',
+                        postgresql_ops={'nickname': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    # Without pg_trgm the upgrade did not create this index. The extension is left installed:
+    # it may have predated this revision, and other objects can depend on it.
+    op.drop_index('ix_users_nickname_trgm', table_name='users', if_exists=True)
+    op.drop_index('ix_users_search_vector', table_name='users')
+    op.execute('DROP TRIGGER IF EXISTS users_search_vector_trigger ON users')
+    op.execute('DROP FUNCTION IF EXISTS users_search_vector_update()')
+    op.drop_column('users', 'search_vector')
@@ -0,0 +1,101 @@
+from typing import Optional
+from app.database import Database
+from app.services.email_outbox import EmailOutboxWorker
+from app.services.email_service import EmailService
+from app.services.jwt_service import TokenCache, get_token_cache
+from app.services.login_activity import LoginActivityBuffer, set_login_activity_buffer
+from app.utils.security import PasswordHashingPool, get_hashing_pool, shutdown_hashing_pool
+from app.utils.smtp_connection import SMTPClient, close_smtp_pools
+from app.utils.template_manager import TemplateManager
+from app.utils.user_cache import UserCache, close_user_cache, get_user_cache
+from settings.config import Settings, settings as default_settings
+
+class ServiceContainer:
+    """
+    Application-lifetime services, built once and shared by every request.
+
+    Holds the settings snapshot, the email service with its compiled-template cache
+    and pooled SMTP client, the user and token caches, and the background workers (email outbox,
+    login write-behind). ``start`` opens the database engine and starts the workers;
+    ``stop`` shuts all of them down again, writing out buffered logins first.
+    """
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.template_manager = TemplateManager()
+        self.smtp_client = SMTPClient.from_settings(settings)
+        self.email_service = EmailService(self.template_manager, smtp_client=self.smtp_client)
+        self.email_outbox_worker: Optional[EmailOutboxWorker] = None
+        self.login_activity: Optional[LoginActivityBuffer] = None
+        self.started = False
+
+    @property
+    def hashing_pool(self) -> PasswordHashingPool:
+        return get_hashing_pool()
+
+    @property
+    def user_cache(self) -> Optional[UserCache]:
+        return get_user_cache()
+
+    @property
+    def token_cache(self) -> TokenCache:
+        return get_token_cache()
+
+    async def start(self):
+        settings = self.settings
+        Database.initialize_from_settings(settings)
+        if settings.email_outbox_enabled:
+            self.email_outbox_worker = EmailOutboxWorker(
+                Database.get_session_factory(),
+                self.smtp_client,
+                batch_size=settings.email_outbox_batch_size,
+                poll_interval=settings.email_outbox_poll_interval,
+                max_attempts=settings.email_outbox_max_attempts,
+                backoff_base=settings.email_outbox_backoff_base,
+                claim_timeout=settings.email_outbox_claim_timeout,
+            )
+            self.email_outbox_worker.start()
+        if settings.login_write_behind_enabled:
+            self.login_activity = LoginActivityBuffer(
+                Database.get_session_factory(),
+                flush_interval=settings.login_write_behind_interval_ms / 1000,
+                max_entries=settings.login_write_behind_max_entries,
+            )
+            self.login_activity.start()
+            set_login_activity_buffer(self.login_activity)
+        self.started = True
+
+    async def stop(self):
+        if self.email_outbox_worker is not None:
+            await self.email_outbox_worker.stop()
+            self.email_outbox_worker = None
+        if self.login_activity is not None:
+            set_login_activity_buffer(None)
+            await self.login_activity.stop()
+            self.login_activity = None
+        close_smtp_pools()
+        shutdown_hashing_pool()
+        await close_user_cache()
+        await Database.dispose()
+        self.started = False
+
+_container: Optional[ServiceContainer] = None
+
+def get_container() -> ServiceContainer:
+    """Return the process-wide container, creating it on first use (e.g. outside the app lifespan)."""
+    global _container
+    if _container is None:
+        _container = ServiceContainer(default_settings)
+    return _container
+
+async def start_container() -> ServiceContainer:
+    container = get_container()
+    if not container.started:
+        await container.start()
+    return container
+
+async def stop_container():
+    global _container
+    if _container is not None:
+        await _container.stop()
+        _container = None
@@ -1,25 +1,265 @@
+from builtins import OSError, ValueError, bool, dict, enumerate, float, int, len, list, max, range, round, str
+from contextvars import ContextVar
+import itertools
+import time
+from typing import Iterable, Optional
+from uuid import uuid4
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 Base = declarative_base()
 
+def on_commit(session: AsyncSession, callback):
+    """Run ``callback`` (an async function of no arguments) once ``session`` next commits."""
+    session.info.setdefault("after_commit", []).append(callback)
+
+async def run_after_commit(session: AsyncSession):
+    """Run and clear the callbacks registered with :func:`on_commit`; call right after a commit."""
+    for callback in session.info.pop("after_commit", []):
+        await callback()
+
+def discard_after_commit(session: AsyncSession):
+    """Drop pending :func:`on_commit` callbacks, e.g. after a rollback."""
+    session.info.pop("after_commit", None)
+
+# Seconds the current checkout spent opening new connections, kept per task.
+_connecting_time: ContextVar[float] = ContextVar("connecting_time", default=0.0)
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that records checkouts, timeouts and how long each checkout waited.
+
+    Only successful checkouts are counted, and their wait excludes the time spent
+    opening a new connection, so the figures reflect contention for the pool alone.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _create_connection(self):
+        started = time.perf_counter()
+        try:
+            return super()._create_connection()
+        finally:
+            _connecting_time.set(_connecting_time.get() + time.perf_counter() - started)
+
+    def _do_get(self):
+        connecting = _connecting_time.set(0.0)
+        started = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started - _connecting_time.get()
+            _connecting_time.reset(connecting)
+        self.checkouts += 1
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
+        return record
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size(),
+            "max_overflow": self._max_overflow,
+            "checked_in": self.checkedin(),
+            "checked_out": self.checkedout(),
+            "overflow": self.overflow(),
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_avg_ms": round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            "wait_max_ms": round(self.wait_max * 1000, 3),
+        }
+
 class Database:
-    """Handles database connections and sessions."""
+    """
+    Handles database connections and sessions.
+
+    Besides the primary engine it can hold engines for streaming replicas. Read-only
+    sessions are spread over the replicas round-robin; a replica that fails to connect
+    is skipped for ``replica_retry_after`` seconds, and with no healthy replica reads
+    fall back to the primary. Callers that just wrote are kept on the primary for
+    ``read_your_writes_window`` seconds so they never read behind their own change.
+    """
     _engine = None
     _session_factory = None
+    _replica_engines = []
+    _replica_session_factories = []
+    _replica_down_until = {}
+    _replica_counter = itertools.count()
+    _replica_retry_after = 30.0
+    _read_your_writes_window = 5.0
+    _recent_writes = {}
+
+    @classmethod
+    def _create_engine(cls, database_url: str, echo: bool, pool_size: int, max_overflow: int, pool_timeout: float,
+                       pool_recycle: int, pool_pre_ping: bool, statement_cache_size: int, statement_timeout_ms: int):
+        connect_args = {}
+        if make_url(database_url).get_driver_name() == "asyncpg":
+            connect_args["prepared_statement_cache_size"] = statement_cache_size
+            if not statement_cache_size:
+                # Behind pgbouncer in transaction mode: no statement cache in asyncpg either, and
+                # unique statement names so a server connection shared by clients never clashes.
+                connect_args["statement_cache_size"] = 0
+                connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid4()}__"
+            if statement_timeout_ms:
+                connect_args["server_settings"] = {"statement_timeout": str(statement_timeout_ms)}
+        engine = create_async_engine(
+            database_url,
+            echo=echo,
+            future=True,
+            poolclass=InstrumentedQueuePool,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+            pool_recycle=pool_recycle,
+            pool_pre_ping=pool_pre_ping,
+            connect_args=connect_args,
+        )
+        session_factory = sessionmaker(
+            bind=engine, class_=AsyncSession, expire_on_commit=False, future=True
+        )
+        return engine, session_factory
 
     @classmethod
-    def initialize(cls, database_url: str, echo: bool = False):
-        """Initialize the async engine and sessionmaker."""
+    def initialize(cls, database_url: str, echo: bool = False, pool_size: int = 5, max_overflow: int = 10,
+                   pool_timeout: float = 30.0, pool_recycle: int = 1800, pool_pre_ping: bool = False,
+                   statement_cache_size: int = 100, statement_timeout_ms: int = 0,
+                   replica_urls: Iterable[str] = (), replica_retry_after: float = 30.0,
+                   read_your_writes_window: float = 5.0):
+        """
+        Initialize the async engines and sessionmakers.
+
+        ``statement_cache_size`` sizes the per-connection prepared statement caches; 0
+        disables both SQLAlchemy's and asyncpg's and gives every prepared statement a
+        unique name, as needed behind pgbouncer in transaction mode. A non-zero
+        ``statement_timeout_ms`` is set as the server-side ``statement_timeout``. Each of
+        ``replica_urls`` gets its own engine with the same pool options.
+        """
         if cls._engine is None:  # Ensure engine is created once
-            cls._engine = create_async_engine(database_url, echo=echo, future=True)
-            cls._session_factory = sessionmaker(
-                bind=cls._engine, class_=AsyncSession, expire_on_commit=False, future=True
+            options = dict(
+                echo=echo, pool_size=pool_size, max_overflow=max_overflow, pool_timeout=pool_timeout,
+                pool_recycle=pool_recycle, pool_pre_ping=pool_pre_ping,
+                statement_cache_size=statement_cache_size, statement_timeout_ms=statement_timeout_ms,
             )
+            cls._engine, cls._session_factory = cls._create_engine(database_url, **options)
+            replicas = [cls._create_engine(url, **options) for url in replica_urls]
+            cls._replica_engines = [engine for engine, _ in replicas]
+            cls._replica_session_factories = [factory for _, factory in replicas]
+            cls._replica_down_until = {}
+            cls._replica_retry_after = replica_retry_after
+            cls._read_your_writes_window = read_your_writes_window
+            cls._recent_writes = {}
+
+    @classmethod
+    def initialize_from_settings(cls, settings):
+        """Initialize with the pool, driver and replica options from Settings."""
+        cls.initialize(
+            settings.database_url,
+            settings.debug,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+            pool_recycle=settings.db_pool_recycle,
+            pool_pre_ping=settings.db_pool_pre_ping,
+            statement_cache_size=settings.db_statement_cache_size,
+            statement_timeout_ms=settings.db_statement_timeout_ms,
+            replica_urls=[url.strip() for url in settings.database_replica_urls.split(",") if url.strip()],
+            replica_retry_after=settings.db_replica_retry_after,
+            read_your_writes_window=settings.db_read_your_writes_window,
+        )
 
     @classmethod
-    def get_session_factory(cls):
-        """Returns the session factory, ensuring it's initialized."""
+    def pool_stats(cls) -> dict:
+        """Current pool occupancy and checkout wait times, with one entry per replica."""
+        if cls._engine is None:
+            raise ValueError("Database not initialized. Call `initialize()` first.")
+        stats = cls._engine.pool.stats()
+        if cls._replica_engines:
+            now = time.monotonic()
+            stats["replicas"] = [
+                dict(engine.pool.stats(), healthy=cls._replica_down_until.get(index, 0) <= now)
+                for index, engine in enumerate(cls._replica_engines)
+            ]
+        return stats
+
+    @classmethod
+    async def dispose(cls):
+        """Close every engine's pooled connections and forget them; ``initialize`` can be called again."""
+        if cls._engine is not None:
+            for engine in cls._replica_engines:
+                await engine.dispose()
+            await cls._engine.dispose()
+            cls._engine = None
+            cls._session_factory = None
+            cls._replica_engines = []
+            cls._replica_session_factories = []
+
+    @classmethod
+    def get_session_factory(cls, read_only: bool = False):
+        """
+        Returns the session factory, ensuring it's initialized. With ``read_only`` it is
+        the next healthy replica's factory, or the primary's when there is none.
+        """
+        if cls._session_factory is None:
+            raise ValueError("Database not initialized. Call `initialize()` first.")
+        healthy = cls._healthy_replicas() if read_only else []
+        return cls._replica_session_factories[healthy[0]] if healthy else cls._session_factory
+
+    @classmethod
+    def _healthy_replicas(cls) -> list:
+        count = len(cls._replica_session_factories)
+        if not count:
+            return []
+        start = next(cls._replica_counter) % count
+        now = time.monotonic()
+        order = [(start + offset) % count for offset in range(count)]
+        return [index for index in order if cls._replica_down_until.get(index, 0) <= now]
+
+    @classmethod
+    def mark_replica_down(cls, index: int):
+        cls._replica_down_until[index] = time.monotonic() + cls._replica_retry_after
+
+    @classmethod
+    async def open_read_session(cls) -> AsyncSession:
+        """
+        Open a session for reads on the next healthy replica, checking out its connection
+        up front so a replica that is down is marked and the next one tried. Falls back
+        to a primary session. Replica sessions have ``info["replica"]`` set.
+        """
         if cls._session_factory is None:
             raise ValueError("Database not initialized. Call `initialize()` first.")
-        return cls._session_factory
+        for index in cls._healthy_replicas():
+            session = cls._replica_session_factories[index]()
+            try:
+                await session.connection()
+            except (exc.SQLAlchemyError, OSError):
+                await session.close()
+                cls.mark_replica_down(index)
+                continue
+            session.info["replica"] = True
+            return session
+        return cls._session_factory()
+
+    @classmethod
+    def note_write(cls, caller: str):
+        """Keep ``caller``'s reads on the primary for the read-your-writes window."""
+        if not cls._replica_engines or not caller:
+            return
+        now = time.monotonic()
+        if len(cls._recent_writes) > 10000:
+            cls._recent_writes = {key: until for key, until in cls._recent_writes.items() if until > now}
+        cls._recent_writes[caller] = now + cls._read_your_writes_window
+
+    @classmethod
+    def wrote_recently(cls, caller: Optional[str]) -> bool:
+        until = cls._recent_writes.get(caller) if caller else None
+        return until is not None and until > time.monotonic()
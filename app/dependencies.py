@@ -1,31 +1,80 @@
-from builtins import Exception, dict, str
-from fastapi import Depends, HTTPException
+from builtins import Exception, ValueError, dict, enumerate, frozenset, getattr, int, isinstance, sorted, str
+from fastapi import Depends, HTTPException, Request
+from fastapi.routing import APIRoute
 from fastapi.security import OAuth2PasswordBearer
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Union
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.database import Database
-from app.utils.template_manager import TemplateManager
+from app.container import get_container
+from app.database import Database, discard_after_commit, run_after_commit
+from app.models.user_model import UserRole
 from app.services.email_service import EmailService
 from app.services.jwt_service import decode_token
-from settings.config import Settings
+from app.utils.security import PasswordHashingBusyError
+from settings.config import Settings, settings
 from fastapi import Depends
 
 def get_settings() -> Settings:
-    """Return application settings."""
-    return Settings()
+    """Return the application settings snapshot, parsed once at import."""
+    return settings
 
 def get_email_service() -> EmailService:
-    template_manager = TemplateManager()
-    return EmailService(template_manager=template_manager)
+    """Return the shared email service owned by the service container."""
+    return get_container().email_service
 
-async def get_db() -> AsyncSession:
-    """Dependency that provides a database session for each request."""
-    async_session_factory = Database.get_session_factory()
-    async with async_session_factory() as session:
+READ_ONLY_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+def _caller(request: Request) -> Optional[str]:
+    """Identifies the caller for read-your-writes: its bearer token, else its address."""
+    return request.headers.get("authorization") or (request.client.host if request.client else None)
+
+def get_session_factory(request: Request):
+    """Session factory for work that outlives the request's get_db session, such as streamed responses."""
+    read_only = request.method in READ_ONLY_METHODS and not Database.wrote_recently(_caller(request))
+    return Database.get_session_factory(read_only=read_only)
+
+@asynccontextmanager
+async def _unit_of_work(request: Request, read_only: bool):
+    if read_only and not Database.wrote_recently(_caller(request)):
+        session = await Database.open_read_session()
+    else:
+        session = Database.get_session_factory()()
+    async with session:
+        session.info["unit_of_work"] = True
         try:
             yield session
+            if not read_only:
+                if session.in_transaction():
+                    await session.commit()
+                await run_after_commit(session)
+                Database.note_write(_caller(request))
+        except (HTTPException, PasswordHashingBusyError):
+            # PasswordHashingBusyError reaches the app's handler, which answers 503 with Retry-After.
+            await session.rollback()
+            discard_after_commit(session)
+            raise
         except Exception as e:
+            await session.rollback()
+            discard_after_commit(session)
             raise HTTPException(status_code=500, detail=str(e))
-        
+
+async def get_db(request: Request) -> AsyncSession:
+    """
+    Dependency that provides a database session for each request.
+
+    The session is a unit of work: services flush instead of committing, and the
+    transaction is committed once when a mutating request finishes. Read-only
+    requests never commit; their transaction is closed with the session, and they
+    read from a replica unless the caller wrote within the read-your-writes window.
+    """
+    async with _unit_of_work(request, read_only=request.method in READ_ONLY_METHODS) as session:
+        yield session
+
+async def get_primary_db(request: Request) -> AsyncSession:
+    """Like get_db, but always on the primary and committed: for GET routes that write, such as email verification."""
+    async with _unit_of_work(request, read_only=False) as session:
+        yield session
+
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
 
@@ -44,9 +93,67 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
         raise credentials_exception
     return {"user_id": user_id, "role": user_role}
 
-def require_role(role: str):
+# Each role is one bit, so a route's permitted roles compile to a single mask.
+ROLE_FLAGS = {role.value: 1 << bit for bit, role in enumerate(UserRole)}
+
+def role_mask(roles: Union[str, UserRole, Iterable[Union[str, UserRole]]]) -> int:
+    """Bitmask of ``roles``; an unknown role name is a declaration error, raised at import."""
+    if isinstance(roles, (str, UserRole)):
+        roles = [roles]
+    mask = 0
+    for role in roles:
+        name = role.value if isinstance(role, UserRole) else role
+        if name not in ROLE_FLAGS:
+            raise ValueError(f"Unknown role {name!r}")
+        mask |= ROLE_FLAGS[name]
+    return mask
+
+def _compile_role_checker(mask: int):
+    # The per-request check is one dict lookup and an AND against the route's mask; a role
+    # missing from ROLE_FLAGS maps to 0 and is never admitted.
     def role_checker(current_user: dict = Depends(get_current_user)):
-        if current_user["role"] not in role:
+        if not ROLE_FLAGS.get(current_user["role"], 0) & mask:
             raise HTTPException(status_code=403, detail="Operation not permitted")
         return current_user
+
+    role_checker.mask = mask
     return role_checker
+
+_role_checkers: Dict[int, Callable] = {}
+
+def require_role(role: Union[str, UserRole, Iterable[Union[str, UserRole]]]) -> Callable:
+    """
+    Dependency requiring one of ``role`` (a role name or a list of them). The permission
+    set is resolved once, when the route is declared, and routes with the same set share
+    one checker.
+    """
+    mask = role_mask(role)
+    checker = _role_checkers.get(mask)
+    if checker is None:
+        checker = _role_checkers[mask] = _compile_role_checker(mask)
+    return checker
+
+def _route_checkers(dependant) -> List[Callable]:
+    found = [dependant.call] if _role_checkers.get(getattr(dependant.call, "mask", None)) is dependant.call else []
+    for sub in dependant.dependencies:
+        found.extend(_route_checkers(sub))
+    return found
+
+def route_permissions(app) -> List[dict]:
+    """
+    Audit table of every API route and the roles it admits: ``roles`` is None for routes
+    without a role check, and the intersection when several checks apply.
+    """
+    table = []
+    for route in app.routes:
+        if not isinstance(route, APIRoute):
+            continue
+        checkers = _route_checkers(route.dependant)
+        roles = None
+        if checkers:
+            mask = ~0
+            for checker in checkers:
+                mask &= checker.mask
+            roles = [name for name, flag in ROLE_FLAGS.items() if flag & mask]
+        table.append({"path": route.path, "methods": sorted(route.methods), "name": route.name, "roles": roles})
+    return table
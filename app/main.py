@@ -1,12 +1,12 @@
 from fastapi import FastAPI, Request
 from starlette.responses import JSONResponse
-from starlette.status import HTTP_500_INTERNAL_SERVER_ERROR
+from starlette.status import HTTP_500_INTERNAL_SERVER_ERROR, HTTP_503_SERVICE_UNAVAILABLE
 import logging
 
-from app.database import Database
-from app.dependencies import get_settings
-from app.routers import user_routes  # Make sure this includes /auth/login
+from app.container import start_container, stop_container
+from app.routers import admin_routes, user_routes  # Make sure this includes /auth/login
 from app.utils.api_description import getDescription
+from app.utils.security import PasswordHashingBusyError
 
 # Initialize logger
 logger = logging.getLogger(__name__)
@@ -25,8 +25,19 @@ app = FastAPI(
 
 @app.on_event("startup")
 async def startup_event():
-    settings = get_settings()
-    Database.initialize(settings.database_url, settings.debug)
+    app.state.container = await start_container()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await stop_container()
+
+@app.exception_handler(PasswordHashingBusyError)
+async def hashing_busy_handler(request: Request, exc: PasswordHashingBusyError):
+    return JSONResponse(
+        status_code=HTTP_503_SERVICE_UNAVAILABLE,
+        content={"message": "Server is busy, please retry shortly."},
+        headers={"Retry-After": "1"}
+    )
 
 @app.exception_handler(Exception)
 async def exception_handler(request: Request, exc: Exception):
@@ -38,3 +49,4 @@ async def exception_handler(request: Request, exc: Exception):
 
 # Ensure all routers including /auth/login are registered
 app.include_router(user_routes.router)
+app.include_router(admin_routes.router)
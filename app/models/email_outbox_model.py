@@ -0,0 +1,43 @@
+from builtins import int, str
+from datetime import datetime
+import uuid
+from sqlalchemy import Column, String, Integer, DateTime, Index, Text, func
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+
+class EmailOutbox(Base):
+    """
+    A queued email, written in the same transaction as the change that triggered it and
+    delivered later by EmailOutboxWorker.
+
+    Attributes:
+        id (UUID): Unique identifier for the message.
+        recipient (str): Address the message is sent to.
+        subject (str): Subject line.
+        body (str): Rendered HTML body.
+        status (str): 'pending', 'sending' (claimed by a worker), 'sent' or 'failed'.
+        attempts (int): Delivery attempts made so far.
+        next_attempt_at (datetime): Earliest time the worker may try again, or when its claim expires.
+        last_error (str): Error from the last failed attempt.
+        created_at (datetime): When the message was queued.
+        sent_at (datetime): When the message was delivered.
+    """
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        Index("ix_email_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    recipient: Mapped[str] = Column(String(255), nullable=False)
+    subject: Mapped[str] = Column(String(255), nullable=False)
+    body: Mapped[str] = Column(Text, nullable=False)
+    status: Mapped[str] = Column(String(20), nullable=False, default="pending")
+    attempts: Mapped[int] = Column(Integer, nullable=False, default=0)
+    next_attempt_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    last_error: Mapped[str] = Column(Text, nullable=True)
+    created_at: Mapped[datetime] = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self) -> str:
+        return f"<EmailOutbox {self.recipient}, Status: {self.status}>"
@@ -3,10 +3,10 @@ from datetime import datetime
 from enum import Enum
 import uuid
 from sqlalchemy import (
-    Column, String, Integer, DateTime, Boolean, func, Enum as SQLAlchemyEnum
+    DDL, Column, String, Integer, DateTime, Boolean, Index, Text, event, func, text, Enum as SQLAlchemyEnum
 )
-from sqlalchemy.dialects.postgresql import UUID, ENUM
-from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.dialects.postgresql import TSVECTOR, UUID, ENUM
+from sqlalchemy.orm import Mapped, deferred, mapped_column
 from app.database import Base
 
 class UserRole(Enum):
@@ -42,6 +42,7 @@ class User(Base):
         is_locked (bool): Flag indicating if the account is locked.
         created_at (datetime): Timestamp when the user was created, set by the server.
         updated_at (datetime): Timestamp of the last update, set by the server.
+        search_vector (tsvector): Full-text document over nickname, names and bio, kept current by a trigger.
 
     Methods:
         lock_account(): Locks the user account.
@@ -52,6 +53,17 @@ class User(Base):
     """
     __tablename__ = "users"
     __mapper_args__ = {"eager_defaults": True}
+    __table_args__ = (
+        Index("ix_users_created_at_id", "created_at", "id"),
+        # Filtered listings (see UserService.list_users): role is a leading column, the rare
+        # states get partial indexes, and prefix search matches lower(...) LIKE 'x%' (the
+        # lower-prefix indexes follow the class, as they are built from its columns).
+        Index("ix_users_role_created_at_id", "role", "created_at", "id"),
+        Index("ix_users_locked_created_at_id", "created_at", "id", postgresql_where=text("is_locked")),
+        Index("ix_users_unverified_created_at_id", "created_at", "id", postgresql_where=text("NOT email_verified")),
+        Index("ix_users_professional_created_at_id", "created_at", "id", postgresql_where=text("is_professional")),
+        Index("ix_users_search_vector", "search_vector", postgresql_using="gin"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     nickname: Mapped[str] = Column(String(50), unique=True, nullable=False, index=True)
@@ -74,6 +86,8 @@ class User(Base):
     verification_token = Column(String, nullable=True)
     email_verified: Mapped[bool] = Column(Boolean, default=False, nullable=False)
     hashed_password: Mapped[str] = Column(String(255), nullable=False)
+    # Maintained by the users_search_vector_update trigger; never loaded with the entity.
+    search_vector = deferred(Column(TSVECTOR().with_variant(Text(), "sqlite"), nullable=True))
 
     def __repr__(self) -> str:
         """Provides a readable representation of a user object."""
@@ -95,3 +109,44 @@ class User(Base):
         """Updates the professional status and logs the update time."""
         self.is_professional = status
         self.professional_status_updated_at = func.now()
+
+
+# Profile search (see UserService.search_profiles). The same objects are created by the
+# 9d3f6a2b7e15 migration; these listeners cover databases built with create_all.
+SEARCH_VECTOR_FUNCTION = DDL("""
+CREATE OR REPLACE FUNCTION users_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('simple', coalesce(NEW.nickname, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(NEW.first_name, '') || ' ' || coalesce(NEW.last_name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(NEW.bio, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql
+""")
+
+SEARCH_VECTOR_TRIGGER = DDL("""
+CREATE TRIGGER users_search_vector_trigger
+BEFORE INSERT OR UPDATE OF nickname, first_name, last_name, bio ON users
+FOR EACH ROW EXECUTE FUNCTION users_search_vector_update()
+""")
+
+# text_pattern_ops lets Postgres serve LIKE 'x%' from the index under any collation; other
+# dialects get a plain index on the expression.
+Index("ix_users_email_lower_prefix", func.lower(User.email).label("email_lower"),
+      postgresql_ops={"email_lower": "text_pattern_ops"})
+Index("ix_users_nickname_lower_prefix", func.lower(User.nickname).label("nickname_lower"),
+      postgresql_ops={"nickname_lower": "text_pattern_ops"})
+
+def _trigram_available(ddl, target, bind, **kw) -> bool:
+    """pg_trgm ships with Postgres contrib, which not every server has installed."""
+    if bind.dialect.name != "postgresql":
+        return False
+    return bind.execute(text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")).first() is not None
+
+event.listen(User.__table__, "after_create", SEARCH_VECTOR_FUNCTION.execute_if(dialect="postgresql"))
+event.listen(User.__table__, "after_create", SEARCH_VECTOR_TRIGGER.execute_if(dialect="postgresql"))
+event.listen(User.__table__, "after_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(callable_=_trigram_available))
+event.listen(User.__table__, "after_create", DDL(
+    "CREATE INDEX ix_users_nickname_trgm ON users USING gin (nickname gin_trgm_ops)"
+).execute_if(callable_=_trigram_available))
@@ -0,0 +1,51 @@
+from builtins import ValueError, dict
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+
+from app.database import Database
+from app.dependencies import require_role, route_permissions
+from app.services.jwt_service import get_token_cache
+from app.utils.security import get_hashing_pool
+from app.utils.user_cache import get_user_cache
+
+router = APIRouter()
+
+@router.get("/admin/db-pool", tags=["Administration"])
+async def db_pool_stats(current_user: dict = Depends(require_role(["ADMIN"]))):
+    """
+    Database connection pool for this process: size and overflow limits, connections
+    checked in and out, total checkouts and timeouts, and average and worst checkout
+    wait. Use it to size db_pool_size and db_max_overflow against Postgres
+    max_connections when running several workers.
+    """
+    try:
+        return Database.pool_stats()
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Database not initialized")
+
+@router.get("/admin/hashing-pool", tags=["Administration"])
+async def hashing_pool_stats(current_user: dict = Depends(require_role(["ADMIN"]))):
+    """
+    Password hashing pool for this process: executor type, workers, queue limit, jobs in
+    flight and at peak, and jobs submitted, completed, failed and rejected. A rising
+    ``rejected`` count means logins are getting 503s; raise password_hash_max_queue or
+    password_hash_workers.
+    """
+    return get_hashing_pool().metrics()
+
+@router.get("/admin/user-cache", tags=["Administration"])
+async def user_cache_stats(current_user: dict = Depends(require_role(["ADMIN"]))):
+    """User cache backend, hits, misses, hit rate, sets and invalidations for this process."""
+    cache = get_user_cache()
+    if cache is None:
+        return {"backend": "none"}
+    return cache.stats()
+
+@router.get("/admin/token-cache", tags=["Administration"])
+async def token_cache_stats(current_user: dict = Depends(require_role(["ADMIN"]))):
+    """Decoded-token cache for this process: size, hits, misses, hit rate, expiries, evictions and revocations."""
+    return get_token_cache().stats()
+
+@router.get("/admin/route-permissions", tags=["Administration"])
+async def route_permissions_table(request: Request, current_user: dict = Depends(require_role(["ADMIN"]))):
+    """Every route with its methods and the roles it admits; ``roles`` is null for routes without a role check."""
+    return route_permissions(request.app)
@@ -1,36 +1,168 @@
-from builtins import dict, int, len, str
-from datetime import timedelta
+from builtins import ValueError, dict, getattr, int, isinstance, len, list, max, set, sorted, str, tuple
+from datetime import datetime, timedelta
+from functools import partial
+from typing import Optional, Tuple
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, Response, status, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status, Request
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.dependencies import get_current_user, get_db, get_email_service, require_role, get_settings
-from app.schemas.pagination_schema import EnhancedPagination
+from app.dependencies import get_current_user, get_db, get_email_service, get_primary_db, get_session_factory, require_role, get_settings
+from app.models.user_model import UserRole as UserRoleModel
+from app.schemas.pagination_schema import EnhancedPagination, PageCursor
 from app.schemas.token_schema import TokenResponse
-from app.schemas.user_schemas import LoginRequest, UserBase, UserCreate, UserListResponse, UserResponse, UserUpdate
-from app.services.user_service import UserService
+from app.schemas.user_schemas import BulkImportResponse, LoginRequest, UserBase, UserCreate, UserListResponse, UserResponse, UserRole, UserSearch, UserSearchResults, UserSortKey, UserUpdate, USER_LIST_ADAPTER, USER_RESPONSE_ADAPTER, USER_RESPONSE_FIELDS
+from app.services.user_service import LoginOutcome, UserConflictError, UserService
 from app.services.jwt_service import create_access_token
-from app.utils.link_generation import create_user_links, generate_pagination_links
+from app.utils.bulk_import import IMPORT_FORMATS, iter_records
+from app.utils.export import EXPORT_FORMATS, models_to_csv, models_to_ndjson
+from app.utils.json_response import FastJSONResponse
+from app.utils.link_generation import create_user_links, generate_pagination_links, generate_search_links, user_link_dicts
 from app.services.email_service import EmailService
 
 router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
 settings = get_settings()
 
-@router.get("/users/{user_id}", response_model=UserResponse, tags=["User Management Requires (Admin or Manager Roles)"])
-async def get_user(user_id: UUID, request: Request, db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme), current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))):
-    user = await UserService.get_by_id(db, user_id)
+def get_user_fields(
+    fields: Optional[str] = Query(None, max_length=500, description="Comma-separated UserResponse fields to return, e.g. id,nickname,email; all when omitted"),
+) -> Optional[Tuple[str, ...]]:
+    """Parses a sparse fieldset, in response order; unknown field names are a 400."""
+    if fields is None:
+        return None
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = sorted(requested - set(UserResponse.model_fields))
+    if not requested or unknown:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown fields: {', '.join(unknown) or fields!r}")
+    return tuple(name for name in UserResponse.model_fields if name in requested)
+
+# A sparse fieldset drops fields UserResponse requires, so the 200 bodies declare that variant too.
+SPARSE_USER_EXAMPLE = {"id": "3fa85f64-5717-4562-b3fc-2c963f66afa6", "nickname": "john_doe_123", "email": "john.doe@example.com"}
+USER_FIELDS_RESPONSES = {200: {
+    "description": "The user. With ``fields``, only the requested UserResponse fields are returned; ``links`` is included only when requested.",
+    "content": {"application/json": {"examples": {
+        "sparse": {"summary": "?fields=id,nickname,email", "value": SPARSE_USER_EXAMPLE},
+    }}},
+}}
+USER_LIST_FIELDS_RESPONSES = {200: {
+    "description": "A page of users. With ``fields``, each item carries only the requested UserResponse fields; the page envelope is unchanged.",
+    "content": {"application/json": {"examples": {
+        "sparse": {"summary": "?fields=id,nickname,email", "value": {
+            "items": [SPARSE_USER_EXAMPLE], "total": 1, "count_strategy": "exact", "page": 1, "size": 1, "links": [],
+        }},
+    }}},
+}}
+
+def _user_item(user, request: Request, fields: Optional[Tuple[str, ...]] = None) -> dict:
+    """
+    The UserResponse fields (all, or ``fields``) of a cached dict, a result row or an ORM
+    object, with links as plain dicts; rows may carry extra columns such as the sort key.
+    """
+    get = user.__getitem__ if isinstance(user, dict) else partial(getattr, user)
+    item = {name: get(name) for name in (fields or USER_RESPONSE_FIELDS) if name != "links"}
+    if fields is None or "links" in fields:
+        item["links"] = user_link_dicts(get("id"), request)
+    return item
+
+def user_response(user, request: Request, status_code: int = status.HTTP_200_OK, fields: Optional[Tuple[str, ...]] = None):
+    """
+    A user (a dict, row or ORM object) with its links. In fast mode, and always for a sparse
+    fieldset (which UserResponse cannot validate), the response is built from the columns
+    directly and serialized once; otherwise the model is validated here and again by
+    FastAPI against response_model.
+    """
+    if fields is not None or settings.fast_json_responses:
+        return FastJSONResponse(_user_item(user, request, fields), adapter=None if fields else USER_RESPONSE_ADAPTER,
+                                status_code=status_code)
+    user_id = user["id"] if isinstance(user, dict) else user.id
+    return UserResponse.model_validate(user).model_copy(update={"links": create_user_links(user_id, request)})
+
+# Declared before /users/{user_id} so "export" is not captured as a user id.
+@router.get("/users/export", tags=["User Management Requires (Admin or Manager Roles)"])
+async def export_users(
+    format: str = "ndjson",
+    role: Optional[UserRole] = None,
+    email_verified: Optional[bool] = None,
+    is_locked: Optional[bool] = None,
+    is_professional: Optional[bool] = None,
+    session_factory = Depends(get_session_factory),
+    current_user: dict = Depends(require_role(["ADMIN"]))
+):
+    """
+    Streams every matching user as NDJSON or CSV. Rows are read through a server-side
+    cursor in its own session, since the request's get_db session is closed before
+    the body is streamed.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unsupported export format: {format}")
+    filters = {
+        "role": UserRoleModel(role.value) if role else None,
+        "email_verified": email_verified,
+        "is_locked": is_locked,
+        "is_professional": is_professional,
+    }
+    filters = {name: value for name, value in filters.items() if value is not None}
+    fieldnames = list(USER_RESPONSE_FIELDS)
+
+    async def generate():
+        header = True
+        async with session_factory() as session:
+            async for batch in UserService.stream_users(session, filters=filters):
+                items = [UserResponse.model_validate(row._asdict()) for row in batch]
+                if format == "csv":
+                    yield models_to_csv(items, fieldnames, header=header)
+                    header = False
+                else:
+                    yield models_to_ndjson(items, fieldnames)
+        if format == "csv" and header:
+            yield models_to_csv([], fieldnames, header=True)
+
+    return StreamingResponse(
+        generate(),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="users.{format}"'}
+    )
+
+@router.get("/users/search", response_model=UserSearchResults, tags=["User Management Requires (Admin or Manager Roles)"])
+async def search_users(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))
+):
+    """
+    Searches nickname, first and last name and bio; misspelt nicknames still match. Results
+    are ranked best first. Follow the ``next`` link for further pages.
+    """
+    try:
+        page_cursor = PageCursor.decode(cursor or "", sort="rank")
+        rows, has_next = await UserService.search_profiles(db, q, limit, page_cursor)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor")
+    next_cursor = PageCursor(sort="rank", value=rows[-1].rank, id=rows[-1].id).encode() if has_next else None
+    items = [UserResponse.model_validate(dict(row._asdict(), links=user_link_dicts(row.id, request))) for row in rows]
+    return UserSearchResults(items=items, size=len(items), links=generate_search_links(request, limit, next_cursor, {"q": q}))
+
+@router.get("/users/{user_id}", response_model=UserResponse, responses=USER_FIELDS_RESPONSES, tags=["User Management Requires (Admin or Manager Roles)"])
+async def get_user(user_id: UUID, request: Request, fields: Optional[Tuple[str, ...]] = Depends(get_user_fields), db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme), current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))):
+    """Returns the user; ``fields`` limits the response, and the columns read, to those fields."""
+    user = await UserService.get_response_by_id(db, user_id, fields=fields)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-    return UserResponse.model_validate(user).model_copy(update={"links": create_user_links(user.id, request)})
+    return user_response(user, request, fields=fields)
 
 @router.put("/users/{user_id}", response_model=UserResponse, tags=["User Management Requires (Admin or Manager Roles)"])
 async def update_user(user_id: UUID, user_update: UserUpdate, request: Request, db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme), current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))):
-    updated_user = await UserService.update(db, user_id, user_update.model_dump(exclude_unset=True))
+    try:
+        updated_user = await UserService.update(db, user_id, user_update.model_dump(exclude_unset=True))
+    except UserConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"{e.field.capitalize()} already exists")
     if not updated_user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-    return UserResponse.model_validate(updated_user).model_copy(update={"links": create_user_links(updated_user.id, request)})
+    return user_response(updated_user, request)
 
 @router.post("/users/{user_id}/upgrade", response_model=UserResponse, tags=["User Management Requires (Admin or Manager Roles)"])
 async def upgrade_user_to_professional(
@@ -43,7 +175,7 @@ async def upgrade_user_to_professional(
     updated_user = await UserService.upgrade_to_professional(db, user_id, current_user["role"])
     if not updated_user:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Upgrade not permitted or user not found.")
-    return UserResponse.model_validate(updated_user).model_copy(update={"links": create_user_links(updated_user.id, request)})
+    return user_response(updated_user, request)
 
 @router.delete("/users/{user_id}", status_code=status.HTTP_204_NO_CONTENT, tags=["User Management Requires (Admin or Manager Roles)"])
 async def delete_user(user_id: UUID, db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme), current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))):
@@ -54,22 +186,101 @@ async def delete_user(user_id: UUID, db: AsyncSession = Depends(get_db), token:
 
 @router.post("/users/", response_model=UserResponse, status_code=status.HTTP_201_CREATED, tags=["User Management Requires (Admin or Manager Roles)"])
 async def create_user(user: UserCreate, request: Request, db: AsyncSession = Depends(get_db), email_service: EmailService = Depends(get_email_service), token: str = Depends(oauth2_scheme), current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))):
-    if await UserService.get_by_email(db, user.email):
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already exists")
+    # UserService.create checks the email itself; the body is already validated, so None means it is taken.
     created_user = await UserService.create(db, user.model_dump(), email_service)
-    return UserResponse.model_validate(created_user).model_copy(update={"links": create_user_links(created_user.id, request)})
+    if not created_user:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already exists")
+    return user_response(created_user, request, status.HTTP_201_CREATED)
+
+@router.post("/users/import", response_model=BulkImportResponse, tags=["User Management Requires (Admin or Manager Roles)"])
+async def import_users(
+    request: Request,
+    format: str = "ndjson",
+    db: AsyncSession = Depends(get_db),
+    email_service: EmailService = Depends(get_email_service),
+    current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))
+):
+    """
+    Creates users from a streamed NDJSON or CSV body (same fields as POST /users/) and
+    returns a per-record report. Verification emails go to the outbox, or are sent once
+    the import commits when the outbox is disabled.
+    """
+    if format not in IMPORT_FORMATS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unsupported import format: {format}")
+    results, created = await UserService.bulk_create(db, iter_records(request.stream(), format), email_service=email_service)
+    return BulkImportResponse(
+        total=len(results),
+        created=created,
+        failed=len(results) - created,
+        results=results
+    )
 
-@router.get("/users/", response_model=UserListResponse, tags=["User Management Requires (Admin or Manager Roles)"])
-async def list_users(request: Request, skip: int = 0, limit: int = 10, db: AsyncSession = Depends(get_db), current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))):
-    total_users = await UserService.count(db)
-    users = await UserService.list_users(db, skip, limit)
-    user_responses = [UserResponse.model_validate(user) for user in users]
+def get_user_search(
+    role: Optional[UserRole] = None,
+    email_verified: Optional[bool] = None,
+    is_professional: Optional[bool] = None,
+    is_locked: Optional[bool] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    email_prefix: Optional[str] = Query(None, min_length=1, max_length=255),
+    nickname_prefix: Optional[str] = Query(None, min_length=1, max_length=50),
+    sort: UserSortKey = "created_at",
+) -> UserSearch:
+    """Collects the listing's filter and sort query parameters."""
+    return UserSearch(
+        role=role, email_verified=email_verified, is_professional=is_professional, is_locked=is_locked,
+        created_after=created_after, created_before=created_before,
+        email_prefix=email_prefix, nickname_prefix=nickname_prefix, sort=sort
+    )
+
+@router.get("/users/", response_model=UserListResponse, responses=USER_LIST_FIELDS_RESPONSES, tags=["User Management Requires (Admin or Manager Roles)"])
+async def list_users(request: Request, skip: int = 0, limit: int = 10, cursor: Optional[str] = None, search: UserSearch = Depends(get_user_search), fields: Optional[Tuple[str, ...]] = Depends(get_user_fields), db: AsyncSession = Depends(get_db), current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))):
+    """
+    Lists users matching the filters, ordered by ``sort`` (creation time by default). Pass
+    ``cursor`` (empty for the first page) to use keyset pagination and follow the cursors
+    in the returned links; ``skip`` is the offset mode kept for existing clients. Every
+    link repeats the filters and sort key. ``fields`` (e.g. ``id,nickname,email``) limits
+    the items, and the columns selected, to those fields.
+    """
+    total_users, count_strategy = await UserService.count_with_strategy(db, search=search)
+    params = search.query_params()
+    columns = UserService.response_columns(fields)
+    if fields is not None:
+        params["fields"] = ",".join(fields)
+    if cursor is None:
+        users = await UserService.list_users(db, skip, limit, columns=columns, search=search)
+        # Cached and estimated totals can lag behind; never report fewer users than were just read.
+        total_users = max(total_users, skip + len(users))
+        page = skip // limit + 1
+        links = generate_pagination_links(request, skip, limit, total_users, params=params)
+    else:
+        try:
+            page_cursor = PageCursor.decode(cursor, sort=search.sort)
+            users, has_next, has_prev = await UserService.list_users_keyset(db, limit, page_cursor, columns=columns, search=search)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor")
+        sort_field = search.sort.lstrip("-")
+        next_cursor = PageCursor(direction="next", sort=search.sort, value=getattr(users[-1], sort_field), id=users[-1].id).encode() if has_next and users else None
+        prev_cursor = PageCursor(direction="prev", sort=search.sort, value=getattr(users[0], sort_field), id=users[0].id).encode() if has_prev and users else None
+        page = None
+        links = generate_pagination_links(request, skip, limit, total_users, next_cursor, prev_cursor, cursor_mode=True, params=params)
+    if fields is not None or settings.fast_json_responses:
+        return FastJSONResponse({
+            "items": [_user_item(user, request, fields) for user in users],
+            "total": total_users,
+            "count_strategy": count_strategy,
+            "page": page,
+            "size": len(users),
+            "links": [link.model_dump(mode="json") for link in links],
+        }, adapter=None if fields else USER_LIST_ADAPTER)
+    user_responses = [UserResponse.model_validate(dict(user._asdict(), links=user_link_dicts(user.id, request))) for user in users]
     return UserListResponse(
         items=user_responses,
         total=total_users,
-        page=skip // limit + 1,
+        count_strategy=count_strategy,
+        page=page,
         size=len(user_responses),
-        links=generate_pagination_links(request, skip, limit, total_users)
+        links=links
     )
 
 @router.post("/register/", response_model=UserResponse, tags=["Login and Registration"])
@@ -81,10 +292,10 @@ async def register(user_data: UserCreate, session: AsyncSession = Depends(get_db
 
 @router.post("/login/", response_model=TokenResponse, tags=["Login and Registration"])
 async def login(form_data: OAuth2PasswordRequestForm = Depends(), session: AsyncSession = Depends(get_db)):
-    if await UserService.is_account_locked(session, form_data.username):
+    outcome, user = await UserService.authenticate(session, form_data.username, form_data.password)
+    if outcome is LoginOutcome.LOCKED:
         raise HTTPException(status_code=400, detail="Account locked due to too many failed login attempts.")
-    user = await UserService.login_user(session, form_data.username, form_data.password)
-    if user:
+    if outcome is LoginOutcome.SUCCESS:
         access_token = create_access_token(
             data={"sub": user.email, "role": str(user.role.name)},
             expires_delta=timedelta(minutes=settings.access_token_expire_minutes)
@@ -93,7 +304,7 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), session: Async
     raise HTTPException(status_code=401, detail="Incorrect email or password.")
 
 @router.get("/verify-email/{user_id}/{token}", status_code=status.HTTP_200_OK, tags=["Login and Registration"])
-async def verify_email(user_id: UUID, token: str, db: AsyncSession = Depends(get_db), email_service: EmailService = Depends(get_email_service)):
+async def verify_email(user_id: UUID, token: str, db: AsyncSession = Depends(get_primary_db), email_service: EmailService = Depends(get_email_service)):
     if await UserService.verify_email_with_token(db, user_id, token):
         return {"message": "Email verified successfully"}
     raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid or expired verification token")
@@ -1,8 +1,10 @@
+import base64
+import json
 import re
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Literal, Optional, Union
 from uuid import UUID
-from pydantic import BaseModel, EmailStr, Field, HttpUrl, validator, conint
+from pydantic import BaseModel, EmailStr, Field, HttpUrl, ValidationError, validator, conint
 
 # Pagination Model
 class Pagination(BaseModel):
@@ -33,3 +35,52 @@ class EnhancedPagination(Pagination):
 
     def add_link(self, rel: str, href: str):
         self.links.append(PaginationLink(rel=rel, href=href))
+
+
+class PageCursor(BaseModel):
+    """
+    Position in a keyset-paginated listing ordered by ``(sort column, id)``.
+
+    ``sort`` is the listing's sort key (``created_at``, ``email`` or ``nickname``, with a
+    leading ``-`` for descending, or ``rank`` for profile search) and ``value`` the sort
+    column's value at the position.
+    Clients only ever see the opaque string produced by :meth:`encode`. A cursor without
+    a key points at the start (``next``) or the end (``prev``) of the listing.
+    """
+    direction: Literal["next", "prev"] = "next"
+    sort: str = "created_at"
+    value: Optional[Union[datetime, float, str]] = None
+    id: Optional[UUID] = None
+
+    @property
+    def has_key(self) -> bool:
+        return self.value is not None and self.id is not None
+
+    def encode(self) -> str:
+        payload = {"d": self.direction}
+        if self.sort != "created_at":
+            payload["s"] = self.sort
+        if self.has_key:
+            value = self.value.isoformat() if isinstance(self.value, datetime) else self.value
+            payload["k"] = [value, str(self.id)]
+        raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+    @classmethod
+    def decode(cls, token: str, sort: str = "created_at") -> "PageCursor":
+        """
+        Decode a cursor string; an empty string is the first page. Cursors that do not
+        name their sort key belong to the ``sort`` listing. Raises ValueError if malformed.
+        """
+        if not token:
+            return cls(sort=sort)
+        try:
+            raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+            payload = json.loads(raw)
+            value, user_id = payload.get("k") or (None, None)
+            sort = payload.get("s", sort)
+            if value is not None and sort.lstrip("-") == "created_at":
+                value = datetime.fromisoformat(value)
+            return cls(direction=payload.get("d", "next"), sort=sort, value=value, id=user_id)
+        except (ValueError, TypeError, AttributeError, ValidationError) as e:
+            raise ValueError("Invalid pagination cursor") from e
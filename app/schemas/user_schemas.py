@@ -1,11 +1,13 @@
-from builtins import ValueError, any, bool, str
-from pydantic import BaseModel, EmailStr, Field, validator, root_validator
-from typing import Optional, List
+from builtins import ValueError, any, bool, dict, isinstance, str
+from pydantic import BaseModel, EmailStr, Field, TypeAdapter, validator, root_validator
+from typing import Literal, Optional, List
 from datetime import datetime
 from enum import Enum
 import uuid
 import re
 
+from app.schemas.link_schema import Link
+from app.schemas.pagination_schema import PaginationLink
 from app.utils.nickname_gen import generate_nickname
 
 class UserRole(str, Enum):
@@ -63,6 +65,7 @@ class UserResponse(UserBase):
     role: UserRole = Field(default=UserRole.AUTHENTICATED, example="AUTHENTICATED")
     is_professional: Optional[bool] = Field(default=False, example=True)
     preferred_language: Optional[str] = Field(None, example="English")
+    links: List[Link] = Field(default_factory=list, description="view, update and delete links for this user.")
 
 class LoginRequest(BaseModel):
     email: str = Field(..., example="john.doe@example.com")
@@ -72,6 +75,34 @@ class ErrorResponse(BaseModel):
     error: str = Field(..., example="Not Found")
     details: Optional[str] = Field(None, example="The requested resource was not found.")
 
+UserSortKey = Literal["created_at", "-created_at", "email", "-email", "nickname", "-nickname"]
+
+class UserSearch(BaseModel):
+    """
+    Filters and sort key for the user listing; filters left unset match every user.
+
+    ``created_after`` is inclusive and ``created_before`` exclusive. Prefixes match
+    case-insensitively. ``sort`` names a column, with a leading ``-`` for descending.
+    """
+    role: Optional[UserRole] = None
+    email_verified: Optional[bool] = None
+    is_professional: Optional[bool] = None
+    is_locked: Optional[bool] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+    email_prefix: Optional[str] = Field(None, min_length=1, max_length=255)
+    nickname_prefix: Optional[str] = Field(None, min_length=1, max_length=50)
+    sort: UserSortKey = "created_at"
+
+    @property
+    def is_filtered(self) -> bool:
+        return any(value is not None for name, value in self if name != "sort")
+
+    def query_params(self) -> dict:
+        """The non-default values as query parameters, for links to other pages of the same listing."""
+        params = self.model_dump(mode="json", exclude_defaults=True)
+        return {name: str(value).lower() if isinstance(value, bool) else value for name, value in params.items()}
+
 class UserListResponse(BaseModel):
     items: List[UserResponse] = Field(..., example=[{
         "id": uuid.uuid4(), "nickname": generate_nickname(), "email": "john.doe@example.com",
@@ -81,9 +112,36 @@ class UserListResponse(BaseModel):
         "github_profile_url": "https://github.com/johndoe"
     }])
     total: int = Field(..., example=100)
-    page: int = Field(..., example=1)
+    count_strategy: str = Field("exact", example="exact", description="How total was computed: exact, cached or estimated.")
+    page: Optional[int] = Field(None, example=1, description="Page number; not set for cursor pagination.")
     size: int = Field(..., example=10)
+    links: List[PaginationLink] = Field(default_factory=list)
+
+# Built once: validating and dumping through these skips rebuilding the core schema per call.
+USER_RESPONSE_ADAPTER = TypeAdapter(UserResponse)
+USER_LIST_ADAPTER = TypeAdapter(UserListResponse)
+# UserResponse fields that come from the users table, in response order.
+USER_RESPONSE_FIELDS = tuple(name for name in UserResponse.model_fields if name != "links")
+
+class UserSearchResults(BaseModel):
+    items: List[UserResponse] = Field(default_factory=list)
+    size: int = Field(..., example=10)
+    links: List[PaginationLink] = Field(default_factory=list, description="self, and next while more matches follow.")
 
 # NEW: Schema for updating professional status
 class ProfessionalStatusUpdate(BaseModel):
     is_professional: bool = Field(..., example=True)
+
+
+class BulkImportRow(BaseModel):
+    line: int = Field(..., example=1, description="1-based position of the record in the upload.")
+    email: Optional[str] = Field(None, example="john.doe@example.com")
+    status: str = Field(..., example="created", description="created, invalid or duplicate.")
+    id: Optional[uuid.UUID] = Field(None, example=uuid.uuid4())
+    errors: List[str] = Field(default_factory=list)
+
+class BulkImportResponse(BaseModel):
+    total: int = Field(..., example=2)
+    created: int = Field(..., example=1)
+    failed: int = Field(..., example=1)
+    results: List[BulkImportRow]
@@ -0,0 +1,133 @@
+from builtins import Exception, bool, dict, float, int, len, list, str, zip
+import asyncio
+from datetime import datetime, timedelta, timezone
+import logging
+from typing import Dict, List, Optional
+from uuid import UUID
+from sqlalchemy import select
+from app.models.email_outbox_model import EmailOutbox
+from app.utils.smtp_connection import SMTPClient
+
+logger = logging.getLogger(__name__)
+
+class EmailOutboxWorker:
+    """
+    Background task that delivers queued EmailOutbox messages.
+
+    Each pass claims up to ``batch_size`` due messages with ``FOR UPDATE SKIP LOCKED``
+    (so several workers can share the table), marks them 'sending' and commits, then
+    sends them from a thread since smtplib blocks, and records the outcome in a second
+    transaction; no row lock is held during SMTP I/O. A claim is a lease: messages left
+    'sending' by a worker that died are claimed again after ``claim_timeout`` seconds.
+    A failed message is retried after ``backoff_base * 2 ** (attempts - 1)`` seconds
+    until ``max_attempts`` is reached. Attempts are counted when a message is claimed,
+    so a lease that expires without an outcome still uses one up, and a message whose
+    attempts are spent is marked 'failed' instead of being claimed again.
+    """
+
+    def __init__(self, session_factory, smtp_client: SMTPClient, batch_size: int = 50,
+                 poll_interval: float = 2.0, max_attempts: int = 5, backoff_base: float = 30.0,
+                 claim_timeout: float = 300.0):
+        self.session_factory = session_factory
+        self.smtp_client = smtp_client
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.claim_timeout = claim_timeout
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+
+    async def drain_once(self) -> int:
+        """Deliver one batch of due messages and return how many were attempted."""
+        messages = await self._claim()
+        if not messages:
+            return 0
+        # One thread hop per batch; a pooled client sends it over a few reused sessions.
+        errors = await asyncio.to_thread(
+            self.smtp_client.send_emails,
+            [(message.subject, message.body, message.recipient) for message in messages],
+        )
+        await self._record(dict(zip([message.id for message in messages], errors)))
+        return len(messages)
+
+    async def _claim(self) -> List[EmailOutbox]:
+        """
+        Mark a batch of due messages 'sending' until the lease expires, count the attempt,
+        and commit the claim. Expired leases with no attempts left are marked 'failed'.
+        """
+        now = datetime.now(timezone.utc)
+        async with self.session_factory() as session:
+            query = (
+                select(EmailOutbox)
+                .where(EmailOutbox.status.in_(("pending", "sending")), EmailOutbox.next_attempt_at <= now)
+                .order_by(EmailOutbox.next_attempt_at)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            lease = now + timedelta(seconds=self.claim_timeout)
+            messages = []
+            for message in (await session.execute(query)).scalars().all():
+                if message.attempts >= self.max_attempts:
+                    # Its last attempt was claimed by a worker that never recorded the outcome.
+                    message.status = "failed"
+                    message.last_error = message.last_error or "Claim expired without a recorded outcome"
+                    logger.error(f"Giving up on email to {message.recipient} after {message.attempts} attempts.")
+                    continue
+                message.status = "sending"
+                message.attempts += 1
+                message.next_attempt_at = lease
+                messages.append(message)
+            await session.commit()
+        return messages
+
+    async def _record(self, errors: Dict[UUID, Optional[Exception]]):
+        """Record the outcome of each claimed message, keyed by id, in a fresh transaction."""
+        async with self.session_factory() as session:
+            query = select(EmailOutbox).where(EmailOutbox.id.in_(errors))
+            for message in (await session.execute(query)).scalars().all():
+                error = errors[message.id]
+                if error is not None:
+                    message.last_error = str(error)
+                    if message.attempts >= self.max_attempts:
+                        message.status = "failed"
+                        logger.error(f"Giving up on email to {message.recipient} after {message.attempts} attempts.")
+                    else:
+                        delay = self.backoff_base * 2 ** (message.attempts - 1)
+                        message.status = "pending"
+                        message.next_attempt_at = datetime.now(timezone.utc) + timedelta(seconds=delay)
+                else:
+                    message.status = "sent"
+                    message.sent_at = datetime.now(timezone.utc)
+                    message.last_error = None
+            await session.commit()
+
+    async def run(self):
+        """Drain continuously, sleeping ``poll_interval`` whenever a pass finds nothing to send."""
+        while not self._stopping.is_set():
+            try:
+                attempted = await self.drain_once()
+            except Exception:
+                logger.exception("Email outbox pass failed")
+                attempted = 0
+            if attempted < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    def start(self):
+        if self._task is None:
+            self._stopping.clear()
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        """Let the current pass finish, then stop the worker."""
+        if self._task is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
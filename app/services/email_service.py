@@ -1,21 +1,24 @@
 # email_service.py
-from builtins import ValueError, dict, str
+from builtins import Exception, ValueError, dict, str
+import asyncio
+import logging
+from typing import Iterable, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import on_commit
 from settings.config import settings
 from app.utils.smtp_connection import SMTPClient
 from app.utils.template_manager import TemplateManager
+from app.models.email_outbox_model import EmailOutbox
 from app.models.user_model import User
 
+logger = logging.getLogger(__name__)
+
 class EmailService:
-    def __init__(self, template_manager: TemplateManager):
-        self.smtp_client = SMTPClient(
-            server=settings.smtp_server,
-            port=settings.smtp_port,
-            username=settings.smtp_username,
-            password=settings.smtp_password
-        )
+    def __init__(self, template_manager: TemplateManager, smtp_client: Optional[SMTPClient] = None):
+        self.smtp_client = smtp_client or SMTPClient.from_settings(settings)
         self.template_manager = template_manager
 
-    async def send_user_email(self, user_data: dict, email_type: str):
+    def _render(self, user_data: dict, email_type: str) -> Tuple[str, str]:
         subject_map = {
             'email_verification': "Verify Your Account",
             'password_reset': "Password Reset Instructions",
@@ -25,13 +28,55 @@ class EmailService:
         if email_type not in subject_map:
             raise ValueError("Invalid email type")
 
-        html_content = self.template_manager.render_template(email_type, **user_data)
-        self.smtp_client.send_email(subject_map[email_type], html_content, user_data['email'])
+        return subject_map[email_type], self.template_manager.render_template(email_type, **user_data)
+
+    async def send_user_email(self, user_data: dict, email_type: str):
+        subject, html_content = self._render(user_data, email_type)
+        # smtplib blocks, so the send runs in a worker thread and the event loop keeps serving requests.
+        await asyncio.to_thread(self.smtp_client.send_email, subject, html_content, user_data['email'])
+
+    async def enqueue_user_email(self, session: AsyncSession, user_data: dict, email_type: str) -> EmailOutbox:
+        """
+        Render the email and add it to the outbox in the caller's transaction; it is
+        delivered by EmailOutboxWorker once that transaction commits.
+        """
+        subject, html_content = self._render(user_data, email_type)
+        message = EmailOutbox(recipient=user_data['email'], subject=subject, body=html_content)
+        session.add(message)
+        return message
 
-    async def send_verification_email(self, user: User):
+    def _verification_data(self, user: User) -> dict:
         verification_url = f"{settings.server_base_url}verify-email/{user.id}/{user.verification_token}"
-        await self.send_user_email({
+        return {
             "name": user.first_name,
             "verification_url": verification_url,
             "email": user.email
-        }, 'email_verification')
\ No newline at end of file
+        }
+
+    async def _send_logged(self, user_data: dict, email_type: str):
+        # Runs after the commit: the user already exists, so a failed send is logged rather than raised.
+        try:
+            await self.send_user_email(user_data, email_type)
+        except Exception as e:
+            logger.error(f"Failed to send {email_type} email to {user_data['email']}: {e}")
+
+    async def send_verification_email(self, user: User, session: Optional[AsyncSession] = None):
+        """
+        With a session, queue the verification email in the outbox when it is enabled, or
+        else send it once the session commits; without a session, send it now.
+        """
+        user_data = self._verification_data(user)
+        if session is None:
+            await self.send_user_email(user_data, 'email_verification')
+        elif settings.email_outbox_enabled:
+            await self.enqueue_user_email(session, user_data, 'email_verification')
+        else:
+            on_commit(session, lambda: self._send_logged(user_data, 'email_verification'))
+
+    async def send_verification_emails(self, users: Iterable[User], session: Optional[AsyncSession] = None):
+        """Send, queue or schedule verification emails one by one; a failure is logged and does not stop the rest."""
+        for user in users:
+            try:
+                await self.send_verification_email(user, session)
+            except Exception as e:
+                logger.error(f"Failed to send verification email to {user.email}: {e}")
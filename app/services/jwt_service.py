@@ -1,7 +1,12 @@
 # app/services/jwt_service.py
-from builtins import dict, str
+from builtins import bool, dict, float, int, isinstance, len, max, round, str
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 import jwt
 from datetime import datetime, timedelta
+from typing import Dict, Optional
 from settings.config import settings
 
 def create_access_token(*, data: dict, expires_delta: timedelta = None):
@@ -9,14 +14,146 @@ def create_access_token(*, data: dict, expires_delta: timedelta = None):
     # Convert role to uppercase before encoding the JWT
     if 'role' in to_encode:
         to_encode['role'] = to_encode['role'].upper()
-    expire = datetime.utcnow() + (expires_delta if expires_delta else timedelta(minutes=settings.access_token_expire_minutes))
-    to_encode.update({"exp": expire})
+    now = datetime.utcnow()
+    expire = now + (expires_delta if expires_delta else timedelta(minutes=settings.access_token_expire_minutes))
+    to_encode.update({"exp": expire, "iat": now})
     encoded_jwt = jwt.encode(to_encode, settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
     return encoded_jwt
 
-def decode_token(token: str):
+def _decode(token: str) -> Optional[dict]:
     try:
         decoded = jwt.decode(token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
         return decoded
     except jwt.PyJWTError:
         return None
+
+class TokenCache:
+    """
+    Bounded cache of verified JWT claims, keyed by the SHA-256 digest of the token.
+
+    An entry is only stored after a full ``jwt.decode`` succeeded and is dropped at the
+    token's ``exp``, so a cached token can never outlive its own expiry. Beyond
+    ``maxsize`` entries the least recently used is evicted; 0 caches nothing. Tokens
+    without ``exp`` are never cached.
+
+    Revocation: ``revoke(token)`` rejects one token until it expires, and
+    ``revoke_subject(sub)`` rejects every token of ``sub`` issued up to now (for logout
+    everywhere, lockout or a role change). Both apply whether or not the token is cached,
+    and are held per process.
+    """
+
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self._entries: OrderedDict = OrderedDict()
+        self._revoked_tokens: Dict[bytes, float] = {}
+        self._revoked_subjects: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.metrics = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "revoked": 0}
+
+    @staticmethod
+    def _digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def _is_revoked(self, digest: bytes, claims: dict) -> bool:
+        if digest in self._revoked_tokens:
+            return True
+        revoked_at = self._revoked_subjects.get(claims.get("sub"))
+        return revoked_at is not None and claims.get("iat", 0) <= revoked_at
+
+    def decode(self, token: str) -> Optional[dict]:
+        """Claims of a valid, unrevoked token, verified once and then served from memory; else None."""
+        digest = self._digest(token)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                claims, expires = entry
+                if expires > now:
+                    self._entries.move_to_end(digest)
+                    self.metrics["hits"] += 1
+                    return None if self._is_revoked(digest, claims) else dict(claims)
+                del self._entries[digest]
+                self.metrics["expired"] += 1
+            self.metrics["misses"] += 1
+
+        claims = _decode(token)
+        if claims is None:
+            return None
+        with self._lock:
+            if self._is_revoked(digest, claims):
+                return None
+            expires = claims.get("exp")
+            if isinstance(expires, (int, float)) and self.maxsize > 0:
+                self._entries[digest] = (claims, float(expires))
+                self._entries.move_to_end(digest)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.metrics["evictions"] += 1
+        return dict(claims)
+
+    def revoke(self, token: str):
+        """Reject ``token`` from now on, until it would have expired anyway."""
+        digest = self._digest(token)
+        claims = _decode(token)
+        with self._lock:
+            entry = self._entries.pop(digest, None)
+            expires = entry[1] if entry else (claims or {}).get("exp")
+            if expires is not None:
+                self._revoked_tokens[digest] = float(expires)
+            self.metrics["revoked"] += 1
+            self._purge_revocations()
+
+    def revoke_subject(self, subject: str):
+        """Reject every token of ``subject`` issued up to now; tokens issued later still work."""
+        with self._lock:
+            # iat has whole-second resolution, so tokens issued later this second are rejected too.
+            self._revoked_subjects[subject] = float(int(time.time()))
+            self.metrics["revoked"] += 1
+            self._purge_revocations()
+
+    def _purge_revocations(self):
+        now = time.time()
+        self._revoked_tokens = {digest: until for digest, until in self._revoked_tokens.items() if until > now}
+        # Once the longest-lived token issued before the revocation has expired, it is moot.
+        lifetime = max(settings.access_token_expire_minutes, settings.refresh_token_expire_minutes) * 60
+        self._revoked_subjects = {
+            subject: at for subject, at in self._revoked_subjects.items() if at + lifetime > now
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        lookups = self.metrics["hits"] + self.metrics["misses"]
+        return dict(
+            self.metrics,
+            size=len(self._entries),
+            maxsize=self.maxsize,
+            hit_rate=round(self.metrics["hits"] / lookups, 4) if lookups else 0.0,
+        )
+
+_token_cache: Optional[TokenCache] = None
+
+def get_token_cache() -> TokenCache:
+    """The process-wide token cache, sized by settings on first use."""
+    global _token_cache
+    if _token_cache is None:
+        _token_cache = TokenCache(settings.token_cache_size)
+    return _token_cache
+
+def set_token_cache(cache: Optional[TokenCache]):
+    """Install ``cache`` as the process-wide token cache; None rebuilds it from settings on next use."""
+    global _token_cache
+    _token_cache = cache
+
+def decode_token(token: str):
+    return get_token_cache().decode(token)
+
+def revoke_token(token: str):
+    """Revocation hook: reject ``token`` for the rest of its lifetime."""
+    get_token_cache().revoke(token)
+
+def revoke_subject(subject: str):
+    """Revocation hook: reject every token issued to ``subject`` so far."""
+    get_token_cache().revoke_subject(subject)
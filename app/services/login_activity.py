@@ -0,0 +1,118 @@
+from builtins import Exception, dict, float, int, len, list, max, range
+import asyncio
+from datetime import datetime, timezone
+import logging
+from typing import Dict, Optional
+from uuid import UUID
+from sqlalchemy import DateTime, column, func, update, values
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from app.models.user_model import User
+
+logger = logging.getLogger(__name__)
+
+class LoginActivityBuffer:
+    """
+    Write-behind buffer for the ``last_login_at`` bookkeeping of successful logins.
+
+    Logins are coalesced per user in memory, keeping the latest time, and written by a
+    background task in one multi-row UPDATE every ``flush_interval`` seconds, or as soon
+    as ``max_entries`` users are pending. ``stop`` writes whatever is left. Nothing here
+    touches ``failed_login_attempts``: lockout bookkeeping is always written synchronously
+    (see UserService.authenticate), and a flush never moves ``last_login_at`` backwards.
+    """
+
+    # Each pending login is two bind parameters; stay well below asyncpg's 32767 limit.
+    CHUNK_SIZE = 5000
+
+    def __init__(self, session_factory, flush_interval: float = 0.5, max_entries: int = 1000):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.max_entries = max_entries
+        self._pending: Dict[UUID, datetime] = {}
+        self._full = asyncio.Event()
+        self._stopping = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.metrics = {"recorded": 0, "flushes": 0, "rows_written": 0, "errors": 0}
+
+    def record(self, user_id: UUID, at: Optional[datetime] = None):
+        """Note a successful login; it reaches the database with the next flush."""
+        at = at or datetime.now(timezone.utc)
+        previous = self._pending.get(user_id)
+        self._pending[user_id] = at if previous is None else max(previous, at)
+        self.metrics["recorded"] += 1
+        if len(self._pending) >= self.max_entries:
+            self._full.set()
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def flush(self) -> int:
+        """Write every pending login and return how many users were updated."""
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, {}
+        self._full.clear()
+        items = list(pending.items())
+        try:
+            async with self.session_factory() as session:
+                for start in range(0, len(items), self.CHUNK_SIZE):
+                    logins = values(
+                        column("id", PG_UUID(as_uuid=True)), column("at", DateTime(timezone=True)), name="logins"
+                    ).data(items[start:start + self.CHUNK_SIZE])
+                    await session.execute(
+                        update(User)
+                        .where(User.id == logins.c.id)
+                        .values(last_login_at=func.greatest(User.last_login_at, logins.c.at))
+                        .execution_options(synchronize_session=False)
+                    )
+                await session.commit()
+        except Exception:
+            # Put the batch back, without overwriting newer logins recorded meanwhile.
+            for user_id, at in pending.items():
+                newer = self._pending.get(user_id)
+                self._pending[user_id] = at if newer is None else max(newer, at)
+            self.metrics["errors"] += 1
+            raise
+        self.metrics["flushes"] += 1
+        self.metrics["rows_written"] += len(items)
+        return len(items)
+
+    async def run(self):
+        """Flush every ``flush_interval`` seconds, or early once the buffer is full."""
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Login activity flush failed")
+
+    def start(self):
+        if self._task is None:
+            self._stopping.clear()
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        """Stop the background task and write what is still pending."""
+        if self._task is not None:
+            self._stopping.set()
+            self._full.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return dict(self.metrics, pending=self.pending)
+
+_buffer: Optional[LoginActivityBuffer] = None
+
+def get_login_activity_buffer() -> Optional[LoginActivityBuffer]:
+    """The active write-behind buffer, or None when logins are written synchronously."""
+    return _buffer
+
+def set_login_activity_buffer(buffer: Optional[LoginActivityBuffer]):
+    global _buffer
+    _buffer = buffer
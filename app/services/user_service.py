@@ -1,31 +1,112 @@
-from builtins import Exception, bool, classmethod, int, str
+from builtins import Exception, RuntimeError, ValueError, bool, classmethod, int, isinstance, len, list, max, range, set, str, sum, super, tuple, zip
+import asyncio
 from datetime import datetime, timezone
+from enum import Enum
 import secrets
-from typing import Optional, Dict, List
+import time
+from typing import AsyncIterator, Callable, Optional, Dict, List, Sequence, Set, Tuple
 from pydantic import ValidationError
-from sqlalchemy import func, update, select
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import Float, Row, case, cast, delete, func, insert, or_, text, update, select, tuple_
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import discard_after_commit, on_commit, run_after_commit
 from app.dependencies import get_settings
 from app.models.user_model import User
-from app.schemas.user_schemas import UserCreate, UserUpdate
+from app.schemas.pagination_schema import PageCursor
+from app.schemas.user_schemas import UserCreate, UserResponse, UserSearch, UserUpdate
 from app.utils.nickname_gen import generate_nickname
-from app.utils.security import generate_verification_token, hash_password, verify_password
-from uuid import UUID
+from app.utils.security import generate_verification_token, get_hashing_pool, hash_password_async, verify_password_async
+from app.utils.user_cache import get_user_cache
+from uuid import UUID, uuid4
 from app.services.email_service import EmailService
+from app.services.jwt_service import revoke_subject
+from app.services.login_activity import get_login_activity_buffer
 from app.models.user_model import UserRole
 import logging
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
+class LoginOutcome(Enum):
+    """Result of a login attempt, used by the route to pick the response."""
+    SUCCESS = "SUCCESS"
+    INVALID_CREDENTIALS = "INVALID_CREDENTIALS"
+    UNVERIFIED = "UNVERIFIED"
+    LOCKED = "LOCKED"
+
+COUNT_STRATEGIES = ("exact", "cached", "estimated")
+
+# Columns backing UserResponse; list queries select only these instead of whole User entities.
+USER_RESPONSE_COLUMNS = tuple(getattr(User, name) for name in UserResponse.model_fields if hasattr(User, name))
+# Handed back by the professional-status mutations, whose callers also report when the status changed.
+PROFESSIONAL_STATUS_COLUMNS = USER_RESPONSE_COLUMNS + (User.professional_status_updated_at,)
+# Columns behind UserSearch.sort; listings break ties on id so the order is total.
+SORT_COLUMNS = {"created_at": User.created_at, "email": User.email, "nickname": User.nickname}
+
+# Profile fields searched by the non-Postgres fallback, with their rank weights.
+SEARCH_FALLBACK_FIELDS = ((User.nickname, 4.0), (User.first_name, 2.0), (User.last_name, 2.0), (User.bio, 1.0))
+# Unique indexes on users, by the field a violation of each is reported against.
+UNIQUE_USER_INDEXES = {"ix_users_email": "email", "ix_users_nickname": "nickname"}
+
+class UserConflictError(ValueError):
+    """Raised when a write would duplicate another user's email or nickname."""
+
+    def __init__(self, field: str):
+        super().__init__(f"{field} already exists")
+        self.field = field
+
+def _unique_violation(error: IntegrityError) -> Optional[str]:
+    """
+    The user field whose unique index ``error`` violated, or None for any other
+    integrity error. asyncpg reports the index on the driver exception that the DBAPI
+    adapter wraps, so both are checked.
+    """
+    constraint = getattr(error.orig, "constraint_name", None) or getattr(error.orig.__cause__, "constraint_name", None)
+    return UNIQUE_USER_INDEXES.get(constraint)
+
 class UserService:
+    _count_cache: Optional[Tuple[int, float]] = None
+    _trigram_available: Optional[bool] = None
+
     @classmethod
-    async def _execute_query(cls, session: AsyncSession, query):
+    async def _commit(cls, session: AsyncSession):
+        """Commit, or only flush when the session belongs to a request unit of work (see get_db)."""
+        if session.info.get("unit_of_work"):
+            await session.flush()
+        else:
+            await session.commit()
+            await run_after_commit(session)
+
+    @classmethod
+    async def _execute_query(cls, session: AsyncSession, query, raise_errors: bool = False, before_commit: Optional[Callable] = None):
+        """
+        Execute and commit ``query``. ``before_commit``, when given, receives the result
+        before the commit and its return value is returned instead. A database error rolls
+        back and returns None, or is re-raised with ``raise_errors``; a unique violation on
+        email or nickname always raises UserConflictError.
+        """
         try:
             result = await session.execute(query)
-            await session.commit()
+            if before_commit is not None:
+                result = before_commit(result)
+            await cls._commit(session)
             return result
+        except SQLAlchemyError as e:
+            logger.error(f"Database error: {e}")
+            await session.rollback()
+            discard_after_commit(session)
+            field = _unique_violation(e) if isinstance(e, IntegrityError) else None
+            if field:
+                raise UserConflictError(field) from e
+            if raise_errors:
+                raise
+            return None
+
+    @classmethod
+    async def _execute_read(cls, session: AsyncSession, query):
+        """Run a read-only statement without ending the transaction."""
+        try:
+            return await session.execute(query)
         except SQLAlchemyError as e:
             logger.error(f"Database error: {e}")
             await session.rollback()
@@ -34,21 +115,97 @@ class UserService:
     @classmethod
     async def _fetch_user(cls, session: AsyncSession, **filters) -> Optional[User]:
         query = select(User).filter_by(**filters)
-        result = await cls._execute_query(session, query)
+        result = await cls._execute_read(session, query)
         return result.scalars().first() if result else None
 
     @classmethod
     async def get_by_id(cls, session: AsyncSession, user_id: UUID) -> Optional[User]:
         return await cls._fetch_user(session, id=user_id)
 
+    @classmethod
+    def response_columns(cls, fields: Optional[Sequence[str]] = None) -> tuple:
+        """
+        Columns behind the UserResponse ``fields`` (all of them when None), in response
+        order. ``id`` is always selected: links and pagination cursors are built from it.
+        """
+        if fields is None:
+            return USER_RESPONSE_COLUMNS
+        return tuple(column for column in USER_RESPONSE_COLUMNS if column.key in fields or column.key == "id")
+
+    @classmethod
+    async def get_response_by_id(cls, session: AsyncSession, user_id: UUID, fields: Optional[Sequence[str]] = None) -> Optional[Dict]:
+        """
+        The user's public UserResponse fields as a JSON-ready dict, read through the user
+        cache. Only the response columns are selected, so nothing sensitive is cached.
+
+        With ``fields``, a cache miss selects only those columns (plus ``id``) and returns
+        the plain row, which is not cached; a hit still returns every field. Rows read on a
+        replica are not cached either: it may lag behind a change whose invalidation has
+        already run, and caching its row would bring the old values back.
+        """
+        cache = get_user_cache()
+        if cache is not None:
+            cached = await cache.get(str(user_id))
+            if cached is not None:
+                return cached
+        result = await cls._execute_read(session, select(*cls.response_columns(fields)).where(User.id == user_id))
+        row = result.first() if result else None
+        if row is None:
+            return None
+        if fields is not None:
+            return row._asdict()
+        data = UserResponse.model_validate(row._asdict()).model_dump(mode="json", exclude={"links"})
+        if cache is not None and not session.info.get("replica"):
+            await cache.set(str(user_id), data)
+        return data
+
+    @classmethod
+    def _invalidate_user(cls, session: AsyncSession, user_id: UUID):
+        """Drop the user's cache entry once the pending change commits; call before committing."""
+        cache = get_user_cache()
+        if cache is not None:
+            on_commit(session, lambda: cache.delete(str(user_id)))
+
+    @classmethod
+    def _revoke_tokens_on_commit(cls, session: AsyncSession, email: str):
+        """Reject every token issued to ``email`` (the tokens' ``sub``) once the pending change commits; call before committing."""
+        async def revoke():
+            revoke_subject(email)
+        on_commit(session, revoke)
+
     @classmethod
     async def get_by_nickname(cls, session: AsyncSession, nickname: str) -> Optional[User]:
         return await cls._fetch_user(session, nickname=nickname)
 
     @classmethod
     async def get_by_email(cls, session: AsyncSession, email: str) -> Optional[User]:
+        """The full User entity, read uncached; use it for writes and checks, and ``get_response_by_email`` for reads."""
         return await cls._fetch_user(session, email=email)
 
+    @classmethod
+    async def get_response_by_email(cls, session: AsyncSession, email: str) -> Optional[Dict]:
+        """
+        Like ``get_response_by_id``, looked up by email. The cache keeps an ``email:`` entry
+        pointing at the user's id entry, and a hit counts only while that entry still carries
+        the same email, so invalidating the id entry also retires the email lookup.
+        """
+        cache = get_user_cache()
+        if cache is not None:
+            index = await cache.get(f"email:{email}")
+            if index is not None:
+                cached = await cache.get(index["id"])
+                if cached is not None and cached["email"] == email:
+                    return cached
+        result = await cls._execute_read(session, select(*cls.response_columns()).where(User.email == email))
+        row = result.first() if result else None
+        if row is None:
+            return None
+        data = UserResponse.model_validate(row._asdict()).model_dump(mode="json", exclude={"links"})
+        if cache is not None and not session.info.get("replica"):
+            await cache.set(data["id"], data)
+            await cache.set(f"email:{email}", {"id": data["id"]})
+        return data
+
     @classmethod
     async def create(cls, session: AsyncSession, user_data: Dict[str, str], email_service: EmailService) -> Optional[User]:
         try:
@@ -58,16 +215,15 @@ class UserService:
                 logger.error("User with given email already exists.")
                 return None
 
-            validated_data['hashed_password'] = hash_password(validated_data.pop('password'))
+            validated_data['hashed_password'] = await hash_password_async(validated_data.pop('password'))
             new_user = User(**validated_data)
             new_user.verification_token = generate_verification_token()
-            new_nickname = generate_nickname()
-            while await cls.get_by_nickname(session, new_nickname):
-                new_nickname = generate_nickname()
-            new_user.nickname = new_nickname
-            session.add(new_user)
-            await session.commit()
-            await email_service.send_verification_email(new_user)
+            if not await cls._insert_with_nickname(session, new_user):
+                logger.error("User with given email already exists.")
+                return None
+            await email_service.send_verification_email(new_user, session)
+            cls._invalidate_count_on_commit(session)
+            await cls._commit(session)
             logger.info(f"User created: {new_user.email}")
             return new_user
         except ValidationError as e:
@@ -75,123 +231,605 @@ class UserService:
             return None
 
     @classmethod
-    async def update(cls, session: AsyncSession, user_id: UUID, update_data: Dict[str, str]) -> Optional[User]:
+    async def _existing_values(cls, session: AsyncSession, column, values: Set[str]) -> Set[str]:
+        """Which of ``values`` are already taken in ``column``, in a single IN query."""
+        if not values:
+            return set()
+        result = await cls._execute_read(session, select(column).where(column.in_(values)))
+        return set(result.scalars().all()) if result else set()
+
+    @classmethod
+    async def _import_batch(cls, session: AsyncSession, batch: List[Tuple[int, Optional[Dict[str, str]]]],
+                            seen_emails: Set[str], seen_nicknames: Set[str],
+                            email_service: Optional[EmailService] = None) -> Tuple[List[Dict], int]:
+        """
+        Validate, check, hash and insert one batch, and hand its verification emails to
+        ``email_service``. Returns the batch's report rows and how many users it created.
+        """
+        report: Dict[int, Dict] = {}
+        valid: List[Tuple[int, Dict]] = []
+        for line, record in batch:
+            if record is None:
+                report[line] = {"line": line, "email": None, "status": "invalid", "errors": ["record could not be parsed"]}
+                continue
+            try:
+                data = UserCreate(**record).model_dump()
+            except ValidationError as e:
+                errors = [f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()]
+                report[line] = {"line": line, "email": record.get("email"), "status": "invalid", "errors": errors}
+                continue
+            if data["email"] in seen_emails:
+                report[line] = {"line": line, "email": data["email"], "status": "duplicate", "errors": ["email appears earlier in the import"]}
+                continue
+            seen_emails.add(data["email"])
+            valid.append((line, data))
+
+        taken_emails = await cls._existing_values(session, User.email, {data["email"] for _, data in valid})
+        rows = []
+        for line, data in valid:
+            if data["email"] in taken_emails:
+                report[line] = {"line": line, "email": data["email"], "status": "duplicate", "errors": ["email already exists"]}
+            else:
+                rows.append((line, data))
+
+        requested = {data["nickname"] for _, data in rows if data.get("nickname")}
+        taken_nicknames = seen_nicknames | await cls._existing_values(session, User.nickname, requested)
+        needs_nickname = []
+        for _, data in rows:
+            if data.get("nickname") and data["nickname"] not in taken_nicknames:
+                taken_nicknames.add(data["nickname"])
+            else:
+                needs_nickname.append(data)
+        fresh = await cls._allocate_nicknames(session, len(needs_nickname), taken_nicknames)
+        for data, nickname in zip(needs_nickname, fresh):
+            data["nickname"] = nickname
+        seen_nicknames.update(data["nickname"] for _, data in rows)
+
+        pool = get_hashing_pool()
+        chunk = max(1, pool.max_queue // 2)
+        hashes: List[str] = []
+        for start in range(0, len(rows), chunk):
+            hashes.extend(await asyncio.gather(*(hash_password_async(data["password"]) for _, data in rows[start:start + chunk])))
+
+        for (line, data), hashed in zip(rows, hashes):
+            data.pop("password")
+            data.update(id=uuid4(), hashed_password=hashed, verification_token=generate_verification_token())
+        if rows:
+            try:
+                async with session.begin_nested():
+                    await session.execute(insert(User), [data for _, data in rows])
+            except IntegrityError as e:
+                if _unique_violation(e) is None:
+                    raise
+                # A concurrent write took an email or nickname after the IN checks above.
+                rows = await cls._insert_rows(session, rows, report)
+        for line, data in rows:
+            report[line] = {"line": line, "email": data["email"], "status": "created", "id": data["id"]}
+        if rows and email_service is not None:
+            await email_service.send_verification_emails([User(**data) for _, data in rows], session)
+        return [report[line] for line, _ in batch], len(rows)
+
+    @classmethod
+    async def _insert_rows(cls, session: AsyncSession, rows: List[Tuple[int, Dict]], report: Dict[int, Dict]) -> List[Tuple[int, Dict]]:
+        """
+        Insert ``rows`` one at a time, each in its own SAVEPOINT, after their batch INSERT
+        hit a unique violation. Rows that conflict are reported as duplicates; the rows that
+        were inserted are returned.
+        """
+        inserted = []
+        for line, data in rows:
+            try:
+                async with session.begin_nested():
+                    await session.execute(insert(User), [data])
+            except IntegrityError as e:
+                field = _unique_violation(e)
+                if field is None:
+                    raise
+                report[line] = {"line": line, "email": data["email"], "status": "duplicate", "errors": [f"{field} already exists"]}
+                continue
+            inserted.append((line, data))
+        return inserted
+
+    @classmethod
+    async def _allocate_nicknames(cls, session: AsyncSession, count: int, taken: Set[str]) -> List[str]:
+        """
+        Generate ``count`` distinct nicknames not in ``taken`` nor the table.
+
+        Candidates are drawn in batches of at least ``nickname_candidate_batch`` and
+        checked with one IN query per batch. Raises RuntimeError if
+        ``nickname_max_attempts`` batches cannot supply enough free names.
+        """
+        allocated: List[str] = []
+        for _ in range(settings.nickname_max_attempts):
+            missing = count - len(allocated)
+            if missing <= 0:
+                break
+            size = max(settings.nickname_candidate_batch, 2 * missing)
+            candidates = {generate_nickname() for _ in range(size)} - taken
+            candidates -= await cls._existing_values(session, User.nickname, candidates)
+            for nickname in list(candidates)[:missing]:
+                allocated.append(nickname)
+                taken.add(nickname)
+        if len(allocated) < count:
+            raise RuntimeError("Could not allocate a free nickname; widen nickname_number_max")
+        return allocated
+
+    @classmethod
+    async def _insert_with_nickname(cls, session: AsyncSession, new_user: User) -> bool:
+        """
+        Insert ``new_user`` under a freshly allocated nickname. The INSERT runs in a
+        SAVEPOINT so that losing a race for the nickname to a concurrent registration
+        only retries with another name. Returns False if the email is taken instead.
+        """
+        taken: Set[str] = set()
+        for _ in range(settings.nickname_max_attempts):
+            [new_user.nickname] = await cls._allocate_nicknames(session, 1, taken)
+            try:
+                async with session.begin_nested():
+                    session.add(new_user)
+                return True
+            except IntegrityError as e:
+                if _unique_violation(e) != "nickname":
+                    return False
+                logger.info(f"Nickname {new_user.nickname} was taken concurrently, retrying.")
+        raise RuntimeError("Could not allocate a free nickname; widen nickname_number_max")
+
+    @classmethod
+    async def bulk_create(cls, session: AsyncSession, records: AsyncIterator[Optional[Dict[str, str]]], batch_size: int = 500,
+                          email_service: Optional[EmailService] = None) -> Tuple[List[Dict], int]:
+        """
+        Imports users from an async stream of records, ``batch_size`` at a time.
+
+        Each batch is validated with UserCreate, checked for email and nickname conflicts
+        with one IN query per column, hashed in parallel in the hashing pool and inserted
+        with a single multi-row INSERT in a SAVEPOINT. If a concurrent write makes that
+        INSERT hit a unique index, the batch is retried row by row and the conflicting rows
+        are reported as duplicates. When ``email_service`` is given, each batch's
+        verification emails are queued in the same transaction, or sent after the commit
+        when the outbox is disabled. Returns a per-record report, in input order, and the
+        number of users created.
+        """
+        report: List[Dict] = []
+        created = 0
+        seen_emails: Set[str] = set()
+        seen_nicknames: Set[str] = set()
+        batch: List[Tuple[int, Optional[Dict[str, str]]]] = []
+        line = 0
+        async for record in records:
+            line += 1
+            batch.append((line, record))
+            if len(batch) >= batch_size:
+                batch_report, batch_created = await cls._import_batch(session, batch, seen_emails, seen_nicknames, email_service)
+                report.extend(batch_report)
+                created += batch_created
+                batch = []
+        if batch:
+            batch_report, batch_created = await cls._import_batch(session, batch, seen_emails, seen_nicknames, email_service)
+            report.extend(batch_report)
+            created += batch_created
+        if created:
+            cls._invalidate_count_on_commit(session)
+            await cls._commit(session)
+        logger.info(f"Bulk import created {created} of {line} users.")
+        return report, created
+
+    @classmethod
+    async def _mutate(cls, session: AsyncSession, user_id: UUID, statement, raise_errors: bool = False,
+                      revoke_tokens: bool = False) -> Optional[Row]:
+        """
+        Run a single UPDATE or DELETE ... RETURNING for one user and commit it. Returns
+        the returned row, or None when no user matched or (without ``raise_errors``) the
+        statement failed. With ``revoke_tokens`` the statement must return ``email``, and
+        the user's tokens are revoked once the change commits.
+        """
+        cls._invalidate_user(session, user_id)
+
+        def first_row(result):
+            row = result.first()
+            if row is not None and revoke_tokens:
+                cls._revoke_tokens_on_commit(session, row.email)
+            return row
+
+        return await cls._execute_query(session, statement, raise_errors=raise_errors, before_commit=first_row)
+
+    @classmethod
+    async def update(cls, session: AsyncSession, user_id: UUID, update_data: Dict[str, str]) -> Optional[Row]:
+        """
+        Applies the update in one UPDATE ... RETURNING and returns the UserResponse columns,
+        or None for invalid data or a missing user. Raises UserConflictError when the new
+        email or nickname belongs to another user; other errors propagate, so a request's
+        unit of work rolls back and reports them instead of a 404. Changing the email (the
+        tokens' subject) or the password revokes the user's tokens.
+        """
         try:
             validated_data = UserUpdate(**update_data).model_dump(exclude_unset=True)
-            if 'password' in validated_data:
-                validated_data['hashed_password'] = hash_password(validated_data.pop('password'))
-
-            query = update(User).where(User.id == user_id).values(**validated_data).execution_options(synchronize_session="fetch")
-            await cls._execute_query(session, query)
-            updated_user = await cls.get_by_id(session, user_id)
-            if updated_user:
-                await session.refresh(updated_user)
-                logger.info(f"User {user_id} updated successfully.")
-                return updated_user
-            else:
-                logger.error(f"User {user_id} not found after update attempt.")
-            return None
-        except Exception as e:
-            logger.error(f"Error during user update: {e}")
+        except ValidationError as e:
+            logger.error(f"Validation error during user update: {e}")
             return None
+        if 'password' in validated_data:
+            validated_data['hashed_password'] = await hash_password_async(validated_data.pop('password'))
+
+        revoke_tokens = 'email' in validated_data or 'hashed_password' in validated_data
+        if 'email' in validated_data:
+            # RETURNING only sees the new email; tokens were issued to the old one.
+            old_email = (await session.execute(select(User.email).where(User.id == user_id))).scalar()
+            if old_email is not None:
+                cls._revoke_tokens_on_commit(session, old_email)
+
+        query = update(User).where(User.id == user_id).values(**validated_data).returning(*USER_RESPONSE_COLUMNS)
+        updated_user = await cls._mutate(session, user_id, query, raise_errors=True, revoke_tokens=revoke_tokens)
+        if updated_user:
+            logger.info(f"User {user_id} updated successfully.")
+            return updated_user
+        logger.error(f"User {user_id} not found after update attempt.")
+        return None
 
     @classmethod
     async def delete(cls, session: AsyncSession, user_id: UUID) -> bool:
-        user = await cls.get_by_id(session, user_id)
-        if not user:
+        # Registered up front: _mutate commits (and runs callbacks) itself outside a unit of work.
+        cls._invalidate_count_on_commit(session)
+        deleted = await cls._mutate(session, user_id, delete(User).where(User.id == user_id).returning(User.id, User.email),
+                                    revoke_tokens=True)
+        if not deleted:
             logger.info(f"User with ID {user_id} not found.")
             return False
-        await session.delete(user)
-        await session.commit()
         return True
 
     @classmethod
-    async def list_users(cls, session: AsyncSession, skip: int = 0, limit: int = 10) -> List[User]:
-        query = select(User).offset(skip).limit(limit)
-        result = await cls._execute_query(session, query)
-        return result.scalars().all() if result else []
+    def _select_users(cls, columns: Optional[Sequence] = None):
+        """SELECT of whole User entities, or of plain rows with only ``columns`` when given."""
+        return select(*columns) if columns else select(User)
+
+    @classmethod
+    def _rows(cls, result, columns: Optional[Sequence] = None) -> list:
+        if not result:
+            return []
+        return list(result.all()) if columns else list(result.scalars().all())
+
+    @classmethod
+    def _prefix_pattern(cls, prefix: str) -> str:
+        """Lower-cased LIKE pattern for values starting with ``prefix``, its wildcards escaped."""
+        escaped = prefix.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return escaped + "%"
+
+    @classmethod
+    def _search_conditions(cls, search: Optional[UserSearch]) -> list:
+        """WHERE clauses for ``search``; each is served by one of the indexes declared on User."""
+        if search is None:
+            return []
+        conditions = []
+        if search.role is not None:
+            conditions.append(User.role == UserRole(search.role.value))
+        for name in ("email_verified", "is_professional", "is_locked"):
+            value = getattr(search, name)
+            if value is not None:
+                conditions.append(getattr(User, name) == value)
+        if search.created_after is not None:
+            conditions.append(User.created_at >= search.created_after)
+        if search.created_before is not None:
+            conditions.append(User.created_at < search.created_before)
+        if search.email_prefix:
+            conditions.append(func.lower(User.email).like(cls._prefix_pattern(search.email_prefix)))
+        if search.nickname_prefix:
+            conditions.append(func.lower(User.nickname).like(cls._prefix_pattern(search.nickname_prefix)))
+        return conditions
+
+    @classmethod
+    def _sort_key(cls, sort: str) -> Tuple[object, bool]:
+        """The column named by a UserSearch sort key and whether it sorts descending."""
+        return SORT_COLUMNS[sort.lstrip("-")], sort.startswith("-")
+
+    @classmethod
+    async def list_users(cls, session: AsyncSession, skip: int = 0, limit: int = 10, columns: Optional[Sequence] = None,
+                         search: Optional[UserSearch] = None) -> List[User]:
+        """
+        Returns one page of users by offset, filtered and sorted by ``search`` (by
+        creation time when not given). With ``columns`` (e.g. USER_RESPONSE_COLUMNS)
+        only those columns are selected and plain rows are returned, skipping ORM
+        entity construction and the identity map.
+        """
+        column, descending = cls._sort_key(search.sort if search else "created_at")
+        order = (column.desc(), User.id.desc()) if descending else (column, User.id)
+        query = cls._select_users(columns).where(*cls._search_conditions(search))
+        query = query.order_by(*order).offset(skip).limit(limit)
+        result = await cls._execute_read(session, query)
+        return cls._rows(result, columns)
+
+    @classmethod
+    async def list_users_keyset(cls, session: AsyncSession, limit: int = 10, cursor: Optional[PageCursor] = None, columns: Optional[Sequence] = None,
+                                search: Optional[UserSearch] = None) -> Tuple[List[User], bool, bool]:
+        """
+        Returns one page ordered by ``(sort column, id)`` plus whether pages exist after and before it.
+
+        The page is located with a row comparison against the cursor key, served by
+        ``ix_users_created_at_id`` (or the unique email/nickname index), so deep pages
+        cost the same as the first one. ``search`` filters and sorts as in
+        :meth:`list_users`; a cursor taken under another sort key raises ValueError.
+        ``columns`` works as in :meth:`list_users`; the key columns are always included
+        so the caller can build cursors from the rows.
+        """
+        sort = search.sort if search else "created_at"
+        cursor = cursor or PageCursor(sort=sort)
+        if cursor.has_key and cursor.sort != sort:
+            raise ValueError("Pagination cursor belongs to another sort order")
+        column, descending = cls._sort_key(sort)
+        key = tuple_(column, User.id)
+        if columns:
+            selected = {c.key for c in columns}
+            columns = tuple(columns) + tuple(c for c in (column, User.id) if c.key not in selected)
+        query = cls._select_users(columns).where(*cls._search_conditions(search))
+        # Walk the index upwards for "next" on an ascending sort or "prev" on a descending one.
+        if (cursor.direction == "next") != descending:
+            if cursor.has_key:
+                query = query.where(key > tuple_(cursor.value, cursor.id))
+            query = query.order_by(column, User.id)
+        else:
+            if cursor.has_key:
+                query = query.where(key < tuple_(cursor.value, cursor.id))
+            query = query.order_by(column.desc(), User.id.desc())
+        result = await cls._execute_read(session, query.limit(limit + 1))
+        users = cls._rows(result, columns)
+        has_more = len(users) > limit
+        users = users[:limit]
+        if cursor.direction == "next":
+            return users, has_more, cursor.has_key
+        users.reverse()
+        return users, cursor.has_key, has_more
+
+    @classmethod
+    async def stream_users(cls, session: AsyncSession, columns: Sequence = USER_RESPONSE_COLUMNS,
+                           filters: Optional[Dict[str, object]] = None, batch_size: int = 1000) -> AsyncIterator[List[Row]]:
+        """
+        Yields every matching user as batches of projected rows, read through a
+        server-side cursor so memory stays flat however large the table is.
+        """
+        query = select(*columns).filter_by(**(filters or {})).order_by(User.created_at, User.id)
+        result = await session.stream(query.execution_options(yield_per=batch_size))
+        async for batch in result.partitions():
+            yield batch
+
+    @classmethod
+    async def _has_trigram(cls, session: AsyncSession) -> bool:
+        """Whether pg_trgm is installed, checked once per process."""
+        if cls._trigram_available is None:
+            query = text("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')")
+            cls._trigram_available = bool((await session.execute(query)).scalar())
+        return cls._trigram_available
+
+    @classmethod
+    async def _profile_match(cls, session: AsyncSession, terms: str):
+        """
+        The (rank, WHERE clause) pair for a profile search.
+
+        On Postgres the terms are matched against ``search_vector`` (GIN index) and the
+        nickname by trigram similarity, so typos still find it; without pg_trgm the
+        nickname is matched by prefix instead. Other databases, such as SQLite test runs,
+        fall back to weighted LIKE matches on the profile fields.
+        """
+        if session.get_bind().dialect.name == "postgresql":
+            tsquery = func.websearch_to_tsquery("simple", terms)
+            rank = func.ts_rank(User.search_vector, tsquery)
+            match = User.search_vector.bool_op("@@")(tsquery)
+            if await cls._has_trigram(session):
+                return rank + func.similarity(User.nickname, terms), or_(match, User.nickname.bool_op("%")(terms))
+            return rank, or_(match, func.lower(User.nickname).like(cls._prefix_pattern(terms)))
+        return cls._like_profile_match(terms)
+
+    @classmethod
+    def _like_profile_match(cls, terms: str):
+        """Portable (rank, WHERE clause): each term found in a field adds that field's weight."""
+        rank = cast(sum(
+            case((func.lower(column).like("%" + cls._prefix_pattern(term), escape="\\"), weight), else_=0.0)
+            for term in terms.split() for column, weight in SEARCH_FALLBACK_FIELDS
+        ), Float)
+        return rank, rank > 0
+
+    @classmethod
+    async def search_profiles(cls, session: AsyncSession, terms: str, limit: int = 10, cursor: Optional[PageCursor] = None,
+                              columns: Sequence = USER_RESPONSE_COLUMNS) -> Tuple[List[Row], bool]:
+        """
+        Returns one page of users matching ``terms`` across nickname, names and bio, best
+        match first, plus whether another page follows. Rows carry ``columns`` and their
+        ``rank``. Pages are keyset-paginated on ``(rank, id)``: pass a cursor with
+        ``sort="rank"`` built from the last row of the previous page.
+        """
+        terms = terms.strip()
+        if not terms:
+            return [], False
+        rank, match = await cls._profile_match(session, terms)
+        rank = rank.label("rank")
+        query = select(*columns, rank).where(match)
+        if cursor is not None and cursor.has_key:
+            if cursor.sort != "rank":
+                raise ValueError("Pagination cursor belongs to another sort order")
+            query = query.where(tuple_(rank, User.id) < tuple_(cursor.value, cursor.id))
+        query = query.order_by(rank.desc(), User.id.desc()).limit(limit + 1)
+        result = await cls._execute_read(session, query)
+        rows = cls._rows(result, columns)
+        return rows[:limit], len(rows) > limit
 
     @classmethod
     async def register_user(cls, session: AsyncSession, user_data: Dict[str, str], email_service: EmailService) -> Optional[User]:
         return await cls.create(session, user_data, email_service)
 
     @classmethod
-    async def login_user(cls, session: AsyncSession, email: str, password: str) -> Optional[User]:
-        user = await cls.get_by_email(session, email)
-        if user:
-            if not user.email_verified or user.is_locked:
-                return None
-            if verify_password(password, user.hashed_password):
-                user.failed_login_attempts = 0
-                user.last_login_at = datetime.now(timezone.utc)
-                session.add(user)
-                await session.commit()
-                return user
-            else:
-                user.failed_login_attempts += 1
-                if user.failed_login_attempts >= settings.max_login_attempts:
-                    user.is_locked = True
-                session.add(user)
-                await session.commit()
-        return None
+    async def authenticate(cls, session: AsyncSession, email: str, password: str) -> Tuple[LoginOutcome, Optional[Row]]:
+        """
+        Checks credentials with a single SELECT of the columns login needs and one UPDATE.
+
+        Locked and unverified accounts are rejected before bcrypt runs, and a success is only
+        recorded if the account is still unlocked afterwards (``WHERE is_locked IS NOT TRUE``). Failed attempts
+        increment the counter and set the lock flag in one conditional UPDATE, so
+        concurrent failures cannot race past ``max_login_attempts``; the attempt that locks
+        the account also revokes the user's tokens. It always commits
+        itself: a failed attempt must be recorded even though the request then fails.
+        With a login write-behind buffer, a success with no failures to reset re-reads the
+        lock and counter, then only queues its ``last_login_at``; resetting a non-zero
+        counter is never deferred.
+        """
+        query = select(
+            User.id, User.email, User.role, User.hashed_password,
+            User.is_locked, User.email_verified, User.failed_login_attempts
+        ).where(User.email == email)
+        result = await session.execute(query)
+        user = result.first()
+        if user is None:
+            return LoginOutcome.INVALID_CREDENTIALS, None
+        if user.is_locked:
+            return LoginOutcome.LOCKED, None
+        if not user.email_verified:
+            return LoginOutcome.UNVERIFIED, None
+
+        if await verify_password_async(password, user.hashed_password):
+            # Concurrent failures may have locked the account while bcrypt ran, so the lock is
+            # checked again by the statement that records the success.
+            buffer = get_login_activity_buffer()
+            if buffer is not None and not user.failed_login_attempts:
+                current = (await session.execute(
+                    select(User.is_locked, User.failed_login_attempts).where(User.id == user.id)
+                )).first()
+                if current is None or current.is_locked:
+                    return LoginOutcome.LOCKED, None
+                if not current.failed_login_attempts:
+                    # Nothing lockout-relevant to reset, so last_login_at can be written behind.
+                    buffer.record(user.id)
+                    return LoginOutcome.SUCCESS, user
+            query = update(User).where(User.id == user.id, User.is_locked.isnot(True)).values(
+                failed_login_attempts=0,
+                last_login_at=datetime.now(timezone.utc)
+            ).returning(User.id).execution_options(synchronize_session=False)
+            reset = (await session.execute(query)).first()
+            await session.commit()
+            if reset is None:
+                return LoginOutcome.LOCKED, None
+            return LoginOutcome.SUCCESS, user
+
+        attempts = func.coalesce(User.failed_login_attempts, 0) + 1
+        query = update(User).where(User.id == user.id, User.is_locked.isnot(True)).values(
+            failed_login_attempts=attempts,
+            is_locked=attempts >= settings.max_login_attempts
+        ).returning(User.is_locked).execution_options(synchronize_session=False)
+        locked = (await session.execute(query)).scalar()
+        if locked:
+            cls._invalidate_user(session, user.id)
+            cls._revoke_tokens_on_commit(session, user.email)
+        await session.commit()
+        await run_after_commit(session)
+        return LoginOutcome.INVALID_CREDENTIALS, None
+
+    @classmethod
+    async def login_user(cls, session: AsyncSession, email: str, password: str) -> Optional[Row]:
+        outcome, user = await cls.authenticate(session, email, password)
+        return user if outcome is LoginOutcome.SUCCESS else None
 
     @classmethod
     async def is_account_locked(cls, session: AsyncSession, email: str) -> bool:
-        user = await cls.get_by_email(session, email)
-        return user.is_locked if user else False
+        # A column read, not the session's User object, which authenticate's UPDATEs leave as loaded.
+        result = await session.execute(select(User.is_locked).where(User.email == email))
+        return bool(result.scalar())
 
     @classmethod
     async def reset_password(cls, session: AsyncSession, user_id: UUID, new_password: str) -> bool:
-        hashed_password = hash_password(new_password)
-        user = await cls.get_by_id(session, user_id)
-        if user:
-            user.hashed_password = hashed_password
-            user.failed_login_attempts = 0
-            user.is_locked = False
-            session.add(user)
-            await session.commit()
+        hashed_password = await hash_password_async(new_password)
+        query = update(User).where(User.id == user_id).values(
+            hashed_password=hashed_password,
+            failed_login_attempts=0,
+            is_locked=False
+        ).returning(User.id, User.email)
+        if await cls._mutate(session, user_id, query, revoke_tokens=True):
             logger.info(f"Password reset for user: {user_id}")
             return True
         return False
 
     @classmethod
     async def verify_email_with_token(cls, session: AsyncSession, user_id: UUID, token: str) -> bool:
-        user = await cls.get_by_id(session, user_id)
-        if user and user.verification_token == token:
-            user.email_verified = True
-            user.verification_token = None
-            user.role = UserRole.AUTHENTICATED
-            session.add(user)
-            await session.commit()
+        query = update(User).where(User.id == user_id, User.verification_token == token).values(
+            email_verified=True,
+            verification_token=None,
+            role=UserRole.AUTHENTICATED
+        ).returning(User.id)
+        if await cls._mutate(session, user_id, query):
             logger.info(f"Email verified for user: {user_id}")
             return True
         return False
 
     @classmethod
-    async def count(cls, session: AsyncSession) -> int:
-        query = select(func.count()).select_from(User)
-        result = await session.execute(query)
+    async def count(cls, session: AsyncSession, search: Optional[UserSearch] = None) -> int:
+        query = select(func.count()).select_from(User).where(*cls._search_conditions(search))
+        result = await cls._execute_read(session, query)
         return result.scalar()
 
+    @classmethod
+    def invalidate_count_cache(cls):
+        cls._count_cache = None
+
+    @classmethod
+    def _invalidate_count_on_commit(cls, session: AsyncSession):
+        """Drop the cached count once the pending change commits, so no request re-caches the old total."""
+        async def invalidate():
+            cls.invalidate_count_cache()
+        on_commit(session, invalidate)
+
+    @classmethod
+    async def _estimated_count(cls, session: AsyncSession) -> Optional[int]:
+        """Row estimate from planner statistics; None when unavailable (not Postgres, or never analyzed)."""
+        if session.get_bind().dialect.name != "postgresql":
+            return None
+        query = text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:table AS regclass)")
+        result = await cls._execute_read(session, query.bindparams(table=User.__tablename__))
+        estimate = result.scalar() if result else None
+        return estimate if estimate is not None and estimate >= 0 else None
+
+    @classmethod
+    async def count_with_strategy(cls, session: AsyncSession, strategy: Optional[str] = None,
+                                  search: Optional[UserSearch] = None) -> Tuple[int, str]:
+        """
+        Returns the user total and the strategy actually used to get it.
+
+        ``exact`` runs ``count(*)``. ``cached`` reuses an exact count for
+        ``user_count_cache_ttl`` seconds; create and delete invalidate it. ``estimated``
+        reads the planner's row estimate and falls back to an exact count when there
+        is none. Totals for a filtered ``search`` are always exact, since neither the cache
+        nor the planner estimate applies to a subset.
+        """
+        strategy = strategy or settings.user_count_strategy
+        if strategy not in COUNT_STRATEGIES:
+            raise ValueError(f"Unknown count strategy: {strategy}")
+        if search is not None and search.is_filtered:
+            return await cls.count(session, search), "exact"
+        if strategy == "estimated":
+            estimate = await cls._estimated_count(session)
+            if estimate is not None:
+                return estimate, "estimated"
+            strategy = "exact"
+        if strategy == "cached":
+            cached = cls._count_cache
+            if cached is not None and time.monotonic() - cached[1] < settings.user_count_cache_ttl:
+                return cached[0], "cached"
+            total = await cls.count(session)
+            cls._count_cache = (total, time.monotonic())
+            return total, "cached"
+        return await cls.count(session), "exact"
+
     @classmethod
     async def unlock_user_account(cls, session: AsyncSession, user_id: UUID) -> bool:
-        user = await cls.get_by_id(session, user_id)
-        if user and user.is_locked:
-            user.is_locked = False
-            user.failed_login_attempts = 0
-            session.add(user)
-            await session.commit()
+        query = update(User).where(User.id == user_id, User.is_locked.is_(True)).values(
+            is_locked=False,
+            failed_login_attempts=0
+        ).returning(User.id)
+        if await cls._mutate(session, user_id, query):
             logger.info(f"Account unlocked for user: {user_id}")
             return True
         return False
 
     @classmethod
-    async def update_professional_status(cls, session: AsyncSession, user_id: UUID, status: bool) -> Optional[User]:
-        user = await cls.get_by_id(session, user_id)
+    async def update_professional_status(cls, session: AsyncSession, user_id: UUID, status: bool) -> Optional[Row]:
+        query = update(User).where(User.id == user_id).values(
+            is_professional=status,
+            professional_status_updated_at=func.now()
+        ).returning(*PROFESSIONAL_STATUS_COLUMNS)
+        user = await cls._mutate(session, user_id, query, revoke_tokens=True)
         if user:
-            user.update_professional_status(status)
-            session.add(user)
-            await session.commit()
             logger.info(f"Updated professional status for user {user_id} to {status}.")
             return user
         logger.warning(f"User not found for professional status update: {user_id}")
@@ -203,14 +841,9 @@ class UserService:
             logger.warning(f"Unauthorized role '{role}' attempted professional upgrade.")
             return False
 
-        user = await cls.get_by_id(session, user_id)
+        user = await cls.update_professional_status(session, user_id, True)
         if not user:
             logger.warning(f"User with ID {user_id} not found for professional upgrade.")
             return False
-
-        user.update_professional_status(True)
-        session.add(user)
-        await session.commit()
-        await session.refresh(user)
         logger.info(f"User {user_id} upgraded to professional by {role}")
         return user
@@ -0,0 +1,46 @@
+from builtins import ValueError, dict, isinstance, len, next, zip
+import codecs
+import csv
+import json
+from typing import AsyncIterator, Dict, Optional
+
+IMPORT_FORMATS = ("ndjson", "csv")
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Split a stream of UTF-8 byte chunks into lines without buffering the whole body."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer.rstrip("\r")
+
+async def iter_records(chunks: AsyncIterator[bytes], format: str) -> AsyncIterator[Optional[Dict[str, str]]]:
+    """
+    Yield one dict per NDJSON object or CSV row (keyed by the header row). Blank lines
+    are skipped, empty CSV cells are left out, and a record that cannot be parsed is
+    yielded as None so it still gets a line in the import report. CSV records are
+    read one per line, so quoted fields cannot contain newlines.
+    """
+    header = None
+    async for line in iter_lines(chunks):
+        if not line.strip():
+            continue
+        if format == "ndjson":
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            yield record if isinstance(record, dict) else None
+        elif header is None:
+            header = [name.strip() for name in next(csv.reader([line]))]
+        else:
+            values = next(csv.reader([line]))
+            if len(values) != len(header):
+                yield None
+            else:
+                yield {name: value for name, value in zip(header, values) if value != ""}
@@ -0,0 +1,25 @@
+import csv
+import io
+from typing import Iterable, List, Optional
+
+from pydantic import BaseModel
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+def models_to_ndjson(items: Iterable[BaseModel], fieldnames: Optional[List[str]] = None) -> str:
+    """Serialize models as newline-delimited JSON, one object per line, limited to ``fieldnames`` if given."""
+    include = set(fieldnames) if fieldnames is not None else None
+    return "".join(item.model_dump_json(include=include) + "\n" for item in items)
+
+def models_to_csv(items: Iterable[BaseModel], fieldnames: List[str], header: bool = False) -> str:
+    """Serialize models as CSV rows, optionally preceded by the header row."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames, extrasaction="ignore")
+    if header:
+        writer.writeheader()
+    for item in items:
+        writer.writerow(item.model_dump(mode="json"))
+    return buffer.getvalue()
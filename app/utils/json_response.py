@@ -0,0 +1,42 @@
+from builtins import ImportError, TypeError, bytes, int, isinstance, str, type
+from typing import Any, Mapping, Optional
+from uuid import UUID
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _orjson_default(value: Any):
+    # orjson only serializes uuid.UUID itself; asyncpg returns its own UUID subclass.
+    if isinstance(value, UUID):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response for content that already has the response model's shape, returned from
+    a route so FastAPI skips its response_model validation and jsonable_encoder pass.
+
+    With orjson installed the content is dumped directly (it handles UUIDs, enums and
+    datetimes). Without it, ``adapter`` validates the content once and dumps it to bytes;
+    failing that, it goes through jsonable_encoder like a plain JSONResponse.
+    """
+
+    def __init__(self, content: Any, adapter: Optional[TypeAdapter] = None, status_code: int = 200,
+                 headers: Optional[Mapping[str, str]] = None):
+        self.adapter = adapter
+        super().__init__(content, status_code=status_code, headers=headers)
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        if orjson is not None:
+            return orjson.dumps(content, default=_orjson_default)
+        if self.adapter is not None:
+            return self.adapter.dump_json(self.adapter.validate_python(content))
+        return super().render(jsonable_encoder(content))
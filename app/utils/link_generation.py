@@ -1,11 +1,12 @@
-from builtins import dict, int, max, str
-from typing import List, Callable
+from builtins import dict, int, len, max, str, tuple
+from typing import List, Callable, Optional, Tuple
 from urllib.parse import urlencode
 from uuid import UUID
+import weakref
 
 from fastapi import Request
 from app.schemas.link_schema import Link
-from app.schemas.pagination_schema import PaginationLink
+from app.schemas.pagination_schema import PageCursor, PaginationLink
 
 # Utility function to create a link
 def create_link(rel: str, href: str, method: str = "GET", action: str = None) -> Link:
@@ -14,35 +15,106 @@ def create_link(rel: str, href: str, method: str = "GET", action: str = None) ->
 def create_pagination_link(rel: str, base_url: str, params: dict) -> PaginationLink:
     # Ensure parameters are added in a specific order
     query_string = f"skip={params['skip']}&limit={params['limit']}"
+    extra = {name: value for name, value in params.items() if name not in ("skip", "limit")}
+    if extra:
+        query_string = f"{query_string}&{urlencode(extra)}"
     return PaginationLink(rel=rel, href=f"{base_url}?{query_string}")
 
-def create_user_links(user_id: UUID, request: Request) -> List[Link]:
+def create_cursor_pagination_link(rel: str, base_url: str, cursor: str, limit: int, params: Optional[dict] = None) -> PaginationLink:
+    query_string = urlencode({"cursor": cursor, "limit": limit, **(params or {})})
+    return PaginationLink(rel=rel, href=f"{base_url}?{query_string}")
+
+# (rel, route name, method, action) of the links every user response carries.
+USER_LINK_ROUTES = (
+    ("self", "get_user", "GET", "view"),
+    ("update", "update_user", "PUT", "update"),
+    ("delete", "delete_user", "DELETE", "delete"),
+)
+
+_USER_ID_MARKER = "00000000-0000-0000-0000-00000000user"
+# Base URLs come from the Host header, so only this many are cached per app.
+MAX_CACHED_BASE_URLS = 32
+_user_link_templates: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+def user_link_templates(request: Request) -> Tuple[Tuple[str, str, str], ...]:
     """
-    Generate navigation links for user actions.
+    ``(rel, href template, action)`` for each of USER_LINK_ROUTES, with a ``{user_id}``
+    placeholder. Routes are resolved with ``url_for`` once per app and base URL; after
+    that a user's links are plain string formatting.
     """
-    actions = [
-        ("self", "get_user", "GET", "view"),
-        ("update", "update_user", "PUT", "update"),
-        ("delete", "delete_user", "DELETE", "delete")
-    ]
+    per_app = _user_link_templates.setdefault(request.app, {})
+    base_url = str(request.base_url)
+    templates = per_app.get(base_url)
+    if templates is None:
+        templates = tuple(
+            (rel, str(request.url_for(name, user_id=_USER_ID_MARKER)).replace("{", "{{").replace("}", "}}").replace(_USER_ID_MARKER, "{user_id}"), action)
+            for rel, name, method, action in USER_LINK_ROUTES
+        )
+        if len(per_app) < MAX_CACHED_BASE_URLS:
+            per_app[base_url] = templates
+    return templates
+
+def user_link_dicts(user_id: UUID, request: Request) -> List[dict]:
+    """
+    The user's links as plain dicts, skipping Link model validation: for responses that
+    are validated or serialized as a whole anyway, such as listing items.
+    """
+    user_id = str(user_id)
     return [
-        create_link(rel, str(request.url_for(action, user_id=str(user_id))), method, action_desc)
-        for rel, action, method, action_desc in actions
+        {"rel": rel, "href": template.format(user_id=user_id), "action": action, "type": "application/json"}
+        for rel, template, action in user_link_templates(request)
     ]
 
-def generate_pagination_links(request: Request, skip: int, limit: int, total_items: int) -> List[PaginationLink]:
-    base_url = str(request.url)
+def create_user_links(user_id: UUID, request: Request) -> List[Link]:
+    """
+    Generate navigation links for user actions.
+    """
+    user_id = str(user_id)
+    return [create_link(rel, template.format(user_id=user_id), action=action) for rel, template, action in user_link_templates(request)]
+
+def generate_pagination_links(request: Request, skip: int, limit: int, total_items: int,
+                              next_cursor: Optional[str] = None, prev_cursor: Optional[str] = None,
+                              cursor_mode: bool = False, params: Optional[dict] = None) -> List[PaginationLink]:
+    """
+    Build self/first/last/next/prev links for a listing.
+
+    In offset mode the links carry ``skip``/``limit``. In cursor mode they carry opaque
+    ``cursor`` values instead; ``next_cursor``/``prev_cursor`` are only emitted when
+    such a page exists. ``params`` (filters, sort key) are carried by every link.
+    """
+    base_url = str(request.url).split("?", 1)[0]
+    params = params or {}
+    if cursor_mode:
+        links = [
+            PaginationLink(rel="self", href=str(request.url)),
+            create_cursor_pagination_link("first", base_url, PageCursor().encode(), limit, params),
+            create_cursor_pagination_link("last", base_url, PageCursor(direction="prev").encode(), limit, params)
+        ]
+        if next_cursor:
+            links.append(create_cursor_pagination_link("next", base_url, next_cursor, limit, params))
+        if prev_cursor:
+            links.append(create_cursor_pagination_link("prev", base_url, prev_cursor, limit, params))
+        return links
+
     total_pages = (total_items + limit - 1) // limit
     links = [
-        create_pagination_link("self", base_url, {'skip': skip, 'limit': limit}),
-        create_pagination_link("first", base_url, {'skip': 0, 'limit': limit}),
-        create_pagination_link("last", base_url, {'skip': max(0, (total_pages - 1) * limit), 'limit': limit})
+        create_pagination_link("self", base_url, {'skip': skip, 'limit': limit, **params}),
+        create_pagination_link("first", base_url, {'skip': 0, 'limit': limit, **params}),
+        create_pagination_link("last", base_url, {'skip': max(0, (total_pages - 1) * limit), 'limit': limit, **params})
     ]
 
     if skip + limit < total_items:
-        links.append(create_pagination_link("next", base_url, {'skip': skip + limit, 'limit': limit}))
+        links.append(create_pagination_link("next", base_url, {'skip': skip + limit, 'limit': limit, **params}))
 
     if skip > 0:
-        links.append(create_pagination_link("prev", base_url, {'skip': max(skip - limit, 0), 'limit': limit}))
+        links.append(create_pagination_link("prev", base_url, {'skip': max(skip - limit, 0), 'limit': limit, **params}))
+
+    return links
 
+def generate_search_links(request: Request, limit: int, next_cursor: Optional[str], params: dict) -> List[PaginationLink]:
+    """Build self/next links for ranked search results, which are only paged forwards."""
+    links = [PaginationLink(rel="self", href=str(request.url))]
+    if next_cursor:
+        base_url = str(request.url).split("?", 1)[0]
+        links.append(create_cursor_pagination_link("next", base_url, next_cursor, limit, params))
     return links
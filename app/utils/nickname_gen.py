@@ -1,10 +1,38 @@
-from builtins import str
+from builtins import int, len, str
 import random
+from settings.config import settings
 
+ADJECTIVES = (
+    "agile", "amber", "ancient", "azure", "bold", "brave", "breezy", "bright",
+    "calm", "candid", "cheerful", "clever", "cosmic", "crisp", "curious", "daring",
+    "dashing", "eager", "electric", "fancy", "fearless", "fierce", "gentle", "gleaming",
+    "golden", "graceful", "happy", "hidden", "humble", "jolly", "keen", "kind",
+    "lively", "lucky", "lunar", "merry", "mighty", "misty", "modest", "nimble",
+    "noble", "polite", "proud", "quick", "quiet", "rapid", "rustic", "shiny",
+    "silent", "silver", "sly", "smooth", "snowy", "solar", "spry", "steady",
+    "stellar", "sunny", "swift", "tidy", "vivid", "wandering", "witty", "zesty",
+)
 
-def generate_nickname() -> str:
+ANIMALS = (
+    "alpaca", "badger", "beaver", "bison", "bobcat", "camel", "cheetah", "cobra",
+    "condor", "cougar", "coyote", "crane", "dingo", "dolphin", "eagle", "falcon",
+    "ferret", "finch", "fox", "gazelle", "gecko", "gibbon", "heron", "hippo",
+    "ibex", "iguana", "jackal", "jaguar", "koala", "lemur", "leopard", "lion",
+    "llama", "lynx", "marmot", "meerkat", "mink", "moose", "narwhal", "ocelot",
+    "orca", "osprey", "otter", "owl", "panda", "panther", "parrot", "pelican",
+    "penguin", "puffin", "quokka", "rabbit", "raccoon", "raven", "seal", "sparrow",
+    "stork", "tapir", "tiger", "toucan", "turtle", "walrus", "wombat", "yak",
+)
+
+
+def nickname_space_size(number_max: int = None) -> int:
+    """Number of distinct nicknames generate_nickname() can produce."""
+    number_max = settings.nickname_number_max if number_max is None else number_max
+    return len(ADJECTIVES) * len(ANIMALS) * (number_max + 1)
+
+
+def generate_nickname(number_max: int = None) -> str:
     """Generate a URL-safe nickname using adjectives and animal names."""
-    adjectives = ["clever", "jolly", "brave", "sly", "gentle"]
-    animals = ["panda", "fox", "raccoon", "koala", "lion"]
-    number = random.randint(0, 999)
-    return f"{random.choice(adjectives)}_{random.choice(animals)}_{number}"
+    number_max = settings.nickname_number_max if number_max is None else number_max
+    number = random.randint(0, number_max)
+    return f"{random.choice(ADJECTIVES)}_{random.choice(ANIMALS)}_{number}"
@@ -1,8 +1,13 @@
 # app/security.py
-from builtins import Exception, ValueError, bool, int, str
+from builtins import Exception, RuntimeError, ValueError, bool, dict, int, max, str
+import asyncio
 import secrets
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
 import bcrypt
 from logging import getLogger
+from settings.config import settings
 
 # Set up logging
 logger = getLogger(__name__)
@@ -49,5 +54,114 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         logger.error("Error verifying password: %s", e)
         raise ValueError("Authentication process encountered an unexpected error") from e
 
+class PasswordHashingBusyError(RuntimeError):
+    """Raised when the password hashing pool already has its maximum number of queued jobs."""
+
+
+class PasswordHashingPool:
+    """
+    Bounded worker pool that runs bcrypt hashing and verification off the event loop.
+
+    bcrypt is deliberately slow, so calling it from a coroutine stalls every other
+    request served by the same event loop. Jobs are submitted to a thread or process
+    pool instead, and the number of jobs in flight is capped so a login burst is
+    rejected early rather than piling up behind the workers.
+    """
+
+    def __init__(self, workers: int = 4, max_queue: int = 64, executor: str = "thread"):
+        if executor not in ("thread", "process"):
+            raise ValueError(f"Unknown password hashing executor: {executor}")
+        self.workers = workers
+        self.max_queue = max_queue
+        self.executor_type = executor
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._metrics = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0, "peak_in_flight": 0}
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_type == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    def _acquire(self):
+        with self._lock:
+            if self._in_flight >= self.max_queue:
+                self._metrics["rejected"] += 1
+                raise PasswordHashingBusyError("Password hashing queue is full")
+            self._in_flight += 1
+            self._metrics["submitted"] += 1
+            self._metrics["peak_in_flight"] = max(self._metrics["peak_in_flight"], self._in_flight)
+
+    def _release(self, failed: bool):
+        with self._lock:
+            self._in_flight -= 1
+            self._metrics["failed" if failed else "completed"] += 1
+
+    async def run(self, func, *args):
+        """Run ``func(*args)`` in the pool and await its result."""
+        self._acquire()
+        failed = True
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._get_executor(), func, *args)
+            failed = False
+            return result
+        finally:
+            self._release(failed)
+
+    def metrics(self) -> dict:
+        """Return a snapshot of the pool counters."""
+        with self._lock:
+            return {
+                **self._metrics,
+                "in_flight": self._in_flight,
+                "max_queue": self.max_queue,
+                "workers": self.workers,
+                "executor": self.executor_type,
+            }
+
+    def shutdown(self, wait: bool = True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+
+_hashing_pool: Optional[PasswordHashingPool] = None
+
+
+def get_hashing_pool() -> PasswordHashingPool:
+    """Return the process-wide hashing pool, creating it from settings on first use."""
+    global _hashing_pool
+    if _hashing_pool is None:
+        _hashing_pool = PasswordHashingPool(
+            workers=settings.password_hash_workers,
+            max_queue=settings.password_hash_max_queue,
+            executor=settings.password_hash_executor,
+        )
+    return _hashing_pool
+
+
+def shutdown_hashing_pool():
+    """Shut down the process-wide hashing pool, if one was started."""
+    global _hashing_pool
+    if _hashing_pool is not None:
+        _hashing_pool.shutdown()
+        _hashing_pool = None
+
+
+async def hash_password_async(password: str, rounds: int = 12) -> str:
+    """Async variant of :func:`hash_password` that runs in the hashing pool."""
+    return await get_hashing_pool().run(hash_password, password, rounds)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Async variant of :func:`verify_password` that runs in the hashing pool."""
+    return await get_hashing_pool().run(verify_password, plain_password, hashed_password)
+
+
 def generate_verification_token():
     return secrets.token_urlsafe(16)  # Generates a secure 16-byte URL-safe token
\ No newline at end of file
@@ -1,31 +1,254 @@
 # smtp_client.py
-from builtins import Exception, int, str
+from builtins import Exception, OSError, bool, float, int, len, list, range, set, str
 import smtplib
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from typing import Dict, Iterable, List, Optional, Tuple
 from settings.config import settings
 import logging
 
+class _PooledConnection:
+    def __init__(self, smtp: smtplib.SMTP):
+        self.smtp = smtp
+        self.created = time.monotonic()
+        self.last_used = self.created
+        self.messages = 0
+
+class SMTPConnectionPool:
+    """
+    Thread-safe pool of logged-in SMTP sessions.
+
+    Opening a session costs a TCP connect, EHLO, STARTTLS and AUTH, so sessions are kept
+    and reused for many messages. A session idle for ``noop_after`` seconds is checked
+    with NOOP before reuse, and one is replaced after ``max_messages`` messages or
+    ``max_age`` seconds. At most ``size`` sessions are open at once. ``timeout`` bounds
+    the connect and every reply, so an unresponsive server cannot hold a sending thread.
+    """
+
+    def __init__(self, server: str, port: int, username: str, password: str, use_tls: bool = True,
+                 size: int = 4, max_messages: int = 100, max_age: float = 300.0, noop_after: float = 30.0,
+                 timeout: float = 10.0):
+        self.server = server
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self.size = size
+        self.max_messages = max_messages
+        self.max_age = max_age
+        self.noop_after = noop_after
+        self._idle = deque()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self.stats = {"opened": 0, "reused": 0, "recycled": 0, "health_check_failures": 0, "messages": 0}
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.stats[name] += amount
+
+    def _open(self) -> _PooledConnection:
+        smtp = smtplib.SMTP(self.server, self.port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                smtp.starttls()  # Use TLS
+            smtp.login(self.username, self.password)
+        except Exception:
+            self._close(smtp)
+            raise
+        self._count("opened")
+        return _PooledConnection(smtp)
+
+    @staticmethod
+    def _close(smtp: smtplib.SMTP):
+        try:
+            smtp.quit()
+        except Exception:
+            try:
+                smtp.close()
+            except Exception:
+                pass
+
+    def _usable(self, conn: _PooledConnection) -> bool:
+        now = time.monotonic()
+        if conn.messages >= self.max_messages or now - conn.created >= self.max_age:
+            self._count("recycled")
+            return False
+        if now - conn.last_used >= self.noop_after:
+            try:
+                healthy = conn.smtp.noop()[0] == 250
+            except Exception:
+                healthy = False
+            if not healthy:
+                self._count("health_check_failures")
+                return False
+        return True
+
+    def _checkout(self) -> _PooledConnection:
+        while True:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                return self._open()
+            if self._usable(conn):
+                self._count("reused")
+                return conn
+            self._close(conn.smtp)
+
+    @contextmanager
+    def connection(self):
+        """Check out a session for exclusive use; it is discarded if the block raises."""
+        self._slots.acquire()
+        try:
+            conn = self._checkout()
+            try:
+                yield conn
+            except Exception:
+                self._close(conn.smtp)
+                raise
+            conn.last_used = time.monotonic()
+            with self._lock:
+                self._idle.append(conn)
+        finally:
+            self._slots.release()
+
+    def send_messages(self, messages: List[Tuple[str, str, str]]) -> List[Optional[Exception]]:
+        """
+        Send ``(sender, recipient, message)`` tuples over as few sessions as possible and
+        return one entry per message: None when delivered, else the exception. A message
+        that loses its session is retried once on a fresh one. If no session can be opened
+        at all, the remaining messages fail with that error rather than reconnecting again.
+        """
+        results: List[Optional[Exception]] = [None] * len(messages)
+        pending = list(range(len(messages)))
+        retried = set()
+        while pending:
+            conn = None
+            try:
+                with self.connection() as conn:
+                    while pending and conn.messages < self.max_messages:
+                        index = pending[0]
+                        sender, recipient, message = messages[index]
+                        try:
+                            conn.smtp.sendmail(sender, recipient, message)
+                        except (smtplib.SMTPServerDisconnected, OSError):
+                            raise
+                        except smtplib.SMTPException as e:
+                            results[index] = e
+                        else:
+                            self._count("messages")
+                        conn.messages += 1
+                        pending.pop(0)
+            except (smtplib.SMTPException, OSError) as e:
+                if conn is None:
+                    for index in pending:
+                        results[index] = e
+                    break
+                if not pending:
+                    break
+                index = pending[0]
+                if index in retried:
+                    results[index] = e
+                    pending.pop(0)
+                else:
+                    retried.add(index)
+        return results
+
+    def close(self):
+        """Close every idle session."""
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for conn in idle:
+            self._close(conn.smtp)
+
+_pools: Dict[Tuple[str, int, str, bool], SMTPConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+def get_smtp_pool(server: str, port: int, username: str, password: str, use_tls: bool = True) -> SMTPConnectionPool:
+    """Return the shared pool for this server and account, sized from settings."""
+    key = (server, port, username, use_tls)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = SMTPConnectionPool(
+                server, port, username, password, use_tls,
+                size=settings.smtp_pool_size,
+                max_messages=settings.smtp_pool_max_messages,
+                max_age=settings.smtp_pool_max_age,
+                noop_after=settings.smtp_pool_noop_after,
+                timeout=settings.smtp_timeout,
+            )
+        return _pools[key]
+
+def close_smtp_pools():
+    """Close and forget every shared pool, e.g. on application shutdown."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
 class SMTPClient:
-    def __init__(self, server: str, port: int, username: str, password: str):
+    def __init__(self, server: str, port: int, username: str, password: str, use_tls: bool = True,
+                 pool: Optional[SMTPConnectionPool] = None, timeout: float = 10.0):
         self.server = server
         self.port = port
         self.username = username
         self.password = password
+        self.use_tls = use_tls
+        self.pool = pool
+        self.timeout = timeout
+
+    @classmethod
+    def from_settings(cls, settings) -> "SMTPClient":
+        """Build a client for the configured server, sharing its pool when pooling is enabled."""
+        args = (settings.smtp_server, settings.smtp_port, settings.smtp_username, settings.smtp_password, settings.smtp_use_tls)
+        pool = get_smtp_pool(*args) if settings.smtp_pool_size > 0 else None
+        return cls(*args, pool=pool, timeout=settings.smtp_timeout)
+
+    def _build_message(self, subject: str, html_content: str, recipient: str) -> str:
+        message = MIMEMultipart('alternative')
+        message['Subject'] = subject
+        message['From'] = self.username
+        message['To'] = recipient
+        message.attach(MIMEText(html_content, 'html'))
+        return message.as_string()
 
     def send_email(self, subject: str, html_content: str, recipient: str):
         try:
-            message = MIMEMultipart('alternative')
-            message['Subject'] = subject
-            message['From'] = self.username
-            message['To'] = recipient
-            message.attach(MIMEText(html_content, 'html'))
-
-            with smtplib.SMTP(self.server, self.port) as server:
-                server.starttls()  # Use TLS
-                server.login(self.username, self.password)
-                server.sendmail(self.username, recipient, message.as_string())
+            message = self._build_message(subject, html_content, recipient)
+            if self.pool is not None:
+                [error] = self.pool.send_messages([(self.username, recipient, message)])
+                if error is not None:
+                    raise error
+            else:
+                with smtplib.SMTP(self.server, self.port, timeout=self.timeout) as server:
+                    if self.use_tls:
+                        server.starttls()  # Use TLS
+                    server.login(self.username, self.password)
+                    server.sendmail(self.username, recipient, message)
             logging.info(f"Email sent to {recipient}")
         except Exception as e:
             logging.error(f"Failed to send email: {str(e)}")
             raise
+
+    def send_emails(self, messages: Iterable[Tuple[str, str, str]]) -> List[Optional[Exception]]:
+        """
+        Send ``(subject, html_content, recipient)`` tuples, over pooled sessions when a
+        pool is configured. Returns None or the exception for each message.
+        """
+        messages = list(messages)
+        if self.pool is not None:
+            built = [(self.username, recipient, self._build_message(subject, html, recipient)) for subject, html, recipient in messages]
+            return self.pool.send_messages(built)
+        results: List[Optional[Exception]] = []
+        for subject, html, recipient in messages:
+            try:
+                self.send_email(subject, html, recipient)
+                results.append(None)
+            except Exception as e:
+                results.append(e)
+        return results
@@ -1,17 +1,58 @@
+from builtins import OSError, int, len, range, str, tuple, zip
+import html
+import os
+import string
+import threading
+from typing import Dict, List, Optional, Tuple
 import markdown2
 from pathlib import Path
 from bs4 import BeautifulSoup  # Ensure this is installed via `pip install beautifulsoup4`
 
+# Stands in for a {field} while the template is compiled; plain letters and digits pass
+# through markdown2 and BeautifulSoup untouched.
+_SLOT = "zqxtemplateslot{}zqx"
+
+class CompiledTemplate:
+    """
+    A template rendered to styled HTML once, split around its placeholders.
+
+    ``parts`` has one more entry than ``fields``; rendering interleaves them with the
+    escaped values, so no markdown or HTML parsing happens per email.
+    """
+
+    def __init__(self, parts: List[str], fields: List[Tuple[str, Optional[str], str]], mtimes: tuple):
+        self.parts = parts
+        self.fields = fields
+        self.mtimes = mtimes
+
+    def render(self, **context) -> str:
+        formatter = string.Formatter()
+        out = [self.parts[0]]
+        for (field_name, conversion, format_spec), part in zip(self.fields, self.parts[1:]):
+            value = formatter.get_field(field_name, (), context)[0]
+            value = formatter.format_field(formatter.convert_field(value, conversion), format_spec)
+            out.append(html.escape(value))
+            out.append(part)
+        return "".join(out)
+
 class TemplateManager:
     def __init__(self):
         self.root_dir = Path(__file__).resolve().parent.parent.parent
         self.templates_dir = self.root_dir / 'email_templates'
+        self._compiled: Dict[str, CompiledTemplate] = {}
+        self._lock = threading.Lock()
 
     def _read_template(self, filename: str) -> str:
         template_path = self.templates_dir / filename
         with open(template_path, 'r', encoding='utf-8') as file:
             return file.read()
 
+    def _mtime(self, filename: str) -> Optional[int]:
+        try:
+            return os.stat(self.templates_dir / filename).st_mtime_ns
+        except OSError:
+            return None
+
     def _apply_email_styles(self, html: str) -> str:
         styles = {
             'body': 'font-family: Arial, sans-serif; font-size: 16px; color: #333333; background-color: #ffffff; line-height: 1.5;',
@@ -36,12 +77,35 @@ class TemplateManager:
         wrapper.append(soup)
         return str(wrapper)
 
-    def render_template(self, template_name: str, **context) -> str:
-        header = self._read_template('header.md')
-        footer = self._read_template('footer.md')
-        main_template = self._read_template(f'{template_name}.md')
-        main_content = main_template.format(**context)
+    def compile_template(self, template_name: str) -> CompiledTemplate:
+        """Return the compiled template, rebuilding it if any of its files changed on disk."""
+        filenames = ('header.md', f'{template_name}.md', 'footer.md')
+        mtimes = tuple(self._mtime(filename) for filename in filenames)
+        compiled = self._compiled.get(template_name)
+        if compiled is not None and compiled.mtimes == mtimes:
+            return compiled
+
+        header, main_template, footer = (self._read_template(filename) for filename in filenames)
+        fields, pieces = [], []
+        for literal, field_name, format_spec, conversion in string.Formatter().parse(main_template):
+            pieces.append(literal)
+            if field_name is not None:
+                pieces.append(_SLOT.format(len(fields)))
+                fields.append((field_name, conversion, format_spec))
+        main_content = "".join(pieces)
 
         full_markdown = f"{header}\n{main_content}\n{footer}"
-        html_content = markdown2.markdown(full_markdown)
-        return self._apply_email_styles(html_content)
+        styled = self._apply_email_styles(markdown2.markdown(full_markdown))
+        parts = []
+        for index in range(len(fields)):
+            before, styled = styled.split(_SLOT.format(index), 1)
+            parts.append(before)
+        parts.append(styled)
+
+        compiled = CompiledTemplate(parts, fields, mtimes)
+        with self._lock:
+            self._compiled[template_name] = compiled
+        return compiled
+
+    def render_template(self, template_name: str, **context) -> str:
+        return self.compile_template(template_name).render(**context)
@@ -0,0 +1,159 @@
+from builtins import ImportError, RuntimeError, ValueError, dict, float, getattr, int, len, round, str
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+from settings.config import settings
+
+USER_CACHE_BACKENDS = ("memory", "redis", "none")
+
+class UserCache:
+    """
+    Async key/value cache for public user response shapes, with hit/miss counters.
+
+    Only dicts already reduced to UserResponse fields are stored, so password hashes,
+    tokens and lockout counters never reach the cache. Backends implement ``_get``,
+    ``_set``, ``_delete`` and ``_clear``.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self.metrics = {"hits": 0, "misses": 0, "sets": 0, "invalidations": 0}
+
+    async def get(self, key: str) -> Optional[Dict]:
+        value = await self._get(key)
+        self.metrics["hits" if value is not None else "misses"] += 1
+        return value
+
+    async def set(self, key: str, value: Dict):
+        self.metrics["sets"] += 1
+        await self._set(key, value)
+
+    async def delete(self, key: str):
+        self.metrics["invalidations"] += 1
+        await self._delete(key)
+
+    async def clear(self):
+        await self._clear()
+
+    async def close(self):
+        pass
+
+    def stats(self) -> Dict:
+        lookups = self.metrics["hits"] + self.metrics["misses"]
+        return dict(self.metrics, backend=self.backend, hit_rate=round(self.metrics["hits"] / lookups, 4) if lookups else 0.0)
+
+class LRUTTLCache(UserCache):
+    """
+    In-process cache: least recently used entries are evicted beyond ``maxsize``, and entries expire after ``ttl`` seconds.
+
+    Invalidation only reaches this process. Behind several workers, another worker's
+    entry for a changed user stays stale until its ``ttl`` runs out; use the redis
+    backend where that matters.
+    """
+    backend = "memory"
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 60.0):
+        super().__init__(ttl)
+        self.maxsize = maxsize
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def _get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    async def _set(self, key: str, value: Dict):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    async def _delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    async def _clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        return dict(super().stats(), size=len(self._entries), maxsize=self.maxsize)
+
+class SharedUserCache(UserCache):
+    """
+    Cache shared by every worker, on a Redis-compatible client with async ``get``,
+    ``set(key, value, ex=seconds)``, ``delete`` and ``scan_iter``. Values are stored as JSON.
+    """
+    backend = "redis"
+
+    def __init__(self, client, ttl: float = 60.0, prefix: str = "user:"):
+        super().__init__(ttl)
+        self.client = client
+        self.prefix = prefix
+
+    async def _get(self, key: str) -> Optional[Dict]:
+        raw = await self.client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    async def _set(self, key: str, value: Dict):
+        await self.client.set(self.prefix + key, json.dumps(value), ex=int(self.ttl))
+
+    async def _delete(self, key: str):
+        await self.client.delete(self.prefix + key)
+
+    async def _clear(self):
+        async for key in self.client.scan_iter(match=self.prefix + "*"):
+            await self.client.delete(key)
+
+    async def close(self):
+        close = getattr(self.client, "aclose", None) or getattr(self.client, "close", None)
+        if close is not None:
+            await close()
+
+def create_user_cache(backend: str, size: int, ttl: float, redis_url: str) -> Optional[UserCache]:
+    if backend not in USER_CACHE_BACKENDS:
+        raise ValueError(f"Unknown user cache backend: {backend}")
+    if backend == "none":
+        return None
+    if backend == "redis":
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("user_cache_backend 'redis' requires the redis package")
+        return SharedUserCache(redis.from_url(redis_url), ttl=ttl)
+    return LRUTTLCache(maxsize=size, ttl=ttl)
+
+_user_cache: Optional[UserCache] = None
+_configured = False
+
+def get_user_cache() -> Optional[UserCache]:
+    """Return the process-wide user cache, creating it from settings on first use; None when disabled."""
+    global _user_cache, _configured
+    if not _configured:
+        _user_cache = create_user_cache(settings.user_cache_backend, settings.user_cache_size,
+                                        settings.user_cache_ttl, settings.user_cache_redis_url)
+        _configured = True
+    return _user_cache
+
+def set_user_cache(cache: Optional[UserCache]):
+    """Install ``cache`` (or None to disable caching) as the process-wide user cache."""
+    global _user_cache, _configured
+    _user_cache, _configured = cache, True
+
+async def close_user_cache():
+    """Close the process-wide cache; the next get_user_cache() builds a fresh one from settings."""
+    global _user_cache, _configured
+    if _user_cache is not None:
+        await _user_cache.close()
+    _user_cache, _configured = None, False
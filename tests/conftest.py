@@ -9,21 +9,26 @@ from dotenv import load_dotenv
 from fastapi.testclient import TestClient
 from httpx import AsyncClient
 from urllib.parse import urlencode
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, scoped_session
 from faker import Faker
 
+# Settings are parsed once at import, so the test environment must be loaded first.
+load_dotenv(".env.test") or load_dotenv()
+
 from app.main import app
 from app.database import Base, Database
 from app.models.user_model import User, UserRole
-from app.dependencies import get_db, get_settings
+from app.dependencies import get_db, get_primary_db, get_settings
 from app.utils.security import hash_password
 from app.utils.template_manager import TemplateManager
 from app.services.email_service import EmailService
 from app.services.jwt_service import create_access_token
 from app.services.user_service import UserService
-
-load_dotenv(".env.test") or load_dotenv()
+from app.utils.smtp_connection import close_smtp_pools
+from app.utils.user_cache import close_user_cache
+from tests.fake_smtp import FakeSMTPServer
 
 fake = Faker()
 
@@ -47,6 +52,18 @@ def mock_smtp(monkeypatch):
         return MockSMTP()
 
     monkeypatch.setattr(smtplib, "SMTP", mock_connect)
+    yield
+    # Pooled sessions are shared across clients; drop the mocked ones with the patch.
+    close_smtp_pools()
+
+@pytest.fixture
+def fake_smtp_server():
+    """A local SMTP server that records messages; pair with SMTPClient(..., use_tls=False)."""
+    server = FakeSMTPServer().start()
+    try:
+        yield server
+    finally:
+        server.stop()
 
 @pytest.fixture
 def email_service():
@@ -57,11 +74,18 @@ def email_service():
 async def async_client(db_session):
     async with AsyncClient(app=app, base_url="http://testserver") as client:
         app.dependency_overrides[get_db] = lambda: db_session
+        app.dependency_overrides[get_primary_db] = lambda: db_session
         try:
             yield client
         finally:
             app.dependency_overrides.clear()
 
+@pytest.fixture(scope="function")
+async def unit_of_work_client():
+    """Client whose requests open and commit their own sessions through the real get_db."""
+    async with AsyncClient(app=app, base_url="http://testserver") as client:
+        yield client
+
 @pytest.fixture(scope="session", autouse=True)
 def initialize_database():
     try:
@@ -74,6 +98,8 @@ async def setup_database():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
     yield
+    # Cached users belong to the tables being dropped.
+    await close_user_cache()
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
     await engine.dispose()
@@ -86,6 +112,42 @@ async def db_session(setup_database):
         finally:
             await session.close()
 
+@pytest.fixture
+def session_factory():
+    """Factory for extra sessions, e.g. to simulate concurrent requests."""
+    return AsyncTestingSessionLocal
+
+@pytest.fixture
+def query_counter():
+    """Records every SQL statement sent to the test engine, including BEGIN/COMMIT/ROLLBACK."""
+    statements = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    def on_begin(conn):
+        statements.append("BEGIN")
+
+    def on_commit(conn):
+        statements.append("COMMIT")
+
+    def on_rollback(conn):
+        statements.append("ROLLBACK")
+
+    listeners = [
+        ("before_cursor_execute", on_execute),
+        ("begin", on_begin),
+        ("commit", on_commit),
+        ("rollback", on_rollback),
+    ]
+    for name, listener in listeners:
+        event.listen(engine.sync_engine, name, listener)
+    try:
+        yield statements
+    finally:
+        for name, listener in listeners:
+            event.remove(engine.sync_engine, name, listener)
+
 # USER FIXTURES
 @pytest.fixture(scope="function")
 async def locked_user(db_session):
@@ -0,0 +1,78 @@
+"""A minimal in-process SMTP server for tests: accepts any login and records every message."""
+from builtins import bytes, int, len, list, str
+import socketserver
+import threading
+from typing import List, Tuple
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line: str):
+        self.wfile.write(f"{line}\r\n".encode("ascii"))
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self.reply("220 fake-smtp ready")
+        sender, recipients = None, []
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            command = raw.decode("utf-8", "replace").strip()
+            verb = command.split(" ", 1)[0].upper()
+            if verb == "EHLO":
+                self.wfile.write(b"250-fake-smtp\r\n250-AUTH PLAIN\r\n250 OK\r\n")
+            elif verb == "HELO":
+                self.reply("250 fake-smtp")
+            elif verb == "AUTH":
+                with server.lock:
+                    server.logins += 1
+                self.reply("235 Authentication successful")
+            elif verb == "MAIL":
+                sender, recipients = command[10:].strip("<>"), []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                recipients.append(command[8:].strip("<>"))
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                lines: List[bytes] = []
+                while True:
+                    line = self.rfile.readline()
+                    if not line or line in (b".\r\n", b".\n"):
+                        break
+                    lines.append(line)
+                with server.lock:
+                    server.messages.append((sender, list(recipients), b"".join(lines).decode("utf-8", "replace")))
+                self.reply("250 OK: queued")
+            elif verb in ("RSET", "NOOP"):
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+class FakeSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), _SMTPHandler)
+        self.lock = threading.Lock()
+        self.messages: List[Tuple[str, List[str], str]] = []
+        self.connections = 0
+        self.logins = 0
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def start(self) -> "FakeSMTPServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
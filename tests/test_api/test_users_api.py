@@ -1,10 +1,15 @@
-from builtins import str
+from builtins import all, len, list, next, set, str, zip
+import csv
+import io
+import json
 import pytest
 from httpx import AsyncClient
+from sqlalchemy import select, update
+from app.dependencies import get_session_factory
 from app.main import app
 from app.models.user_model import User
 from app.utils.nickname_gen import generate_nickname
-from app.utils.security import hash_password
+from app.utils.security import PasswordHashingBusyError, hash_password
 from app.services.jwt_service import decode_token
 from urllib.parse import urlencode
 
@@ -37,3 +42,334 @@ async def test_upgrade_user_to_professional_forbidden(async_client, user_token,
     headers = {"Authorization": f"Bearer {user_token}"}
     response = await async_client.post(f"/users/{admin_user.id}/upgrade", headers=headers)
     assert response.status_code == 403 or response.status_code == 401
+
+@pytest.mark.asyncio
+async def test_update_user_duplicate_email_returns_409(async_client, admin_user, user, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.put(f"/users/{user.id}", json={"email": admin_user.email}, headers=headers)
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Email already exists"
+
+# ----------------------------------------------
+# Test cursor pagination on the user listing
+# ----------------------------------------------
+@pytest.mark.asyncio
+async def test_list_users_cursor_links(async_client, admin_token, users_with_same_role_50_users):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.get("/users/", params={"cursor": "", "limit": 20}, headers=headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["size"] == 20
+    assert body["page"] is None
+    links = {link["rel"]: link["href"] for link in body["links"]}
+    assert "prev" not in links
+    assert "cursor=" in links["next"]
+
+    ids = [item["id"] for item in body["items"]]
+    while "next" in links:
+        response = await async_client.get(links["next"], headers=headers)
+        body = response.json()
+        links = {link["rel"]: link["href"] for link in body["links"]}
+        ids.extend(item["id"] for item in body["items"])
+    assert len(set(ids)) == body["total"] == 51
+
+@pytest.mark.asyncio
+async def test_list_users_invalid_cursor(async_client, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.get("/users/", params={"cursor": "not-a-cursor"}, headers=headers)
+    assert response.status_code == 400
+
+@pytest.mark.asyncio
+async def test_list_users_offset_links(async_client, admin_token, users_with_same_role_50_users):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.get("/users/", params={"skip": 10, "limit": 10}, headers=headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["page"] == 2
+    links = {link["rel"]: link["href"] for link in body["links"]}
+    assert links["next"].endswith("?skip=20&limit=10")
+    assert links["prev"].endswith("?skip=0&limit=10")
+
+@pytest.mark.asyncio
+async def test_list_users_reports_count_strategy(async_client, admin_token, monkeypatch):
+    monkeypatch.setattr("app.services.user_service.settings.user_count_strategy", "estimated")
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.get("/users/", headers=headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["count_strategy"] in ("estimated", "exact")
+    assert body["total"] >= body["size"] == 1
+    assert any(link["rel"] == "last" for link in body["links"])
+
+@pytest.mark.asyncio
+async def test_list_users_filters_and_sort(async_client, admin_token, users_with_same_role_50_users):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    params = {"role": "AUTHENTICATED", "email_verified": "false", "sort": "-email", "limit": 20}
+    response = await async_client.get("/users/", params=params, headers=headers)
+    assert response.status_code == 200
+    body = response.json()
+    offset_ids = [item["id"] for item in body["items"]]
+    assert body["total"] == 50 and body["count_strategy"] == "exact"
+    links = {link["rel"]: link["href"] for link in body["links"]}
+    assert links["next"].endswith("?skip=20&limit=20&role=AUTHENTICATED&email_verified=false&sort=-email")
+
+    response = await async_client.get("/users/", params={**params, "cursor": ""}, headers=headers)
+    links = {link["rel"]: link["href"] for link in response.json()["links"]}
+    ids = [item["id"] for item in response.json()["items"]]
+    while "next" in links:
+        assert "sort=-email" in links["next"]
+        response = await async_client.get(links["next"], headers=headers)
+        links = {link["rel"]: link["href"] for link in response.json()["links"]}
+        ids.extend(item["id"] for item in response.json()["items"])
+    assert ids[:20] == offset_ids
+    assert len(set(ids)) == 50
+
+@pytest.mark.asyncio
+async def test_list_users_rejects_bad_filters(async_client, admin_token, users_with_same_role_50_users):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    for params in ({"sort": "bio"}, {"email_prefix": ""}, {"role": "OWNER"}):
+        response = await async_client.get("/users/", params=params, headers=headers)
+        assert response.status_code == 422
+    response = await async_client.get("/users/", params={"cursor": "", "limit": 10, "sort": "email"}, headers=headers)
+    next_link = next(link["href"] for link in response.json()["links"] if link["rel"] == "next")
+    response = await async_client.get(next_link.replace("sort=email", "sort=nickname"), headers=headers)
+    assert response.status_code == 400
+
+@pytest.mark.asyncio
+async def test_search_users_pages(async_client, admin_token, users_with_same_role_50_users, db_session):
+    for user in users_with_same_role_50_users[:3]:
+        user.bio = "Organises the spring hackathon."
+    await db_session.commit()
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.get("/users/search", params={"q": "hackathon", "limit": 2}, headers=headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["size"] == 2
+    links = {link["rel"]: link["href"] for link in body["links"]}
+    assert "q=hackathon" in links["next"]
+    response = await async_client.get(links["next"], headers=headers)
+    body2 = response.json()
+    assert body2["size"] == 1 and [link["rel"] for link in body2["links"]] == ["self"]
+    found = {item["id"] for item in body["items"] + body2["items"]}
+    assert found == {str(user.id) for user in users_with_same_role_50_users[:3]}
+
+@pytest.mark.asyncio
+async def test_search_users_validation(async_client, admin_token, user_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    assert (await async_client.get("/users/search", params={"q": ""}, headers=headers)).status_code == 422
+    response = await async_client.get("/users/search", params={"q": "x", "cursor": "garbage"}, headers=headers)
+    assert response.status_code == 400
+    response = await async_client.get("/users/search", params={"q": "x"}, headers={"Authorization": f"Bearer {user_token}"})
+    assert response.status_code == 403
+
+# ----------------------------------------------
+# Test streaming user export
+# ----------------------------------------------
+@pytest.fixture
+def export_client(async_client, session_factory):
+    app.dependency_overrides[get_session_factory] = lambda: session_factory
+    return async_client
+
+@pytest.mark.asyncio
+async def test_export_users_ndjson(export_client, admin_token, users_with_same_role_50_users):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await export_client.get("/users/export", params={"role": "AUTHENTICATED"}, headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == 50
+    assert all(line["role"] == "AUTHENTICATED" for line in lines)
+    assert "hashed_password" not in lines[0]
+
+@pytest.mark.asyncio
+async def test_export_users_csv(export_client, admin_token, users_with_same_role_50_users):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await export_client.get("/users/export", params={"format": "csv"}, headers=headers)
+    assert response.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == 51
+    assert {row["email"] for row in rows} >= {user.email for user in users_with_same_role_50_users}
+
+@pytest.mark.asyncio
+async def test_export_users_rejects_unknown_format(export_client, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await export_client.get("/users/export", params={"format": "xml"}, headers=headers)
+    assert response.status_code == 400
+
+@pytest.mark.asyncio
+async def test_export_users_requires_admin(export_client, manager_token):
+    headers = {"Authorization": f"Bearer {manager_token}"}
+    response = await export_client.get("/users/export", headers=headers)
+    assert response.status_code == 403
+
+# ----------------------------------------------
+# Test bulk user import
+# ----------------------------------------------
+@pytest.mark.asyncio
+async def test_import_users_ndjson(async_client, admin_user, admin_token, mock_smtp):
+    headers = {"Authorization": f"Bearer {admin_token}", "Content-Type": "application/x-ndjson"}
+    records = [
+        {"email": "first@example.com", "password": "Import*1234", "nickname": admin_user.nickname},
+        {"email": "second@example.com", "password": "Import*1234", "first_name": "Second"},
+        {"email": "first@example.com", "password": "Import*1234"},
+        {"email": admin_user.email, "password": "Import*1234"},
+        {"email": "not-an-email", "password": "Import*1234"},
+    ]
+    body = "\n".join(json.dumps(record) for record in records) + "\n{broken\n"
+    response = await async_client.post("/users/import", content=body, headers=headers)
+    assert response.status_code == 200, response.text
+    report = response.json()
+    assert (report["total"], report["created"], report["failed"]) == (6, 2, 4)
+    statuses = [row["status"] for row in report["results"]]
+    assert statuses == ["created", "created", "duplicate", "duplicate", "invalid", "invalid"]
+    assert [row["line"] for row in report["results"]] == [1, 2, 3, 4, 5, 6]
+
+    created = await async_client.get(f"/users/{report['results'][0]['id']}", headers={"Authorization": f"Bearer {admin_token}"})
+    assert created.status_code == 200
+    assert created.json()["nickname"] != admin_user.nickname
+
+@pytest.mark.asyncio
+async def test_import_users_csv(async_client, admin_token, mock_smtp):
+    headers = {"Authorization": f"Bearer {admin_token}", "Content-Type": "text/csv"}
+    body = "email,password,first_name\r\ncsv1@example.com,Import*1234,Ada\r\ncsv2@example.com,Import*1234,\r\n"
+    response = await async_client.post("/users/import", params={"format": "csv"}, content=body, headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["created"] == 2
+
+@pytest.mark.asyncio
+async def test_import_users_forbidden_for_regular_user(async_client, user_token):
+    headers = {"Authorization": f"Bearer {user_token}"}
+    response = await async_client.post("/users/import", content="", headers=headers)
+    assert response.status_code == 403
+
+# ----------------------------------------------
+# Test the user cache behind GET /users/{id}
+# ----------------------------------------------
+@pytest.mark.asyncio
+async def test_get_user_served_from_cache_until_updated(async_client, admin_token, user, query_counter):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    first = await async_client.get(f"/users/{user.id}", headers=headers)
+    assert first.status_code == 200
+    query_counter.clear()
+    second = await async_client.get(f"/users/{user.id}", headers=headers)
+    assert second.json() == first.json()
+    assert [s for s in query_counter if s.startswith("SELECT")] == []
+
+    response = await async_client.put(f"/users/{user.id}", json={"first_name": "Renamed"}, headers=headers)
+    assert response.status_code == 200
+    response = await async_client.get(f"/users/{user.id}", headers=headers)
+    assert response.json()["first_name"] == "Renamed"
+
+@pytest.mark.asyncio
+async def test_create_user_duplicate_email(async_client, admin_token, user, mock_smtp):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.post("/users/", json={"email": user.email, "password": "sS#fdasrongPassword123!"}, headers=headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Email already exists"
+
+@pytest.mark.asyncio
+async def test_route_permissions_audit(async_client, admin_token, manager_token):
+    response = await async_client.get("/admin/route-permissions", headers={"Authorization": f"Bearer {manager_token}"})
+    assert response.status_code == 403
+    response = await async_client.get("/admin/route-permissions", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
+    entry = next(e for e in response.json() if e["path"] == "/admin/route-permissions")
+    assert entry == {"path": "/admin/route-permissions", "methods": ["GET"], "name": "route_permissions_table", "roles": ["ADMIN"]}
+
+@pytest.mark.asyncio
+async def test_list_users_items_carry_links(async_client, admin_token, user):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.get("/users/?limit=50", headers=headers)
+    assert response.status_code == 200
+    item = next(item for item in response.json()["items"] if item["id"] == str(user.id))
+    single = await async_client.get(f"/users/{user.id}", headers=headers)
+    assert item["links"] == single.json()["links"]
+    assert [link["rel"] for link in item["links"]] == ["self", "update", "delete"]
+    assert item["links"][0]["href"] == f"http://testserver/users/{user.id}"
+
+@pytest.mark.asyncio
+async def test_fast_json_responses_match_validated_responses(async_client, admin_token, user, monkeypatch):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    requests = [("put", f"/users/{user.id}", {"bio": "Fast path"}), ("get", f"/users/{user.id}", None),
+                ("get", "/users/?limit=5", None), ("get", "/users/?cursor=&limit=5", None)]
+    fast = [await async_client.request(method, url, json=body, headers=headers) for method, url, body in requests]
+    monkeypatch.setattr("app.routers.user_routes.settings.fast_json_responses", False)
+    validated = [await async_client.request(method, url, json=body, headers=headers) for method, url, body in requests]
+    for fast_response, validated_response in zip(fast, validated):
+        assert fast_response.status_code == validated_response.status_code == 200
+        assert fast_response.json() == validated_response.json()
+
+FIELDSETS = [
+    ("id,nickname,email", ["email", "nickname", "id"]),
+    ("nickname", ["nickname"]),
+    ("email, role ,is_professional", ["email", "role", "is_professional"]),
+    ("links,id", ["id", "links"]),
+    ("bio,bio", ["bio"]),
+]
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("fields, keys", FIELDSETS)
+@pytest.mark.parametrize("url", ["/users/?limit=5&fields={fields}", "/users/?cursor=&limit=5&sort=-nickname&fields={fields}", "/users/{user_id}?fields={fields}"])
+async def test_sparse_fieldsets(async_client, admin_token, user, query_counter, monkeypatch, url, fields, keys):
+    monkeypatch.setattr("app.services.user_service.get_user_cache", lambda: None)
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    query_counter.clear()
+    response = await async_client.get(url.format(fields=fields, user_id=user.id), headers=headers)
+    assert response.status_code == 200
+    body = response.json()
+    items = body["items"] if "items" in body else [body]
+    assert items and all(list(item) == keys for item in items)
+    selected = next(s for s in query_counter if s.startswith("SELECT") and "FROM users" in s and "count(" not in s).split("FROM users")[0]
+    for column in ("email", "bio", "github_profile_url", "preferred_language"):
+        assert (f"users.{column}" in selected) == (column in keys)
+    if "items" in body:
+        assert all("fields=" in link["href"] for link in body["links"])
+
+@pytest.mark.asyncio
+async def test_sparse_fieldsets_page_through(async_client, admin_token, users_with_same_role_50_users):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.get("/users/?cursor=&limit=20&fields=id", headers=headers)
+    seen = []
+    while True:
+        body = response.json()
+        seen.extend(item["id"] for item in body["items"])
+        links = {link["rel"]: link["href"] for link in body["links"]}
+        if "next" not in links:
+            break
+        response = await async_client.get(links["next"], headers=headers)
+    assert len(seen) == len(set(seen)) == body["total"]
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("fields", ["password", "hashed_password", "id,secret", ",", ""])
+async def test_sparse_fieldsets_reject_unknown_fields(async_client, admin_token, user, fields):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    for url in (f"/users/?fields={fields}", f"/users/{user.id}?fields={fields}"):
+        response = await async_client.get(url, headers=headers)
+        assert response.status_code == 400
+        assert "Unknown fields" in response.json()["detail"]
+
+@pytest.mark.parametrize("path", ["/users/", "/users/{user_id}"])
+def test_sparse_fieldsets_are_documented(path):
+    response = app.openapi()["paths"][path]["get"]["responses"]["200"]
+    assert "fields" in response["description"]
+    assert "sparse" in response["content"]["application/json"]["examples"]
+
+@pytest.mark.asyncio
+async def test_login_busy_hashing_pool_returns_503(unit_of_work_client, monkeypatch):
+    async def busy(*args, **kwargs):
+        raise PasswordHashingBusyError("Password hashing queue is full")
+    monkeypatch.setattr("app.routers.user_routes.UserService.authenticate", busy)
+    response = await unit_of_work_client.post("/login/", data=urlencode({"username": "john@example.com", "password": "Secret#123"}),
+                                              headers={"Content-Type": "application/x-www-form-urlencoded"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+@pytest.mark.asyncio
+async def test_verify_email_persists_through_unit_of_work(unit_of_work_client, db_session, session_factory, unverified_user):
+    await db_session.execute(update(User).where(User.id == unverified_user.id).values(verification_token="verify-me"))
+    await db_session.commit()
+    response = await unit_of_work_client.get(f"/verify-email/{unverified_user.id}/verify-me")
+    assert response.status_code == 200
+    async with session_factory() as session:
+        verified = (await session.execute(select(User.email_verified).where(User.id == unverified_user.id))).scalar()
+    assert verified is True
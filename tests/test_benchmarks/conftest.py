@@ -0,0 +1,66 @@
+from builtins import len, range
+from datetime import datetime, timedelta, timezone
+import uuid
+
+import pytest
+from sqlalchemy import event, insert
+
+from app.models.user_model import User, UserRole
+
+@pytest.fixture
+def seed_users(db_session):
+    """
+    Bulk-insert ``count`` users in batches; bcrypt is skipped, the hash is a placeholder.
+    Pass ``nicknames`` to control the nickname column (it must have ``count`` entries).
+    """
+    async def seed(count: int, batch_size: int = 5000, nicknames=None):
+        start = datetime.now(timezone.utc) - timedelta(days=1)
+        for offset in range(0, count, batch_size):
+            rows = [
+                {
+                    "id": uuid.uuid4(),
+                    "nickname": nicknames[i] if nicknames is not None else f"bench_user_{i}",
+                    "email": f"bench_user_{i}@example.com",
+                    "first_name": "Bench",
+                    "last_name": f"User{i}",
+                    "bio": "Seeded for benchmarks. " * 10,
+                    "hashed_password": "$2b$12$" + "x" * 53,
+                    "verification_token": uuid.uuid4().hex,
+                    "role": UserRole.AUTHENTICATED,
+                    "email_verified": True,
+                    "is_locked": False,
+                    "is_professional": i % 7 == 0,
+                    "failed_login_attempts": 0,
+                    "created_at": start + timedelta(milliseconds=i),
+                }
+                for i in range(offset, min(offset + batch_size, count))
+            ]
+            await db_session.execute(insert(User), rows)
+        await db_session.commit()
+    return seed
+
+@pytest.fixture
+def explain_plans(db_session):
+    """
+    ``await explain_plans(call)`` awaits ``call()`` and returns the EXPLAIN output of
+    every statement it sent, re-run with the same parameters on ``db_session``.
+    """
+    async def explain(call):
+        statements = []
+
+        def on_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append((statement, parameters))
+
+        sync_engine = db_session.bind.sync_engine
+        event.listen(sync_engine, "before_cursor_execute", on_execute)
+        try:
+            await call()
+        finally:
+            event.remove(sync_engine, "before_cursor_execute", on_execute)
+        connection = await db_session.connection()
+        plans = []
+        for statement, parameters in statements:
+            result = await connection.exec_driver_sql(f"EXPLAIN {statement}", parameters)
+            plans.append("\n".join(row[0] for row in result))
+        return plans
+    return explain
@@ -0,0 +1,52 @@
+"""
+Per-page cost of building ``UserResponse`` items from whole ``User`` entities versus
+from rows projected to ``USER_RESPONSE_COLUMNS``.
+
+Each path gets a fresh session so the identity map starts empty, as it would in a
+request. Run with ``-s`` to see the timing table.
+"""
+from builtins import len, print, range, sum
+import time
+import tracemalloc
+
+import pytest
+
+from app.schemas.user_schemas import UserResponse
+from app.services.user_service import USER_RESPONSE_COLUMNS, UserService
+
+pytestmark = [pytest.mark.asyncio, pytest.mark.slow]
+
+ROUNDS = 5
+
+async def build_page(session_factory, page_size, columns):
+    async with session_factory() as session:
+        users = await UserService.list_users(session, 0, page_size, columns=columns)
+        if columns:
+            return [UserResponse.model_validate(row._asdict()) for row in users]
+        return [UserResponse.model_validate(user) for user in users]
+
+async def measure(session_factory, page_size, columns):
+    """Mean latency over ROUNDS runs, then peak traced memory of one more run."""
+    timings = []
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        items = await build_page(session_factory, page_size, columns)
+        timings.append(time.perf_counter() - started)
+        assert len(items) == page_size
+    tracemalloc.start()
+    await build_page(session_factory, page_size, columns)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return sum(timings) / len(timings), peak
+
+async def test_projection_vs_entity_pages(seed_users, session_factory):
+    await seed_users(1000)
+    for page_size in (10, 100, 1000):
+        entity_time, entity_peak = await measure(session_factory, page_size, None)
+        projected_time, projected_peak = await measure(session_factory, page_size, USER_RESPONSE_COLUMNS)
+        print(
+            f"page={page_size:>5} entity={entity_time * 1000:8.2f}ms/{entity_peak / 1024:8.0f}KiB "
+            f"projected={projected_time * 1000:8.2f}ms/{projected_peak / 1024:8.0f}KiB"
+        )
+        if page_size == 1000:
+            assert projected_peak < entity_peak
@@ -0,0 +1,47 @@
+"""
+Nickname allocation cost as the users table fills up with generated nicknames.
+
+The default run seeds 10k users; set NICKNAME_BENCH_SIZES=10000,100000,1000000 for the
+full comparison. The legacy column is the expected number of SELECTs per registration
+with the old 25,000-name space and one query per candidate, 1 / (1 - n / 25000),
+which is unbounded once the space is full.
+"""
+from builtins import float, int, len, list, print, range, set
+import os
+import time
+
+import pytest
+
+from app.services.user_service import UserService
+from app.utils.nickname_gen import generate_nickname, nickname_space_size
+
+pytestmark = [pytest.mark.asyncio, pytest.mark.slow]
+
+SIZES = [int(size) for size in os.environ.get("NICKNAME_BENCH_SIZES", "10000").split(",")]
+REGISTRATIONS = 200
+LEGACY_SPACE = 25000
+
+@pytest.mark.parametrize("existing", SIZES)
+async def test_nickname_allocation_at_scale(existing, seed_users, db_session, query_counter):
+    nicknames = set()
+    while len(nicknames) < existing:
+        nicknames.add(generate_nickname())
+    await seed_users(existing, nicknames=list(nicknames))
+
+    query_counter.clear()
+    started = time.perf_counter()
+    allocated = set()
+    for _ in range(REGISTRATIONS):
+        [nickname] = await UserService._allocate_nicknames(db_session, 1, set())
+        allocated.add(nickname)
+    elapsed = time.perf_counter() - started
+
+    selects = len([s for s in query_counter if s.startswith("SELECT")])
+    legacy = 1 / (1 - existing / LEGACY_SPACE) if existing < LEGACY_SPACE else float("inf")
+    print(
+        f"existing={existing:>8} space={nickname_space_size():>10} "
+        f"queries/registration={selects / REGISTRATIONS:.2f} legacy={legacy:.2f} "
+        f"latency={elapsed / REGISTRATIONS * 1000:.2f}ms"
+    )
+    assert not allocated & nicknames
+    assert selects == REGISTRATIONS
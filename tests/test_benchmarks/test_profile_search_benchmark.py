@@ -0,0 +1,51 @@
+"""
+Latency of ranked profile search over a seeded table.
+
+The table holds ``PROFILE_SEARCH_BENCH_ROWS`` profiles (20000 by default; set it to
+1000000 for the full-size run). Each query is timed over ROUNDS runs and the median
+and worst are reported. Selective queries must be served by the search indexes rather
+than a sequential scan. Run with ``-s`` to see the timing table.
+"""
+from builtins import int, len, max, print, range, sorted
+import os
+import time
+
+import pytest
+from sqlalchemy import text
+
+from app.services.user_service import UserService
+
+pytestmark = [pytest.mark.asyncio, pytest.mark.slow]
+
+ROWS = int(os.environ.get("PROFILE_SEARCH_BENCH_ROWS", "20000"))
+ROUNDS = 5
+
+async def timed_search(session_factory, terms):
+    timings = []
+    for _ in range(ROUNDS):
+        async with session_factory() as session:
+            started = time.perf_counter()
+            rows, _ = await UserService.search_profiles(session, terms, 20)
+            timings.append(time.perf_counter() - started)
+    timings = sorted(timings)
+    return rows, timings[len(timings) // 2], max(timings)
+
+async def test_profile_search_latency(seed_users, db_session, session_factory, explain_plans):
+    await seed_users(ROWS)
+    await db_session.execute(text("ANALYZE users"))
+    await db_session.commit()
+    target = ROWS // 3
+    queries = {
+        "last name": (f"User{target}", f"bench_user_{target}"),
+        "nickname": (f"bench_user_{target}", f"bench_user_{target}"),
+        "common word": ("benchmarks", None),
+    }
+    for label, (terms, expected) in queries.items():
+        rows, median, worst = await timed_search(session_factory, terms)
+        print(f"{label:>12} rows={ROWS} median={median * 1000:8.2f}ms worst={worst * 1000:8.2f}ms matches={len(rows)}")
+        if expected is not None:
+            assert rows[0].nickname == expected
+
+    plans = await explain_plans(lambda: UserService.search_profiles(db_session, f"User{target}", 20))
+    assert "ix_users_search_vector" in plans[-1]
+    assert "Seq Scan" not in plans[-1]
@@ -0,0 +1,95 @@
+"""
+Round-trip benchmark for the user endpoints.
+
+Drives the real ``get_db`` unit of work (no dependency override) against the test
+database and counts every statement the engine sends, including BEGIN and COMMIT.
+``BASELINE`` holds the counts measured before reads stopped committing, when every
+SELECT in a request was wrapped in its own BEGIN/COMMIT pair. The mutation tests check
+that each UPDATE/DELETE endpoint sends a single RETURNING statement inside its transaction.
+"""
+from builtins import len, print
+import pytest
+from httpx import AsyncClient
+
+from app.database import Database
+from app.main import app
+from app.services.jwt_service import create_access_token
+from app.services.user_service import UserService
+
+pytestmark = [pytest.mark.asyncio, pytest.mark.slow]
+
+BASELINE = {
+    "GET /users/{id}": 3,
+    "GET /users/": 4,
+    "PUT /users/{id}": 9,
+    "POST /users/": 12,
+    "DELETE /users/{id}": 6,
+}
+
+@pytest.fixture
+async def uow_client(session_factory, monkeypatch):
+    monkeypatch.setattr(Database, "_session_factory", session_factory)
+    async with AsyncClient(app=app, base_url="http://testserver") as client:
+        yield client
+
+@pytest.fixture
+def admin_headers(admin_user):
+    token = create_access_token(data={"sub": admin_user.email, "role": admin_user.role.name})
+    return {"Authorization": f"Bearer {token}"}
+
+async def test_round_trips_per_endpoint(uow_client, admin_headers, user, query_counter, email_service, mock_smtp):
+    requests = [
+        ("GET /users/{id}", "get", f"/users/{user.id}", None),
+        ("GET /users/", "get", "/users/", None),
+        ("PUT /users/{id}", "put", f"/users/{user.id}", {"first_name": "Updated"}),
+        ("POST /users/", "post", "/users/", {"email": "bench@example.com", "password": "Bench*12345"}),
+        ("DELETE /users/{id}", "delete", f"/users/{user.id}", None),
+    ]
+    measured = {}
+    for name, method, url, body in requests:
+        query_counter.clear()
+        kwargs = {"json": body} if body is not None else {}
+        response = await getattr(uow_client, method)(url, headers=admin_headers, **kwargs)
+        assert response.status_code < 400, response.text
+        measured[name] = len(query_counter)
+
+    for name, count in measured.items():
+        print(f"{name:<22} baseline={BASELINE[name]:>3} unit_of_work={count:>3}")
+    for name, count in measured.items():
+        assert count <= BASELINE[name]
+    assert measured["POST /users/"] < BASELINE["POST /users/"]
+    assert measured["PUT /users/{id}"] < BASELINE["PUT /users/{id}"]
+
+TRANSACTION_CONTROL = ("BEGIN", "COMMIT", "ROLLBACK")
+
+def data_statements(statements):
+    return [s for s in statements if s not in TRANSACTION_CONTROL]
+
+async def test_mutation_endpoints_make_one_database_call(uow_client, admin_headers, user, query_counter):
+    requests = [
+        ("PUT /users/{id}", "put", f"/users/{user.id}", {"first_name": "Updated"}),
+        ("POST /users/{id}/upgrade", "post", f"/users/{user.id}/upgrade", None),
+        ("DELETE /users/{id}", "delete", f"/users/{user.id}", None),
+    ]
+    for name, method, url, body in requests:
+        query_counter.clear()
+        kwargs = {"json": body} if body is not None else {}
+        response = await getattr(uow_client, method)(url, headers=admin_headers, **kwargs)
+        assert response.status_code < 400, response.text
+        statements = data_statements(query_counter)
+        print(f"{name:<26} {len(query_counter)} statements, {len(statements)} outside BEGIN/COMMIT")
+        assert len(statements) == 1, statements
+        assert "RETURNING" in statements[0]
+
+async def test_account_mutations_make_one_database_call(db_session, locked_user, query_counter):
+    mutations = [
+        lambda: UserService.unlock_user_account(db_session, locked_user.id),
+        lambda: UserService.verify_email_with_token(db_session, locked_user.id, locked_user.verification_token),
+        lambda: UserService.reset_password(db_session, locked_user.id, "NewPassword*123"),
+    ]
+    for mutation in mutations:
+        query_counter.clear()
+        assert await mutation()
+        statements = data_statements(query_counter)
+        assert len(statements) == 1, statements
+        assert statements[0].startswith("UPDATE") and "RETURNING" in statements[0]
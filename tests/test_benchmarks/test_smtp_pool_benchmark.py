@@ -0,0 +1,41 @@
+"""
+SMTP throughput with and without pooled sessions, against the in-process fake server.
+
+The fake server has no TLS, so the unpooled column only pays for connect, EHLO and AUTH
+per message; a real relay adds a STARTTLS handshake on top, widening the gap.
+"""
+from builtins import len, print, range
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+import pytest
+
+from app.utils.smtp_connection import SMTPClient, SMTPConnectionPool
+
+pytestmark = pytest.mark.slow
+
+MESSAGES = 500
+THREADS = 4
+
+def send_all(client: SMTPClient) -> float:
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        for _ in executor.map(lambda i: client.send_email("Verify", "<p>hello</p>", f"user{i}@example.com"), range(MESSAGES)):
+            pass
+    return MESSAGES / (time.perf_counter() - started)
+
+def test_smtp_pool_throughput(fake_smtp_server):
+    port = fake_smtp_server.port
+    unpooled = send_all(SMTPClient("127.0.0.1", port, "user", "password", use_tls=False))
+    unpooled_connections = fake_smtp_server.connections
+
+    pool = SMTPConnectionPool("127.0.0.1", port, "user", "password", use_tls=False, size=THREADS)
+    pooled = send_all(SMTPClient("127.0.0.1", port, "user", "password", use_tls=False, pool=pool))
+    pool.close()
+    pooled_connections = fake_smtp_server.connections - unpooled_connections
+
+    print(f"\nunpooled: {unpooled:8.0f} msg/s over {unpooled_connections} connections")
+    print(f"pooled:   {pooled:8.0f} msg/s over {pooled_connections} connections")
+    assert len(fake_smtp_server.messages) == 2 * MESSAGES
+    assert unpooled_connections == MESSAGES
+    assert pooled_connections <= THREADS * (MESSAGES // pool.max_messages + 1)
@@ -0,0 +1,46 @@
+"""
+Payload size and latency of GET /users/ pages with every field against sparse fieldsets,
+over a seeded table of ``SPARSE_FIELDS_BENCH_ROWS`` users (20000 by default). Each page is
+fetched ROUNDS times through the API and the median is reported. Run with ``-s`` to see
+the comparison table.
+"""
+from builtins import int, len, print, range, sorted
+import os
+import time
+
+import pytest
+from sqlalchemy import text
+
+pytestmark = [pytest.mark.asyncio, pytest.mark.slow]
+
+ROWS = int(os.environ.get("SPARSE_FIELDS_BENCH_ROWS", "20000"))
+ROUNDS = 7
+FIELDSETS = [None, "id,nickname,email", "id"]
+
+async def timed_page(async_client, headers, url):
+    timings = []
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        response = await async_client.get(url, headers=headers)
+        timings.append(time.perf_counter() - started)
+        assert response.status_code == 200
+    return sorted(timings)[len(timings) // 2], len(response.content)
+
+@pytest.mark.parametrize("limit", [100, 1000])
+async def test_sparse_fieldset_payload_and_latency(async_client, admin_token, seed_users, db_session, limit):
+    await seed_users(ROWS)
+    await db_session.execute(text("ANALYZE users"))
+    await db_session.commit()
+    headers = {"Authorization": f"Bearer {admin_token}"}
+
+    results = {}
+    for fields in FIELDSETS:
+        url = f"/users/?cursor=&limit={limit}" + (f"&fields={fields}" if fields else "")
+        results[fields] = await timed_page(async_client, headers, url)
+    full_latency, full_size = results[None]
+    print()
+    for fields, (latency, size) in results.items():
+        print(f"limit={limit:>5} fields={fields or 'all':<18} payload={size / 1024:8.1f}KiB ({size / full_size:4.0%}) "
+              f"median={latency * 1000:7.2f}ms ({latency / full_latency:4.0%})")
+    assert results["id,nickname,email"][1] < full_size / 2
+    assert results["id"][1] < results["id,nickname,email"][1]
@@ -0,0 +1,48 @@
+"""
+Rendering 10k verification emails: markdown2 and BeautifulSoup per email against the
+compiled template, which only substitutes escaped values.
+"""
+from builtins import len, print, range
+import time
+
+import markdown2
+import pytest
+
+from app.utils.template_manager import TemplateManager
+
+pytestmark = pytest.mark.slow
+
+EMAILS = 10000
+
+def legacy_render(manager: TemplateManager, template_name: str, **context) -> str:
+    header = manager._read_template('header.md')
+    footer = manager._read_template('footer.md')
+    main_content = manager._read_template(f'{template_name}.md').format(**context)
+    return manager._apply_email_styles(markdown2.markdown(f"{header}\n{main_content}\n{footer}"))
+
+def context(i):
+    return {"name": f"User {i}", "verification_url": f"http://localhost/verify-email/{i}/token{i}"}
+
+def test_template_render_throughput(monkeypatch):
+    markdown = markdown2.markdown
+    conversions = []
+    monkeypatch.setattr(markdown2, "markdown", lambda text, *args, **kwargs: conversions.append(text) or markdown(text, *args, **kwargs))
+    manager = TemplateManager()
+    # The legacy path is slow; time a tenth of the run and scale it.
+    legacy_count = EMAILS // 10
+    started = time.perf_counter()
+    for i in range(legacy_count):
+        legacy_render(manager, 'email_verification', **context(i))
+    legacy = (time.perf_counter() - started) * EMAILS / legacy_count
+    assert len(conversions) == legacy_count
+
+    conversions.clear()
+    started = time.perf_counter()
+    for i in range(EMAILS):
+        manager.render_template('email_verification', **context(i))
+    compiled = time.perf_counter() - started
+    # Markdown runs once, when the template is compiled, not once per email.
+    assert len(conversions) == 1
+
+    print(f"\n{EMAILS} verification emails: legacy {legacy:.2f}s (est.), compiled {compiled:.3f}s, {legacy / compiled:.0f}x")
+    assert manager.render_template('email_verification', **context(1)) == legacy_render(manager, 'email_verification', **context(1))
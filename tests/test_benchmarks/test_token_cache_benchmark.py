@@ -0,0 +1,48 @@
+"""
+Per-request auth overhead: get_current_user plus require_role over a pool of tokens,
+verifying every token with jwt.decode versus serving repeat tokens from the token cache.
+"""
+from builtins import len, print, range
+import time
+
+import jwt
+import pytest
+
+from app.dependencies import get_current_user, require_role
+from app.services.jwt_service import TokenCache, create_access_token, set_token_cache
+
+pytestmark = pytest.mark.slow
+
+REQUESTS = 50000
+TOKENS = 500
+
+def authorize(tokens, checker):
+    started = time.perf_counter()
+    for i in range(REQUESTS):
+        checker(get_current_user(tokens[i % TOKENS]))
+    return (time.perf_counter() - started) / REQUESTS
+
+def test_token_cache_auth_overhead(monkeypatch):
+    decode = jwt.decode
+    decodes = []
+    monkeypatch.setattr(jwt, "decode", lambda *args, **kwargs: decodes.append(1) or decode(*args, **kwargs))
+    tokens = [create_access_token(data={"sub": f"user{i}@example.com", "role": "admin"}) for i in range(TOKENS)]
+    checker = require_role(["ADMIN", "MANAGER"])
+    try:
+        set_token_cache(TokenCache(maxsize=0))
+        uncached = authorize(tokens, checker)
+        uncached_decodes = len(decodes)
+        decodes.clear()
+        cache = TokenCache(maxsize=TOKENS * 2)
+        set_token_cache(cache)
+        cached = authorize(tokens, checker)
+    finally:
+        set_token_cache(None)
+
+    stats = cache.stats()
+    print(f"\n{REQUESTS} requests over {TOKENS} tokens: uncached {uncached * 1e6:.1f}us, "
+          f"cached {cached * 1e6:.1f}us per request, {uncached / cached:.1f}x, hit rate {stats['hit_rate']}")
+    assert stats["misses"] == TOKENS
+    # Every request verifies its token without the cache; with it, only each token's first use does.
+    assert uncached_decodes == REQUESTS
+    assert len(decodes) == TOKENS
@@ -0,0 +1,69 @@
+"""
+Query plans of the filtered and sorted user listing on a seeded table.
+
+Every filter and sort key must be served by an index: the plans may not contain a
+sequential scan. The table holds ``USER_FILTER_EXPLAIN_ROWS`` users (20000 by default;
+set it to 1000000 for the full-size check). Run with ``-s`` to see the plans.
+"""
+from builtins import int, len, print, str
+from datetime import datetime, timedelta, timezone
+import os
+
+import pytest
+from sqlalchemy import text
+
+from app.schemas.pagination_schema import PageCursor
+from app.schemas.user_schemas import UserSearch
+from app.services.user_service import USER_RESPONSE_COLUMNS, UserService
+
+pytestmark = [pytest.mark.asyncio, pytest.mark.slow]
+
+ROWS = int(os.environ.get("USER_FILTER_EXPLAIN_ROWS", "20000"))
+
+@pytest.fixture
+async def seeded_users(seed_users, db_session):
+    """Seeded users with a realistic spread: few admins, managers, locked or unverified accounts."""
+    await seed_users(ROWS)
+    await db_session.execute(text(
+        "UPDATE users SET "
+        "role = CASE WHEN random() < 0.01 THEN 'ADMIN' WHEN random() < 0.03 THEN 'MANAGER' ELSE role END::\"UserRole\", "
+        "is_locked = random() < 0.005, "
+        "email_verified = random() >= 0.03"
+    ))
+    await db_session.commit()
+    await db_session.execute(text("ANALYZE users"))
+    await db_session.commit()
+
+SEARCHES = [
+    {},
+    {"role": "ADMIN"},
+    {"role": "AUTHENTICATED"},
+    {"role": "MANAGER", "is_professional": True},
+    {"is_locked": True},
+    {"is_locked": False},
+    {"email_verified": False},
+    {"is_professional": True},
+    {"created_after": datetime.now(timezone.utc) - timedelta(hours=1)},
+    {"email_prefix": "bench_user_1234"},
+    {"nickname_prefix": "BENCH_USER_99", "sort": "-created_at"},
+    {"sort": "email"},
+    {"sort": "-nickname", "role": "AUTHENTICATED"},
+    {"sort": "-created_at", "is_locked": True},
+]
+
+@pytest.mark.parametrize("criteria", SEARCHES, ids=str)
+async def test_listing_avoids_sequential_scans(db_session, seeded_users, explain_plans, criteria):
+    search = UserSearch(**criteria)
+    middle = f"bench_user_{ROWS // 2}"
+    cursor = PageCursor(sort=search.sort, value=middle if search.sort.lstrip("-") != "created_at" else datetime.now(timezone.utc) - timedelta(days=1),
+                        id="00000000-0000-0000-0000-000000000000")
+
+    async def list_pages():
+        await UserService.list_users(db_session, 0, 20, columns=USER_RESPONSE_COLUMNS, search=search)
+        await UserService.list_users_keyset(db_session, 20, cursor, columns=USER_RESPONSE_COLUMNS, search=search)
+
+    plans = await explain_plans(list_pages)
+    assert len(plans) == 2
+    for plan in plans:
+        print(f"\n{criteria} rows={ROWS}\n{plan}")
+        assert "Seq Scan" not in plan
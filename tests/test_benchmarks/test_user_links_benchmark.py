@@ -0,0 +1,75 @@
+"""
+HATEOAS links for user responses: the legacy path (``url_for`` per link, wrapped in a
+validated Link) against cached route templates, as Link models and as plain dicts, and
+the cost links add to a 100-user listing page.
+"""
+from builtins import all, dict, enumerate, len, print, range, str, type
+import time
+import uuid
+
+import pytest
+from starlette.requests import Request
+
+from app.main import app
+from app.schemas.user_schemas import UserListResponse, UserResponse
+from app.utils.link_generation import create_link, create_user_links, user_link_dicts
+
+pytestmark = pytest.mark.slow
+
+USERS = 10000
+PAGE = 100
+
+def make_request():
+    return Request({
+        "type": "http", "app": app, "router": app.router, "scheme": "http", "server": ("testserver", 80),
+        "method": "GET", "path": "/users/", "root_path": "", "query_string": b"", "headers": [(b"host", b"testserver")],
+    })
+
+def legacy_user_links(user_id, request):
+    actions = [
+        ("self", "get_user", "GET", "view"),
+        ("update", "update_user", "PUT", "update"),
+        ("delete", "delete_user", "DELETE", "delete")
+    ]
+    return [
+        create_link(rel, str(request.url_for(action, user_id=str(user_id))), method, action_desc)
+        for rel, action, method, action_desc in actions
+    ]
+
+def timed(build, ids, request):
+    started = time.perf_counter()
+    for user_id in ids:
+        build(user_id, request)
+    return (time.perf_counter() - started) / len(ids)
+
+def page_cost(ids, request, links):
+    rows = [{"id": user_id, "email": f"user{i}@example.com", "nickname": f"user_{i}"} for i, user_id in enumerate(ids)]
+    started = time.perf_counter()
+    for _ in range(20):
+        items = [UserResponse.model_validate(dict(row, links=user_link_dicts(row["id"], request)) if links else row) for row in rows]
+        UserListResponse(items=items, total=len(items), size=len(items)).model_dump_json()
+    return (time.perf_counter() - started) / 20
+
+def test_user_link_generation_cost(monkeypatch):
+    url_for = Request.url_for
+    lookups = []
+    monkeypatch.setattr(Request, "url_for", lambda self, *args, **kwargs: lookups.append(args[0]) or url_for(self, *args, **kwargs))
+    request = make_request()
+    ids = [uuid.uuid4() for _ in range(USERS)]
+    assert [link.model_dump() for link in legacy_user_links(ids[0], request)] == [link.model_dump() for link in create_user_links(ids[0], request)]
+
+    lookups.clear()
+    legacy = timed(legacy_user_links, ids, request)
+    legacy_lookups = len(lookups)
+    lookups.clear()
+    models = timed(create_user_links, ids, request)
+    dicts = timed(user_link_dicts, ids, request)
+    print(f"\nlinks per user: legacy {legacy * 1e6:.1f}us, templated models {models * 1e6:.1f}us, "
+          f"templated dicts {dicts * 1e6:.2f}us ({legacy / dicts:.0f}x)")
+
+    bare, linked = page_cost(ids[:PAGE], request, False), page_cost(ids[:PAGE], request, True)
+    print(f"{PAGE}-user page built and serialized: without links {bare * 1e3:.2f}ms, with links {linked * 1e3:.2f}ms")
+    # Routes are resolved per link on the legacy path, and never again once the templates are cached.
+    assert legacy_lookups == 3 * USERS
+    assert lookups == []
+    assert all(type(link) is dict for link in user_link_dicts(ids[0], request))
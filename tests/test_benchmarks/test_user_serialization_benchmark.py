@@ -0,0 +1,84 @@
+"""
+Per-request serialization cost of a GET /users/ page of 10, 100 and 1000 users: the
+validated path (items validated in the route, revalidated and encoded by FastAPI against
+response_model) against FastJSONResponse with orjson and with the TypeAdapter fallback.
+"""
+from builtins import dict, getattr, next, print, range
+import json
+import time
+import uuid
+
+import pytest
+from fastapi.routing import serialize_response
+from starlette.responses import JSONResponse
+
+from app.main import app
+from app.models.user_model import UserRole
+from app.schemas.user_schemas import USER_LIST_ADAPTER, UserListResponse, UserResponse
+from app.utils.json_response import FastJSONResponse
+
+pytestmark = [pytest.mark.asyncio, pytest.mark.slow]
+
+ROUNDS = 20
+
+def page(size):
+    items = []
+    for i in range(size):
+        user_id = uuid.uuid4()
+        items.append({
+            "email": f"user{i}@example.com", "nickname": f"user_{i}", "first_name": "First", "last_name": f"Last{i}",
+            "bio": "Seeded for benchmarks. " * 10, "preferred_language": "English", "profile_picture_url": None,
+            "linkedin_profile_url": f"https://linkedin.com/in/user{i}", "github_profile_url": None,
+            "id": user_id, "role": UserRole.AUTHENTICATED, "is_professional": i % 7 == 0,
+            "links": [{"rel": rel, "href": f"http://testserver/users/{user_id}", "action": action, "type": "application/json"}
+                      for rel, action in (("self", "view"), ("update", "update"), ("delete", "delete"))],
+        })
+    return {"items": items, "total": size * 10, "count_strategy": "exact", "page": 1, "size": size,
+            "links": [{"rel": "self", "href": f"http://testserver/users/?skip=0&limit={size}", "method": "GET"}]}
+
+class CountingAdapter:
+    """Wraps a TypeAdapter, counting how often the response is validated."""
+
+    def __init__(self, adapter):
+        self.adapter = adapter
+        self.validations = 0
+
+    def validate_python(self, content):
+        self.validations += 1
+        return self.adapter.validate_python(content)
+
+    def dump_json(self, value):
+        return self.adapter.dump_json(value)
+
+async def timed(render):
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        body = await render()
+    return (time.perf_counter() - started) / ROUNDS, body
+
+@pytest.mark.parametrize("size", [10, 100, 1000])
+async def test_user_list_serialization_cost(size, monkeypatch):
+    content = page(size)
+    field = next(route for route in app.routes if getattr(route, "name", None) == "list_users").response_field
+
+    async def validated():
+        response = UserListResponse(**dict(content, items=[UserResponse.model_validate(item) for item in content["items"]]))
+        return JSONResponse(await serialize_response(field=field, response_content=response, is_coroutine=True)).body
+
+    adapter = CountingAdapter(USER_LIST_ADAPTER)
+
+    async def fast():
+        return FastJSONResponse(content, adapter=adapter).body
+
+    legacy_time, legacy_body = await timed(validated)
+    fast_time, fast_body = await timed(fast)
+    orjson_validations = adapter.validations
+    monkeypatch.setattr("app.utils.json_response.orjson", None)
+    adapter_time, adapter_body = await timed(fast)
+
+    print(f"\n{size:>5} users: validated {legacy_time * 1e3:8.2f}ms, orjson {fast_time * 1e3:6.2f}ms "
+          f"({legacy_time / fast_time:.0f}x), TypeAdapter {adapter_time * 1e3:7.2f}ms ({legacy_time / adapter_time:.1f}x)")
+    assert json.loads(fast_body) == json.loads(legacy_body) == json.loads(adapter_body)
+    # orjson dumps the content as is; the fallback validates it once per response.
+    assert orjson_validations == 0
+    assert adapter.validations == ROUNDS
@@ -0,0 +1,145 @@
+from builtins import StopAsyncIteration, set, sorted
+import asyncio
+import time
+import pytest
+from sqlalchemy import event, exc, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from starlette.requests import Request
+from app.database import Database
+from app.dependencies import get_db
+from settings.config import settings
+
+@pytest.fixture
+async def fresh_database():
+    """Swap in an uninitialized Database for the test, then restore the shared engine."""
+    engine, session_factory = Database._engine, Database._session_factory
+    Database._engine = Database._session_factory = None
+    try:
+        yield Database
+    finally:
+        await Database.dispose()
+        Database._engine, Database._session_factory = engine, session_factory
+
+async def test_initialize_applies_pool_options(fresh_database):
+    fresh_database.initialize(settings.database_url, pool_size=2, max_overflow=1, statement_timeout_ms=50)
+    async with fresh_database.get_session_factory()() as session:
+        assert (await session.execute(text("SHOW statement_timeout"))).scalar() == "50ms"
+        with pytest.raises(exc.DBAPIError):
+            await session.execute(text("SELECT pg_sleep(0.5)"))
+    stats = fresh_database.pool_stats()
+    assert stats["size"] == 2
+    assert stats["max_overflow"] == 1
+    assert stats["checked_out"] == 0
+    assert stats["checkouts"] >= 1
+
+async def test_pool_timeout_is_counted(fresh_database):
+    fresh_database.initialize(settings.database_url, pool_size=1, max_overflow=0, pool_timeout=0.1)
+    engine = fresh_database._engine
+    async with engine.connect():
+        assert fresh_database.pool_stats()["checked_out"] == 1
+        with pytest.raises(exc.TimeoutError):
+            async with engine.connect():
+                pass
+    stats = fresh_database.pool_stats()
+    assert stats["timeouts"] == 1
+    assert stats["checkouts"] == 1
+
+async def test_pool_wait_excludes_connecting(fresh_database):
+    fresh_database.initialize(settings.database_url, pool_size=1, max_overflow=0, pool_timeout=5)
+    engine = fresh_database._engine
+    event.listen(engine.sync_engine, "connect", lambda dbapi_connection, record: time.sleep(0.2))
+    holder = await engine.connect()
+    waiter = asyncio.create_task(engine.connect().start())
+    await asyncio.sleep(0.15)
+    await holder.close()
+    await (await waiter).close()
+    stats = fresh_database.pool_stats()
+    assert stats["checkouts"] == 2
+    # The second checkout queued behind the first; opening the connection (0.2s) is not a wait.
+    assert 150 <= stats["wait_max_ms"] < 200
+
+async def test_statement_cache_disabled_for_pgbouncer(fresh_database):
+    fresh_database.initialize(settings.database_url, statement_cache_size=0)
+    async with fresh_database._engine.connect() as conn:
+        await conn.execute(text("SELECT CAST(:value AS integer)"), {"value": 1})
+        raw = await conn.get_raw_connection()
+        assert raw.driver_connection._stmt_cache.get_max_size() == 0
+        assert raw.dbapi_connection._prepared_statement_name_func() != raw.dbapi_connection._prepared_statement_name_func()
+
+async def test_pool_stats_requires_admin(async_client, user_token, admin_token):
+    response = await async_client.get("/admin/db-pool", headers={"Authorization": f"Bearer {user_token}"})
+    assert response.status_code == 403
+    response = await async_client.get("/admin/db-pool", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
+    assert {"size", "checked_out", "overflow", "checkouts", "wait_avg_ms"} <= response.json().keys()
+
+REPLICAS = ("replica_a_test", "replica_b_test")
+
+def database_url(name: str) -> str:
+    return make_url(settings.database_url).set(database=name).render_as_string(hide_password=False)
+
+@pytest.fixture(scope="module")
+def replica_urls():
+    """Stand-in replicas: separate databases on the test server, told apart by current_database()."""
+    async def create():
+        engine = create_async_engine(settings.database_url, isolation_level="AUTOCOMMIT")
+        async with engine.connect() as conn:
+            existing = set((await conn.execute(text("SELECT datname FROM pg_database"))).scalars())
+            for name in REPLICAS:
+                if name not in existing:
+                    await conn.execute(text(f'CREATE DATABASE "{name}"'))
+        await engine.dispose()
+    asyncio.run(create())
+    return [database_url(name) for name in REPLICAS]
+
+async def current_database(session) -> str:
+    return (await session.execute(text("SELECT current_database()"))).scalar()
+
+def make_request(method: str, token: str = "Bearer caller"):
+    return Request({"type": "http", "method": method, "headers": [(b"authorization", token.encode())], "client": ("127.0.0.1", 1)})
+
+async def read_via_get_db(request) -> str:
+    """Run get_db the way FastAPI does: take the session, then resume the generator to finish."""
+    sessions = get_db(request)
+    session = await sessions.__anext__()
+    name = await current_database(session)
+    with pytest.raises(StopAsyncIteration):
+        await sessions.__anext__()
+    return name
+
+async def test_reads_round_robin_over_replicas(fresh_database, replica_urls):
+    fresh_database.initialize(settings.database_url, replica_urls=replica_urls)
+    seen = []
+    for _ in range(4):
+        async with await fresh_database.open_read_session() as session:
+            seen.append(await current_database(session))
+            assert session.info["replica"]
+    assert sorted(seen) == sorted(REPLICAS * 2)
+    assert seen[0] != seen[1]
+    async with fresh_database.get_session_factory()() as session:
+        assert await current_database(session) == make_url(settings.database_url).database
+
+async def test_unreachable_replica_fails_over(fresh_database, replica_urls):
+    down = make_url(replica_urls[0]).set(port=1).render_as_string(hide_password=False)
+    fresh_database.initialize(settings.database_url, replica_urls=[down, replica_urls[1]])
+    for _ in range(3):
+        async with await fresh_database.open_read_session() as session:
+            assert await current_database(session) == REPLICAS[1]
+    assert [replica["healthy"] for replica in fresh_database.pool_stats()["replicas"]] == [False, True]
+
+async def test_reads_fall_back_to_primary_without_healthy_replicas(fresh_database, replica_urls):
+    down = make_url(replica_urls[0]).set(port=1).render_as_string(hide_password=False)
+    fresh_database.initialize(settings.database_url, replica_urls=[down])
+    async with await fresh_database.open_read_session() as session:
+        assert await current_database(session) == make_url(settings.database_url).database
+        assert "replica" not in session.info
+
+async def test_read_your_writes_window(fresh_database, replica_urls):
+    fresh_database.initialize(settings.database_url, replica_urls=replica_urls[:1], read_your_writes_window=60)
+    primary = make_url(settings.database_url).database
+    assert await read_via_get_db(make_request("GET")) == REPLICAS[0]
+    assert await read_via_get_db(make_request("POST")) == primary
+    # The writer now reads from the primary; other callers still use the replica.
+    assert await read_via_get_db(make_request("GET")) == primary
+    assert await read_via_get_db(make_request("GET", token="Bearer other")) == REPLICAS[0]
@@ -1,12 +1,22 @@
+import asyncio
 import pytest
 from app.dependencies import (
     get_settings,
     get_email_service,
     get_current_user,
-    require_role
+    require_role,
+    role_mask,
+    route_permissions,
+    ROLE_FLAGS,
 )
 from fastapi import HTTPException
+from app.container import ServiceContainer, get_container
+from app.services.login_activity import get_login_activity_buffer
+from app.database import Database
+from settings.config import settings
 from app.services.jwt_service import create_access_token
+from app.models.user_model import UserRole
+from app.main import app
 
 
 def test_get_settings_returns_settings_instance():
@@ -21,6 +31,42 @@ def test_get_email_service_returns_instance():
     assert service.template_manager is not None
 
 
+def test_dependencies_are_built_once():
+    assert get_settings() is get_settings()
+    assert get_email_service() is get_email_service()
+    assert get_email_service().template_manager is get_container().template_manager
+
+
+async def test_container_start_and_stop(monkeypatch):
+    monkeypatch.setattr(settings, "email_outbox_enabled", True)
+    container = ServiceContainer(settings)
+    await container.start()
+    try:
+        assert container.email_outbox_worker.running
+        assert Database.get_session_factory() is not None
+    finally:
+        await container.stop()
+        Database.initialize(settings.database_url)
+    assert container.email_outbox_worker is None
+    assert not container.started
+
+
+async def test_container_owns_login_write_behind(monkeypatch):
+    monkeypatch.setattr(settings, "email_outbox_enabled", False)
+    monkeypatch.setattr(settings, "login_write_behind_enabled", True)
+    container = ServiceContainer(settings)
+    await container.start()
+    try:
+        assert get_login_activity_buffer() is container.login_activity
+        flushed = []
+        monkeypatch.setattr(container.login_activity, "flush", lambda: flushed.append(True) or asyncio.sleep(0))
+    finally:
+        await container.stop()
+        Database.initialize(settings.database_url)
+    assert flushed, "stop should flush buffered logins"
+    assert get_login_activity_buffer() is None and container.login_activity is None
+
+
 def test_get_current_user_valid_token(monkeypatch):
     token_data = {"sub": "testuser", "role": "ADMIN"}
     token = create_access_token(data=token_data)
@@ -58,3 +104,30 @@ def test_require_role_blocks_incorrect_role():
 
     assert exc_info.value.status_code == 403
     assert "not permitted" in exc_info.value.detail
+
+
+def test_require_role_is_resolved_once_per_permission_set():
+    assert require_role(["ADMIN", "MANAGER"]) is require_role(["MANAGER", UserRole.ADMIN])
+    assert require_role("ADMIN") is not require_role(["ADMIN", "MANAGER"])
+    assert require_role(["ADMIN", "MANAGER"]).mask == ROLE_FLAGS["ADMIN"] | ROLE_FLAGS["MANAGER"]
+
+
+def test_require_role_rejects_unknown_declarations():
+    with pytest.raises(ValueError):
+        role_mask(["ADMIN", "SUPERUSER"])
+
+
+@pytest.mark.parametrize("role", ["AUTHENTICATED", "MAN", "", "admin", None])
+def test_require_role_blocks_roles_outside_the_set(role):
+    with pytest.raises(HTTPException) as exc_info:
+        require_role(["ADMIN", "MANAGER"])(current_user={"user_id": "123", "role": role})
+    assert exc_info.value.status_code == 403
+
+
+def test_route_permissions_table():
+    table = {(entry["path"], entry["methods"][0]): entry["roles"] for entry in route_permissions(app)}
+    assert table[("/users/", "GET")] == ["MANAGER", "ADMIN"]
+    assert table[("/users/export", "GET")] == ["ADMIN"]
+    assert table[("/login/", "POST")] is None
+    guarded = [roles for (path, _), roles in table.items() if path.startswith(("/users", "/admin"))]
+    assert guarded and all(guarded), "every /users and /admin route needs a role check"
@@ -1,4 +1,4 @@
-from builtins import len, max, sorted, str
+from builtins import len, max, range, sorted, str
 from unittest.mock import MagicMock
 from urllib.parse import parse_qs, urlparse, parse_qsl, urlunparse, urlencode
 from uuid import uuid4
@@ -6,7 +6,7 @@ from uuid import uuid4
 import pytest
 from fastapi import Request
 
-from app.utils.link_generation import create_link, create_pagination_link, create_user_links, generate_pagination_links
+from app.utils.link_generation import MAX_CACHED_BASE_URLS, create_link, create_pagination_link, create_user_links, generate_pagination_links, user_link_dicts, user_link_templates
 
 from urllib.parse import urlparse, parse_qs, urlunparse, urlencode
 
@@ -49,3 +49,32 @@ def test_generate_pagination_links(mock_request):
     assert len(links) >= 4
     expected_self_url = "http://testserver/users?limit=5&skip=10"
     assert normalize_url(str(links[0].href)) == normalize_url(expected_self_url), "Self link should match expected URL"
+
+def test_generate_cursor_pagination_links(mock_request):
+    links = generate_pagination_links(mock_request, 0, 5, 50, next_cursor="abc", prev_cursor=None, cursor_mode=True)
+    rels = {link.rel: str(link.href) for link in links}
+    assert set(rels) == {"self", "first", "last", "next"}
+    assert normalize_url(rels["next"]) == normalize_url("http://testserver/users?cursor=abc&limit=5")
+
+def test_user_link_routes_resolved_once(mock_request):
+    first, second = uuid4(), uuid4()
+    create_user_links(first, mock_request)
+    links = create_user_links(second, mock_request)
+    assert mock_request.url_for.call_count == 3
+    assert normalize_url(str(links[0].href)) == f"http://testserver/get_user/{second}"
+
+def test_user_link_dicts_match_models(mock_request):
+    user_id = uuid4()
+    models = [link.model_dump(mode="json") for link in create_user_links(user_id, mock_request)]
+    assert user_link_dicts(user_id, mock_request) == models
+
+def test_user_link_templates_bounded_per_app(mock_request):
+    for i in range(MAX_CACHED_BASE_URLS + 5):
+        mock_request.base_url = f"http://host{i}.example.com/"
+        user_link_templates(mock_request)
+    calls = mock_request.url_for.call_count
+    user_link_templates(mock_request)
+    assert mock_request.url_for.call_count == calls + 3, "base URLs beyond the bound are resolved, not cached"
+    mock_request.base_url = "http://host0.example.com/"
+    user_link_templates(mock_request)
+    assert mock_request.url_for.call_count == calls + 3
@@ -1,7 +1,9 @@
 from builtins import repr
 from datetime import datetime, timezone
 import pytest
+from sqlalchemy import create_engine, text
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import Base
 from app.models.user_model import User, UserRole
 
 @pytest.mark.asyncio
@@ -150,3 +152,19 @@ async def test_update_user_role(db_session: AsyncSession, user: User):
     await db_session.commit()
     await db_session.refresh(user)
     assert user.role == UserRole.ADMIN, "Role update should persist correctly in the database"
+
+def test_schema_creates_on_sqlite():
+    """
+    Tests that the Postgres-specific index options and DDL are skipped on other dialects.
+    """
+    engine = create_engine("sqlite://")
+    try:
+        Base.metadata.create_all(engine)
+        with engine.connect() as conn:
+            # Reflection leaves out expression indexes on SQLite, so read the catalog.
+            indexes = set(conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'users'")).scalars())
+        assert "ix_users_email_lower_prefix" in indexes
+        assert "ix_users_nickname_lower_prefix" in indexes
+        assert "ix_users_nickname_trgm" not in indexes
+    finally:
+        engine.dispose()
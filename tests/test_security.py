@@ -1,7 +1,15 @@
 # test_security.py
-from builtins import RuntimeError, ValueError, isinstance, str
+from builtins import RuntimeError, ValueError, isinstance, len, str
+import asyncio
 import pytest
-from app.utils.security import hash_password, verify_password
+from app.utils.security import (
+    PasswordHashingBusyError,
+    PasswordHashingPool,
+    hash_password,
+    hash_password_async,
+    verify_password,
+    verify_password_async,
+)
 
 def test_hash_password():
     """Test that hashing password returns a bcrypt hashed string."""
@@ -65,3 +73,66 @@ def test_hash_password_internal_error(monkeypatch):
     with pytest.raises(ValueError):
         hash_password("test")
 
+
+@pytest.mark.asyncio
+async def test_hash_and_verify_password_async():
+    """Test the pooled async variants agree with the sync implementation."""
+    hashed = await hash_password_async("secure_password", rounds=4)
+    assert hashed.startswith('$2b$')
+    assert await verify_password_async("secure_password", hashed) is True
+    assert await verify_password_async("wrong_password", hashed) is False
+    assert verify_password("secure_password", hashed) is True
+
+@pytest.mark.asyncio
+async def test_hashing_pool_runs_off_event_loop():
+    """Test that other coroutines keep running while bcrypt work is in the pool."""
+    pool = PasswordHashingPool(workers=2, max_queue=4)
+    hashed = []
+    ticks = []
+
+    async def hash_job():
+        hashed.append(await pool.run(hash_password, "secure_password", 10))
+
+    async def ticker():
+        for _ in range(5):
+            ticks.append(len(hashed))
+            await asyncio.sleep(0)
+
+    try:
+        await asyncio.gather(hash_job(), ticker())
+    finally:
+        pool.shutdown()
+    # Had bcrypt run on the loop, the hash would have finished before the ticker's first tick.
+    assert ticks == [0, 0, 0, 0, 0]
+    assert len(hashed) == 1
+    metrics = pool.metrics()
+    assert metrics["completed"] == 1
+    assert metrics["in_flight"] == 0
+
+@pytest.mark.asyncio
+async def test_hashing_pool_rejects_when_queue_full():
+    """Test that jobs beyond the queue limit are rejected and counted."""
+    pool = PasswordHashingPool(workers=1, max_queue=1)
+    try:
+        results = await asyncio.gather(
+            pool.run(hash_password, "first", 10),
+            pool.run(hash_password, "second", 10),
+            return_exceptions=True,
+        )
+    finally:
+        pool.shutdown()
+    assert isinstance(results[0], str)
+    assert isinstance(results[1], PasswordHashingBusyError)
+    assert pool.metrics()["rejected"] == 1
+
+def test_hashing_pool_rejects_unknown_executor():
+    with pytest.raises(ValueError):
+        PasswordHashingPool(executor="fibers")
+
+@pytest.mark.asyncio
+async def test_hashing_pool_stats_requires_admin(async_client, user_token, admin_token):
+    response = await async_client.get("/admin/hashing-pool", headers={"Authorization": f"Bearer {user_token}"})
+    assert response.status_code == 403
+    response = await async_client.get("/admin/hashing-pool", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
+    assert {"submitted", "completed", "rejected", "in_flight", "max_queue", "workers", "executor"} <= response.json().keys()
@@ -0,0 +1,151 @@
+from builtins import len, range
+from datetime import datetime, timezone
+import asyncio
+import pytest
+from sqlalchemy import select
+from app.database import run_after_commit
+from app.dependencies import get_settings
+from app.models.email_outbox_model import EmailOutbox
+from app.services.email_outbox import EmailOutboxWorker
+from app.services.email_service import EmailService
+from app.services.user_service import UserService
+from app.utils.smtp_connection import SMTPClient
+from app.utils.template_manager import TemplateManager
+
+pytestmark = pytest.mark.asyncio
+settings = get_settings()
+
+def make_worker(session_factory, port, **kwargs):
+    smtp_client = SMTPClient("127.0.0.1", port, "user", "password", use_tls=False)
+    return EmailOutboxWorker(session_factory, smtp_client, **kwargs)
+
+async def create_user(db_session, email_service):
+    return await UserService.create(db_session, {"email": "outbox@example.com", "password": "Outbox*1234"}, email_service)
+
+# Test that registration queues the verification email instead of sending it
+async def test_create_user_enqueues_verification_email(db_session, email_service, fake_smtp_server):
+    user = await create_user(db_session, email_service)
+    messages = (await db_session.execute(select(EmailOutbox))).scalars().all()
+    assert len(messages) == 1
+    assert messages[0].recipient == user.email
+    assert messages[0].status == "pending"
+    assert user.verification_token in messages[0].body
+    assert fake_smtp_server.messages == []
+
+# Test that the worker delivers queued messages and records them as sent
+async def test_worker_delivers_pending_messages(db_session, email_service, session_factory, fake_smtp_server):
+    await create_user(db_session, email_service)
+    worker = make_worker(session_factory, fake_smtp_server.port)
+    assert await worker.drain_once() == 1
+    assert [recipients for _, recipients, _ in fake_smtp_server.messages] == [["outbox@example.com"]]
+
+    db_session.expire_all()
+    message = (await db_session.execute(select(EmailOutbox))).scalars().one()
+    assert message.status == "sent"
+    assert message.attempts == 1
+    assert message.sent_at is not None
+    assert await worker.drain_once() == 0
+
+# Test that failed deliveries back off and are eventually marked failed
+async def test_worker_retries_with_backoff(db_session, email_service, session_factory, fake_smtp_server):
+    await create_user(db_session, email_service)
+    closed_port = fake_smtp_server.port
+    fake_smtp_server.stop()
+    worker = make_worker(session_factory, closed_port, max_attempts=2, backoff_base=0)
+
+    assert await worker.drain_once() == 1
+    db_session.expire_all()
+    message = (await db_session.execute(select(EmailOutbox))).scalars().one()
+    assert (message.status, message.attempts) == ("pending", 1)
+    assert message.last_error
+
+    assert await worker.drain_once() == 1
+    db_session.expire_all()
+    message = (await db_session.execute(select(EmailOutbox))).scalars().one()
+    assert (message.status, message.attempts) == ("failed", 2)
+
+# Test that a failed attempt is not retried before its backoff delay
+async def test_worker_skips_messages_not_yet_due(db_session, email_service, session_factory, fake_smtp_server):
+    await create_user(db_session, email_service)
+    message = (await db_session.execute(select(EmailOutbox))).scalars().one()
+    message.next_attempt_at = datetime(2999, 1, 1, tzinfo=timezone.utc)
+    await db_session.commit()
+    worker = make_worker(session_factory, fake_smtp_server.port)
+    assert await worker.drain_once() == 0
+
+# Test that the background loop drains the outbox and stops cleanly
+async def test_worker_start_and_stop(db_session, email_service, session_factory, fake_smtp_server):
+    await create_user(db_session, email_service)
+    worker = make_worker(session_factory, fake_smtp_server.port, poll_interval=0.05)
+    worker.start()
+    for _ in range(100):
+        if fake_smtp_server.messages:
+            break
+        await asyncio.sleep(0.05)
+    await worker.stop()
+    assert not worker.running
+    assert len(fake_smtp_server.messages) == 1
+
+# Test that with the outbox disabled the verification email waits for the commit
+async def test_create_user_sends_verification_email_after_commit(session_factory, fake_smtp_server, monkeypatch):
+    monkeypatch.setattr(settings, "email_outbox_enabled", False)
+    smtp_client = SMTPClient("127.0.0.1", fake_smtp_server.port, "user", "password", use_tls=False)
+    email_service = EmailService(TemplateManager(), smtp_client)
+    async with session_factory() as session:
+        # As in a request: services only flush, and the caller commits.
+        session.info["unit_of_work"] = True
+        await create_user(session, email_service)
+        assert fake_smtp_server.messages == []
+
+        await session.commit()
+        await run_after_commit(session)
+    assert [recipients for _, recipients, _ in fake_smtp_server.messages] == [["outbox@example.com"]]
+
+# Test that the claimed rows are committed and unlocked while the batch is being sent
+async def test_worker_holds_no_lock_during_send(db_session, email_service, session_factory):
+    await create_user(db_session, email_service)
+    loop = asyncio.get_running_loop()
+    seen = []
+
+    async def inspect_outbox():
+        async with session_factory() as session:
+            query = select(EmailOutbox.status).with_for_update(nowait=True)
+            return (await session.execute(query)).scalars().all()
+
+    class InspectingClient:
+        def send_emails(self, messages):
+            seen.extend(asyncio.run_coroutine_threadsafe(inspect_outbox(), loop).result())
+            return [None] * len(messages)
+
+    worker = EmailOutboxWorker(session_factory, InspectingClient())
+    assert await worker.drain_once() == 1
+    assert seen == ["sending"]
+    db_session.expire_all()
+    assert (await db_session.execute(select(EmailOutbox.status))).scalar_one() == "sent"
+
+# Test that a claim abandoned by a dead worker is picked up again once its lease expires
+async def test_worker_reclaims_expired_claims(db_session, email_service, session_factory, fake_smtp_server):
+    await create_user(db_session, email_service)
+    message = (await db_session.execute(select(EmailOutbox))).scalars().one()
+    message.status = "sending"
+    await db_session.commit()
+    worker = make_worker(session_factory, fake_smtp_server.port)
+    assert await worker.drain_once() == 1
+    assert len(fake_smtp_server.messages) == 1
+    db_session.expire_all()
+    message = (await db_session.execute(select(EmailOutbox))).scalars().one()
+    assert (message.status, message.attempts) == ("sent", 1)
+
+# Test that a lease which keeps expiring still uses up attempts and ends as failed
+async def test_worker_fails_expired_claims_without_attempts_left(db_session, email_service, session_factory, fake_smtp_server):
+    await create_user(db_session, email_service)
+    message = (await db_session.execute(select(EmailOutbox))).scalars().one()
+    message.status, message.attempts = "sending", 2
+    await db_session.commit()
+    worker = make_worker(session_factory, fake_smtp_server.port, max_attempts=2)
+    assert await worker.drain_once() == 0
+    assert fake_smtp_server.messages == []
+    db_session.expire_all()
+    message = (await db_session.execute(select(EmailOutbox))).scalars().one()
+    assert (message.status, message.attempts) == ("failed", 2)
+    assert message.last_error
@@ -1,7 +1,9 @@
+from builtins import len, max, range
+import time
 import pytest
 import jwt
 from datetime import timedelta, datetime
-from app.services.jwt_service import create_access_token, decode_token
+from app.services.jwt_service import TokenCache, create_access_token, decode_token, revoke_subject, revoke_token, set_token_cache
 from settings.config import settings
 
 def test_create_and_decode_valid_token():
@@ -38,3 +40,78 @@ def test_token_contains_expiry():
     assert "exp" in decoded
     assert isinstance(decoded["exp"], int)
     assert datetime.utcfromtimestamp(decoded["exp"]) > datetime.utcnow()
+
+@pytest.fixture
+def token_cache():
+    cache = TokenCache(maxsize=2)
+    set_token_cache(cache)
+    yield cache
+    set_token_cache(None)
+
+@pytest.fixture
+def count_decodes(monkeypatch):
+    calls = []
+    real_decode = jwt.decode
+    def counting_decode(*args, **kwargs):
+        calls.append(args[0])
+        return real_decode(*args, **kwargs)
+    monkeypatch.setattr("app.services.jwt_service.jwt.decode", counting_decode)
+    return calls
+
+def test_token_cache_verifies_once(token_cache, count_decodes):
+    token = create_access_token(data={"sub": "cached@example.com", "role": "admin"})
+    first, second = decode_token(token), decode_token(token)
+    assert first == second and first["role"] == "ADMIN"
+    assert len(count_decodes) == 1
+    first["role"] = "MUTATED"
+    assert decode_token(token)["role"] == "ADMIN"
+    assert (token_cache.stats()["hits"], token_cache.stats()["misses"], token_cache.stats()["hit_rate"]) == (2, 1, 0.6667)
+
+def test_token_cache_drops_entries_at_expiry(token_cache):
+    token = create_access_token(data={"sub": "expiring@example.com", "role": "admin"}, expires_delta=timedelta(seconds=1))
+    expires = decode_token(token)["exp"]
+    assert token_cache.stats()["size"] == 1
+    time.sleep(max(0.0, expires - time.time()) + 0.05)
+    assert decode_token(token) is None
+    assert token_cache.stats()["expired"] == 1 and token_cache.stats()["size"] == 0
+
+def test_token_cache_is_bounded(token_cache, count_decodes):
+    tokens = [create_access_token(data={"sub": f"user{i}@example.com", "role": "admin"}) for i in range(3)]
+    for token in tokens:
+        decode_token(token)
+    assert token_cache.stats()["size"] == 2 and token_cache.stats()["evictions"] == 1
+    decode_token(tokens[0])
+    assert len(count_decodes) == 4, "the least recently used token was evicted and verified again"
+
+def test_token_cache_never_stores_invalid_tokens(token_cache):
+    expired = create_access_token(data={"sub": "old@example.com", "role": "admin"}, expires_delta=timedelta(seconds=-1))
+    assert decode_token(expired) is None
+    assert decode_token("this.is.not.a.valid.token") is None
+    assert token_cache.stats()["size"] == 0
+
+def test_revoke_token(token_cache):
+    token = create_access_token(data={"sub": "revoked@example.com", "role": "admin"})
+    other = create_access_token(data={"sub": "revoked@example.com", "role": "admin"}, expires_delta=timedelta(minutes=5))
+    assert decode_token(token) is not None
+    revoke_token(token)
+    assert decode_token(token) is None
+    assert decode_token(other) is not None
+
+def test_revoke_subject_rejects_earlier_tokens(token_cache):
+    token = create_access_token(data={"sub": "everywhere@example.com", "role": "admin"})
+    assert decode_token(token) is not None
+    revoke_subject("everywhere@example.com")
+    assert decode_token(token) is None
+    # iat has whole-second resolution: a token issued in the next second is accepted again.
+    time.sleep(1.0 - time.time() % 1.0 + 0.05)
+    assert decode_token(create_access_token(data={"sub": "everywhere@example.com", "role": "admin"})) is not None
+
+def test_zero_size_cache_verifies_every_time(count_decodes):
+    set_token_cache(TokenCache(maxsize=0))
+    try:
+        token = create_access_token(data={"sub": "nocache@example.com", "role": "admin"})
+        decode_token(token)
+        decode_token(token)
+        assert len(count_decodes) == 2
+    finally:
+        set_token_cache(None)
@@ -0,0 +1,109 @@
+from builtins import RuntimeError, len, range
+from datetime import datetime, timedelta, timezone
+import asyncio
+import pytest
+from sqlalchemy import select, update
+from app.models.user_model import User
+from app.services.login_activity import LoginActivityBuffer, set_login_activity_buffer
+from app.services.user_service import LoginOutcome, UserService
+
+pytestmark = pytest.mark.asyncio
+
+PASSWORD = "MySuperPassword$1234"
+
+@pytest.fixture
+def login_buffer(session_factory):
+    buffer = LoginActivityBuffer(session_factory, flush_interval=60.0, max_entries=100)
+    set_login_activity_buffer(buffer)
+    yield buffer
+    set_login_activity_buffer(None)
+
+async def login_state(session_factory, user_id):
+    async with session_factory() as session:
+        result = await session.execute(select(User.last_login_at, User.failed_login_attempts).where(User.id == user_id))
+        return result.one()
+
+# Test logins are coalesced per user and written in a single UPDATE
+async def test_flush_coalesces_logins(session_factory, user, verified_user, query_counter):
+    buffer = LoginActivityBuffer(session_factory)
+    now = datetime.now(timezone.utc)
+    buffer.record(user.id, now - timedelta(minutes=1))
+    buffer.record(user.id, now)
+    buffer.record(verified_user.id, now - timedelta(minutes=2))
+    assert buffer.pending == 2
+
+    assert await buffer.flush() == 2
+    assert len([s for s in query_counter if s.startswith("UPDATE")]) == 1
+    assert (await login_state(session_factory, user.id)).last_login_at == now
+    assert (await login_state(session_factory, verified_user.id)).last_login_at == now - timedelta(minutes=2)
+    assert buffer.pending == 0 and await buffer.flush() == 0
+
+# Test a late flush never moves last_login_at backwards
+async def test_flush_keeps_newer_login(session_factory, db_session, user):
+    now = datetime.now(timezone.utc)
+    await db_session.execute(update(User).where(User.id == user.id).values(last_login_at=now))
+    await db_session.commit()
+    buffer = LoginActivityBuffer(session_factory)
+    buffer.record(user.id, now - timedelta(hours=1))
+    await buffer.flush()
+    assert (await login_state(session_factory, user.id)).last_login_at == now
+
+# Test the worker flushes early once max_entries users are pending, and stop writes the rest
+async def test_worker_flushes_when_full_and_on_stop(session_factory, user, verified_user):
+    buffer = LoginActivityBuffer(session_factory, flush_interval=60.0, max_entries=2)
+    buffer.start()
+    buffer.record(user.id)
+    buffer.record(verified_user.id)
+    for _ in range(50):
+        if buffer.metrics["flushes"]:
+            break
+        await asyncio.sleep(0.02)
+    assert buffer.stats()["rows_written"] == 2
+
+    buffer.record(user.id)
+    await buffer.stop()
+    stats = buffer.stats()
+    assert (stats["flushes"], stats["rows_written"], stats["pending"]) == (2, 3, 0)
+
+# Test a failed flush keeps the batch for the next attempt
+async def test_failed_flush_keeps_pending(user):
+    def broken_factory():
+        raise RuntimeError("database unavailable")
+    buffer = LoginActivityBuffer(broken_factory)
+    buffer.record(user.id)
+    with pytest.raises(RuntimeError):
+        await buffer.flush()
+    assert buffer.pending == 1 and buffer.metrics["errors"] == 1
+
+# Test a clean login is only queued, while a counter reset is written immediately
+async def test_authenticate_writes_behind_only_without_failures(db_session, session_factory, verified_user, login_buffer):
+    outcome, _ = await UserService.authenticate(db_session, verified_user.email, PASSWORD)
+    assert outcome is LoginOutcome.SUCCESS
+    assert login_buffer.pending == 1
+    assert (await login_state(session_factory, verified_user.id)).last_login_at is None
+
+    await login_buffer.flush()
+    await UserService.authenticate(db_session, verified_user.email, "wrong-password")
+    await UserService.authenticate(db_session, verified_user.email, PASSWORD)
+    state = await login_state(session_factory, verified_user.id)
+    assert state.failed_login_attempts == 0 and login_buffer.pending == 0
+
+# Test lockout counts stay exact around buffered logins
+async def test_lockout_counts_stay_consistent(db_session, session_factory, verified_user, login_buffer):
+    await UserService.authenticate(db_session, verified_user.email, PASSWORD)
+    await UserService.authenticate(db_session, verified_user.email, "wrong-password")
+    assert (await login_state(session_factory, verified_user.id)).failed_login_attempts == 1
+    await login_buffer.flush()
+    assert (await login_state(session_factory, verified_user.id)).failed_login_attempts == 1
+
+# Test the write-behind path re-checks the lock taken while bcrypt ran
+async def test_write_behind_rejects_account_locked_during_bcrypt(db_session, session_factory, verified_user, login_buffer, monkeypatch):
+    async def lock_then_verify(*args):
+        async with session_factory() as session:
+            await session.execute(update(User).where(User.id == verified_user.id).values(is_locked=True))
+            await session.commit()
+        return True
+    monkeypatch.setattr("app.services.user_service.verify_password_async", lock_then_verify)
+    outcome, _ = await UserService.authenticate(db_session, verified_user.email, PASSWORD)
+    assert outcome is LoginOutcome.LOCKED
+    assert login_buffer.pending == 0
@@ -1,9 +1,18 @@
-from builtins import range
+from builtins import dict, next, range, set, tuple
+import asyncio
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
 import pytest
-from sqlalchemy import select
+from sqlalchemy import insert, select, text, update
+from sqlalchemy.exc import DBAPIError
+from app.database import run_after_commit
 from app.dependencies import get_settings
-from app.models.user_model import User
-from app.services.user_service import UserService
+from app.models.user_model import User, UserRole
+from app.schemas.pagination_schema import PageCursor
+from app.schemas.user_schemas import UserResponse, UserSearch
+from app.services.jwt_service import TokenCache, create_access_token, decode_token, set_token_cache
+from app.services.user_service import USER_RESPONSE_COLUMNS, LoginOutcome, UserConflictError, UserService
+from app.utils.user_cache import get_user_cache
 
 pytestmark = pytest.mark.asyncio
 
@@ -70,6 +79,25 @@ async def test_update_user_invalid_data(db_session, user):
     updated_user = await UserService.update(db_session, user.id, {"email": "invalidemail"})
     assert updated_user is None
 
+# Updating to another user's email or nickname is a conflict, not a missing user
+async def test_update_user_duplicate_email_or_nickname(db_session, user, admin_user):
+    # The failed UPDATE rolls the session back and expires the loaded users.
+    user_id, email, nickname = user.id, admin_user.email, admin_user.nickname
+    with pytest.raises(UserConflictError) as conflict:
+        await UserService.update(db_session, user_id, {"email": email})
+    assert conflict.value.field == "email"
+    with pytest.raises(UserConflictError) as conflict:
+        await UserService.update(db_session, user_id, {"nickname": nickname})
+    assert conflict.value.field == "nickname"
+
+# A database error other than a conflict is raised, not reported as a missing user
+async def test_update_user_database_error_propagates(db_session, user):
+    # The failed UPDATE rolls the session back and expires the loaded user.
+    user_id, first_name = user.id, user.first_name
+    with pytest.raises(DBAPIError):
+        await UserService.update(db_session, user_id, {"first_name": "x" * 101})
+    assert (await UserService.get_by_id(db_session, user_id)).first_name == first_name
+
 # Test deleting a user who exists
 async def test_delete_user_exists(db_session, user):
     deletion_success = await UserService.delete(db_session, user.id)
@@ -135,6 +163,47 @@ async def test_account_lock_after_failed_logins(db_session, verified_user):
     is_locked = await UserService.is_account_locked(db_session, verified_user.email)
     assert is_locked, "The account should be locked after the maximum number of failed login attempts."
 
+@pytest.fixture
+def token_cache():
+    cache = TokenCache()
+    set_token_cache(cache)
+    yield cache
+    set_token_cache(None)
+
+def issue_token(user):
+    return create_access_token(data={"sub": user.email, "role": user.role.name})
+
+async def test_account_lock_revokes_tokens(db_session, verified_user, token_cache):
+    token = issue_token(verified_user)
+    for _ in range(get_settings().max_login_attempts - 1):
+        await UserService.login_user(db_session, verified_user.email, "wrongpassword")
+    assert decode_token(token) is not None
+    await UserService.login_user(db_session, verified_user.email, "wrongpassword")
+    assert decode_token(token) is None
+
+async def test_update_revokes_tokens_on_email_or_password_change(db_session, user, token_cache):
+    old_token = issue_token(user)
+    await UserService.update(db_session, user.id, {"first_name": "Unchanged"})
+    assert decode_token(old_token) is not None
+    await UserService.update(db_session, user.id, {"email": "moved_address@example.com"})
+    assert decode_token(old_token) is None
+
+async def test_professional_status_change_and_delete_revoke_tokens(db_session, user, token_cache):
+    token = issue_token(user)
+    await UserService.update_professional_status(db_session, user.id, True)
+    assert decode_token(token) is None
+    token_cache._revoked_subjects.clear()
+    assert decode_token(token) is not None
+    await UserService.delete(db_session, user.id)
+    assert decode_token(token) is None
+
+async def test_failed_update_does_not_revoke_tokens(db_session, user, admin_user, token_cache):
+    token = issue_token(user)
+    user_id, taken = user.id, admin_user.email
+    with pytest.raises(UserConflictError):
+        await UserService.update(db_session, user_id, {"email": taken})
+    assert decode_token(token) is not None
+
 # Test resetting a user's password
 async def test_reset_password(db_session, user):
     new_password = "NewPassword123!"
@@ -178,3 +247,441 @@ async def test_upgrade_to_professional_user_not_found(db_session):
     )
     assert upgraded is False
 
+
+# Test that a locked account is rejected before bcrypt runs
+async def test_authenticate_locked_user_skips_bcrypt(db_session, locked_user, monkeypatch):
+    async def fail_verify(*args):
+        raise AssertionError("bcrypt should not run for a locked account")
+    monkeypatch.setattr("app.services.user_service.verify_password_async", fail_verify)
+    outcome, user = await UserService.authenticate(db_session, locked_user.email, "MySuperPassword$1234")
+    assert outcome is LoginOutcome.LOCKED
+    assert user is None
+
+# Test that an unverified account is rejected before bcrypt runs
+async def test_authenticate_unverified_user_skips_bcrypt(db_session, unverified_user, monkeypatch):
+    async def fail_verify(*args):
+        raise AssertionError("bcrypt should not run for an unverified account")
+    monkeypatch.setattr("app.services.user_service.verify_password_async", fail_verify)
+    outcome, _ = await UserService.authenticate(db_session, unverified_user.email, "MySuperPassword$1234")
+    assert outcome is LoginOutcome.UNVERIFIED
+
+# Test that a successful login is one transaction with one SELECT and one UPDATE
+async def test_login_user_round_trips(db_session, verified_user, query_counter):
+    outcome, user = await UserService.authenticate(db_session, verified_user.email, "MySuperPassword$1234")
+    assert outcome is LoginOutcome.SUCCESS
+    assert user.email == verified_user.email
+    statements = [s.split()[0].upper() for s in query_counter]
+    assert statements == ["BEGIN", "SELECT", "UPDATE", "COMMIT"]
+
+# Test that a correct password cannot win against a lockout that lands while bcrypt runs
+async def test_authenticate_rejects_account_locked_during_bcrypt(db_session, verified_user, session_factory, monkeypatch):
+    async def lock_then_verify(*args):
+        async with session_factory() as session:
+            await session.execute(update(User).where(User.id == verified_user.id).values(is_locked=True, failed_login_attempts=3))
+            await session.commit()
+        return True
+    monkeypatch.setattr("app.services.user_service.verify_password_async", lock_then_verify)
+    outcome, user = await UserService.authenticate(db_session, verified_user.email, "MySuperPassword$1234")
+    assert (outcome, user) == (LoginOutcome.LOCKED, None)
+    result = await db_session.execute(select(User.failed_login_attempts, User.is_locked).where(User.id == verified_user.id))
+    assert tuple(result.one()) == (3, True)
+
+# Test that concurrent failed logins cannot push the counter past the limit
+async def test_concurrent_failed_logins_lock_exactly_once(db_session, verified_user, session_factory):
+    max_login_attempts = get_settings().max_login_attempts
+
+    async def attempt():
+        async with session_factory() as session:
+            return await UserService.authenticate(session, verified_user.email, "wrongpassword")
+
+    await asyncio.gather(*(attempt() for _ in range(max_login_attempts * 2)))
+    result = await db_session.execute(
+        select(User.failed_login_attempts, User.is_locked).where(User.id == verified_user.id)
+    )
+    attempts, is_locked = result.one()
+    assert is_locked
+    assert attempts == max_login_attempts
+
+# Test walking every page forwards and back with keyset pagination
+async def test_list_users_keyset_pagination(db_session, users_with_same_role_50_users):
+    users, has_next, has_prev = await UserService.list_users_keyset(db_session, limit=20)
+    assert has_next and not has_prev
+    pages = [users]
+    while has_next:
+        last = users[-1]
+        cursor = PageCursor(direction="next", value=last.created_at, id=last.id)
+        users, has_next, has_prev = await UserService.list_users_keyset(db_session, limit=20, cursor=cursor)
+        assert has_prev
+        pages.append(users)
+    seen = [user.id for page in pages for user in page]
+    assert [len(page) for page in pages] == [20, 20, 10]
+    assert len(set(seen)) == 50
+
+    first = pages[-1][0]
+    cursor = PageCursor(direction="prev", value=first.created_at, id=first.id)
+    users, has_next, has_prev = await UserService.list_users_keyset(db_session, limit=20, cursor=cursor)
+    assert [user.id for user in users] == [user.id for user in pages[1]]
+    assert has_next and has_prev
+
+# Test that offset pages follow the same stable order as keyset pages
+async def test_list_users_offset_matches_keyset_order(db_session, users_with_same_role_50_users):
+    offset_page = await UserService.list_users(db_session, skip=10, limit=10)
+    keyset_page, _, _ = await UserService.list_users_keyset(db_session, limit=20)
+    assert [user.id for user in offset_page] == [user.id for user in keyset_page[10:]]
+
+# Test the cached count strategy is invalidated by create and delete
+async def test_count_cached_strategy_invalidation(db_session, user, email_service, mock_smtp):
+    UserService.invalidate_count_cache()
+    total, strategy = await UserService.count_with_strategy(db_session, "cached")
+    assert (total, strategy) == (1, "cached")
+
+    db_session.add(User(nickname="uncounted", email="uncounted@example.com", hashed_password="x"))
+    await db_session.commit()
+    total, _ = await UserService.count_with_strategy(db_session, "cached")
+    assert total == 1, "Writes outside UserService are only seen once the TTL expires"
+
+    await UserService.create(db_session, {"email": "counted@example.com", "password": "Counted*123"}, email_service)
+    total, _ = await UserService.count_with_strategy(db_session, "cached")
+    assert total == 3
+
+    await UserService.delete(db_session, user.id)
+    total, _ = await UserService.count_with_strategy(db_session, "cached")
+    assert total == 2
+    UserService.invalidate_count_cache()
+
+# Test a unit of work keeps the cached count until its transaction commits
+async def test_count_cache_invalidated_on_commit(session_factory, user, email_service, mock_smtp):
+    UserService.invalidate_count_cache()
+    async with session_factory() as session:
+        session.info["unit_of_work"] = True
+        assert (await UserService.count_with_strategy(session, "cached"))[0] == 1
+        await UserService.create(session, {"email": "pending@example.com", "password": "Pending*123"}, email_service)
+        assert UserService._count_cache is not None, "the new user is not committed yet"
+        await session.commit()
+        await run_after_commit(session)
+    assert UserService._count_cache is None
+    async with session_factory() as session:
+        assert (await UserService.count_with_strategy(session, "cached"))[0] == 2
+    UserService.invalidate_count_cache()
+
+# Test the estimated count strategy uses planner statistics once the table is analyzed
+async def test_count_estimated_strategy(db_session, users_with_same_role_50_users):
+    await db_session.execute(text("ANALYZE users"))
+    total, strategy = await UserService.count_with_strategy(db_session, "estimated")
+    assert strategy == "estimated"
+    assert total == 50
+
+async def test_count_unknown_strategy(db_session):
+    with pytest.raises(ValueError):
+        await UserService.count_with_strategy(db_session, "guess")
+
+# Test that projected listings return rows with only the response columns
+async def test_list_users_projected_columns(db_session, users_with_same_role_50_users):
+    rows = await UserService.list_users(db_session, skip=0, limit=10, columns=USER_RESPONSE_COLUMNS)
+    entities = await UserService.list_users(db_session, skip=0, limit=10)
+    assert [row.id for row in rows] == [user.id for user in entities]
+    assert "hashed_password" not in rows[0]._fields
+    page, _, _ = await UserService.list_users_keyset(db_session, limit=10, columns=(User.id, User.email))
+    assert set(page[0]._fields) == {"id", "email", "created_at"}
+
+# Test that bulk import inserts each batch with one INSERT and checks conflicts with IN queries
+async def test_bulk_create_batches(db_session, query_counter):
+    async def records():
+        for i in range(7):
+            yield {"email": f"bulk{i}@example.com", "password": "Bulk*12345"}
+
+    report, created = await UserService.bulk_create(db_session, records(), batch_size=5)
+    assert created == 7
+    assert all(row["status"] == "created" for row in report)
+    inserts = [s for s in query_counter if s.startswith("INSERT")]
+    assert len(inserts) == 2
+    nicknames = (await db_session.execute(select(User.nickname))).scalars().all()
+    assert len(set(nicknames)) == 7
+    assert await UserService.count(db_session) == 7
+
+# Test that a row taken concurrently after the conflict checks is reported, not fatal to the batch
+async def test_bulk_create_reports_rows_lost_to_a_race(db_session, user, monkeypatch):
+    email = user.email
+    async def nothing_taken(cls, session, column, values):
+        return set()
+    monkeypatch.setattr(UserService, "_existing_values", classmethod(nothing_taken))
+
+    async def records():
+        yield {"email": "racefree@example.com", "password": "Bulk*12345"}
+        yield {"email": email, "password": "Bulk*12345"}
+
+    report, created = await UserService.bulk_create(db_session, records())
+    assert created == 1
+    assert [(row["status"], row.get("errors")) for row in report] == [("created", None), ("duplicate", ["email already exists"])]
+    assert await UserService.count(db_session) == 2
+
+# Test that losing a nickname race to another registration retries with a new name
+async def test_create_retries_on_nickname_conflict(db_session, user, email_service, mock_smtp, monkeypatch):
+    candidates = iter([user.nickname, "fresh_nickname_1"])
+
+    async def fake_allocate(cls, session, count, taken):
+        return [next(candidates)]
+
+    monkeypatch.setattr(UserService, "_allocate_nicknames", classmethod(fake_allocate))
+    created = await UserService.create(db_session, {"email": "race@example.com", "password": "Race*12345"}, email_service)
+    assert created is not None
+    assert created.nickname == "fresh_nickname_1"
+    assert await UserService.count(db_session) == 2
+
+# Test that an email conflict is told apart from a nickname one by the violated index, not the message text
+async def test_insert_with_nickname_email_conflict_is_not_retried(db_session, monkeypatch):
+    db_session.add(User(nickname="first_owner", email="nickname@example.com", hashed_password="x"))
+    await db_session.commit()
+    candidates = iter(["second_owner"])
+
+    async def fake_allocate(cls, session, count, taken):
+        return [next(candidates)]
+
+    monkeypatch.setattr(UserService, "_allocate_nicknames", classmethod(fake_allocate))
+    duplicate = User(email="nickname@example.com", hashed_password="x")
+    assert await UserService._insert_with_nickname(db_session, duplicate) is False
+
+# Test that the allocator gives up instead of looping forever when the space is exhausted
+async def test_allocate_nicknames_exhausted(db_session, monkeypatch):
+    monkeypatch.setattr("app.services.user_service.generate_nickname", lambda: "only_name")
+    with pytest.raises(RuntimeError):
+        await UserService._allocate_nicknames(db_session, 1, {"only_name"})
+
+# Test that each candidate batch costs a single query
+async def test_allocate_nicknames_one_query_per_batch(db_session, query_counter):
+    nicknames = await UserService._allocate_nicknames(db_session, 3, set())
+    assert len(set(nicknames)) == 3
+    assert len([s for s in query_counter if s.startswith("SELECT")]) == 1
+
+async def test_get_response_by_id_reads_through_cache(db_session, user, query_counter):
+    first = await UserService.get_response_by_id(db_session, user.id)
+    query_counter.clear()
+    second = await UserService.get_response_by_id(db_session, user.id)
+    assert second == first
+    assert query_counter == []
+    assert set(first) == set(UserResponse.model_fields) - {"links"}
+    assert not {"hashed_password", "verification_token", "failed_login_attempts"} & set(first)
+
+async def test_get_response_by_id_does_not_cache_replica_reads(session_factory, user):
+    async with session_factory() as session:
+        session.info["replica"] = True
+        assert (await UserService.get_response_by_id(session, user.id))["email"] == user.email
+    assert await get_user_cache().get(str(user.id)) is None
+
+async def test_get_response_by_id_missing_user(db_session):
+    assert await UserService.get_response_by_id(db_session, uuid4()) is None
+
+async def test_get_response_by_email_reads_through_cache(db_session, user, query_counter):
+    first = await UserService.get_response_by_email(db_session, user.email)
+    assert first == await UserService.get_response_by_id(db_session, user.id)
+    query_counter.clear()
+    assert await UserService.get_response_by_email(db_session, user.email) == first
+    assert query_counter == []
+
+async def test_get_response_by_email_follows_email_change(db_session, user):
+    old_email = user.email
+    await UserService.get_response_by_email(db_session, old_email)
+    await UserService.update(db_session, user.id, {"email": "changed_address@example.com"})
+    assert await UserService.get_response_by_email(db_session, old_email) is None
+    assert (await UserService.get_response_by_email(db_session, "changed_address@example.com"))["id"] == str(user.id)
+
+async def test_update_invalidates_cached_user(db_session, user):
+    await UserService.get_response_by_id(db_session, user.id)
+    await UserService.update(db_session, user.id, {"first_name": "Changed"})
+    assert (await UserService.get_response_by_id(db_session, user.id))["first_name"] == "Changed"
+
+async def test_upgrade_invalidates_cached_user(db_session, user):
+    assert (await UserService.get_response_by_id(db_session, user.id))["is_professional"] is False
+    await UserService.upgrade_to_professional(db_session, user.id, "ADMIN")
+    assert (await UserService.get_response_by_id(db_session, user.id))["is_professional"] is True
+
+async def test_verify_email_invalidates_cached_user(db_session, unverified_user):
+    unverified_user.role = UserRole.ANONYMOUS
+    unverified_user.verification_token = "token"
+    await db_session.commit()
+    assert (await UserService.get_response_by_id(db_session, unverified_user.id))["role"] == "ANONYMOUS"
+    await UserService.verify_email_with_token(db_session, unverified_user.id, "token")
+    assert (await UserService.get_response_by_id(db_session, unverified_user.id))["role"] == "AUTHENTICATED"
+
+async def test_delete_invalidates_cached_user(db_session, user):
+    await UserService.get_response_by_id(db_session, user.id)
+    await UserService.delete(db_session, user.id)
+    assert await UserService.get_response_by_id(db_session, user.id) is None
+
+async def test_invalidation_waits_for_unit_of_work_commit(db_session, user, session_factory):
+    await UserService.get_response_by_id(db_session, user.id)
+    async with session_factory() as session:
+        session.info["unit_of_work"] = True
+        await UserService.update(session, user.id, {"first_name": "Pending"})
+        # Flushed but not committed: the cache still serves the committed row.
+        assert (await UserService.get_response_by_id(db_session, user.id))["first_name"] != "Pending"
+        await session.commit()
+        await run_after_commit(session)
+    assert (await UserService.get_response_by_id(db_session, user.id))["first_name"] == "Pending"
+
+async def test_lock_unlock_and_reset_invalidate_cached_user(db_session, verified_user):
+    cache = get_user_cache()
+    key = str(verified_user.id)
+    for _ in range(get_settings().max_login_attempts):
+        await UserService.get_response_by_id(db_session, verified_user.id)
+        await UserService.login_user(db_session, verified_user.email, "wrongpassword")
+    assert await cache.get(key) is None, "locking the account should invalidate"
+
+    await UserService.get_response_by_id(db_session, verified_user.id)
+    assert await UserService.unlock_user_account(db_session, verified_user.id)
+    assert await cache.get(key) is None
+
+    await UserService.get_response_by_id(db_session, verified_user.id)
+    assert await UserService.reset_password(db_session, verified_user.id, "NewPassword123!")
+    assert await cache.get(key) is None
+
+SEARCH_START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+@pytest.fixture
+async def search_users(db_session):
+    """Six users with distinct roles, states and creation times, one hour apart in list order."""
+    specs = [
+        ("alice", "alice@example.com", UserRole.ADMIN, dict()),
+        ("bob", "bob@example.com", UserRole.AUTHENTICATED, dict(email_verified=False)),
+        ("carol", "carol@example.com", UserRole.AUTHENTICATED, dict(is_locked=True)),
+        ("dave", "dave@example.com", UserRole.MANAGER, dict(is_professional=True)),
+        ("zed", "Al_X@example.com", UserRole.AUTHENTICATED, dict()),
+        ("eve", "eve@example.com", UserRole.AUTHENTICATED, dict(is_professional=True)),
+    ]
+    rows = [
+        dict(dict(id=uuid4(), nickname=nickname, email=email, role=role, hashed_password="x",
+                  email_verified=True, is_locked=False, is_professional=False,
+                  created_at=SEARCH_START + timedelta(hours=index)), **overrides)
+        for index, (nickname, email, role, overrides) in enumerate(specs)
+    ]
+    await db_session.execute(insert(User), rows)
+    await db_session.commit()
+
+async def search_nicknames(session, **criteria):
+    users = await UserService.list_users(session, 0, 10, columns=USER_RESPONSE_COLUMNS, search=UserSearch(**criteria))
+    return [user.nickname for user in users]
+
+# Test each listing filter, and filters combined
+async def test_list_users_search_filters(db_session, search_users):
+    assert await search_nicknames(db_session) == ["alice", "bob", "carol", "dave", "zed", "eve"]
+    assert await search_nicknames(db_session, role="AUTHENTICATED") == ["bob", "carol", "zed", "eve"]
+    assert await search_nicknames(db_session, email_verified=False) == ["bob"]
+    assert await search_nicknames(db_session, is_locked=True) == ["carol"]
+    assert await search_nicknames(db_session, is_professional=True) == ["dave", "eve"]
+    assert await search_nicknames(db_session, is_professional=True, role="MANAGER") == ["dave"]
+    assert await search_nicknames(db_session, created_after=SEARCH_START + timedelta(hours=1),
+                                  created_before=SEARCH_START + timedelta(hours=3)) == ["bob", "carol"]
+
+# Test prefixes match case-insensitively and treat LIKE wildcards literally
+async def test_list_users_search_prefixes(db_session, search_users):
+    assert await search_nicknames(db_session, email_prefix="AL") == ["alice", "zed"]
+    assert await search_nicknames(db_session, email_prefix="al_") == ["zed"]
+    assert await search_nicknames(db_session, nickname_prefix="%") == []
+    assert await search_nicknames(db_session, nickname_prefix="Ca") == ["carol"]
+
+# Test the sort keys in both directions, and the filtered count
+async def test_list_users_search_sort_and_count(db_session, search_users):
+    assert await search_nicknames(db_session, sort="nickname") == ["alice", "bob", "carol", "dave", "eve", "zed"]
+    assert await search_nicknames(db_session, sort="-email", role="AUTHENTICATED") == ["eve", "carol", "bob", "zed"]
+    assert await search_nicknames(db_session, sort="-created_at", is_locked=False) == ["eve", "zed", "dave", "bob", "alice"]
+    assert await UserService.count_with_strategy(db_session, "estimated", UserSearch(role="AUTHENTICATED")) == (4, "exact")
+
+# Test keyset pages follow a descending sort key both ways and reject cursors from another sort
+async def test_list_users_keyset_with_sort(db_session, search_users):
+    search = UserSearch(sort="-nickname")
+    users, has_next, has_prev = await UserService.list_users_keyset(db_session, 4, columns=USER_RESPONSE_COLUMNS, search=search)
+    assert [user.nickname for user in users] == ["zed", "eve", "dave", "carol"]
+    assert has_next and not has_prev
+    cursor = PageCursor.decode(PageCursor(direction="next", sort="-nickname", value=users[-1].nickname, id=users[-1].id).encode())
+    users, has_next, has_prev = await UserService.list_users_keyset(db_session, 4, cursor, columns=USER_RESPONSE_COLUMNS, search=search)
+    assert [user.nickname for user in users] == ["bob", "alice"]
+    assert has_prev and not has_next
+    cursor = PageCursor(direction="prev", sort="-nickname", value=users[0].nickname, id=users[0].id)
+    users, _, _ = await UserService.list_users_keyset(db_session, 2, cursor, columns=USER_RESPONSE_COLUMNS, search=search)
+    assert [user.nickname for user in users] == ["dave", "carol"]
+    with pytest.raises(ValueError):
+        await UserService.list_users_keyset(db_session, 2, cursor, search=UserSearch(sort="email"))
+
+@pytest.fixture
+async def profiles(db_session):
+    """Profiles whose names and bios overlap, so ranking and fuzzy matching can be checked."""
+    specs = [
+        ("gardenfan", "Rosa", "Green", "Keeps bees and grows tomatoes."),
+        ("beekeeper", "Tom", "Hive", "Writes about gardens and honey."),
+        ("coder42", "Ada", "Lovelace", "Python developer who admires Rosa."),
+        ("nightowl", "Greta", "Stone", "Python and Rust developer, gardens at night."),
+    ]
+    rows = [
+        dict(id=uuid4(), nickname=nickname, email=f"{nickname}@example.com", first_name=first, last_name=last,
+             bio=bio, role=UserRole.AUTHENTICATED, hashed_password="x", email_verified=True)
+        for nickname, first, last, bio in specs
+    ]
+    await db_session.execute(insert(User), rows)
+    await db_session.commit()
+
+async def search(session, terms, limit=10, cursor=None):
+    rows, has_next = await UserService.search_profiles(session, terms, limit, cursor)
+    return [row.nickname for row in rows], has_next
+
+# Test full-text matches over names and bio, ranked with name matches first
+async def test_search_profiles_ranks_matches(db_session, profiles):
+    nicknames, has_next = await search(db_session, "python")
+    assert set(nicknames) == {"coder42", "nightowl"} and not has_next
+    assert await search(db_session, "rosa") == (["gardenfan", "coder42"], False)
+    nicknames, _ = await search(db_session, "gardens")
+    assert set(nicknames) == {"beekeeper", "nightowl"}
+    assert await search(db_session, "   ") == ([], False)
+    assert await search(db_session, "unicorn") == ([], False)
+
+# Test the search document follows profile updates through the trigger
+async def test_search_profiles_sees_updates(db_session, profiles):
+    user = await UserService.get_by_nickname(db_session, "coder42")
+    await UserService.update(db_session, user.id, {"bio": "Mathematician and poet."})
+    assert "coder42" in (await search(db_session, "poet"))[0]
+    assert "coder42" not in (await search(db_session, "python"))[0]
+
+# Test keyset pages over the ranked results cover every match once
+async def test_search_profiles_pagination(db_session, profiles):
+    everything, _ = await search(db_session, "python gardens OR green OR honey OR night", limit=10)
+    seen, cursor, has_next = [], None, True
+    while has_next:
+        rows, has_next = await UserService.search_profiles(db_session, "python gardens OR green OR honey OR night", 1, cursor)
+        seen.extend(row.nickname for row in rows)
+        if rows:
+            cursor = PageCursor(sort="rank", value=rows[-1].rank, id=rows[-1].id)
+    assert seen == everything and len(everything) >= 3
+    with pytest.raises(ValueError):
+        await UserService.search_profiles(db_session, "python", 1, PageCursor(sort="email", value="x", id=uuid4()))
+
+# Test misspelt nicknames are found by trigram similarity, or by prefix without pg_trgm
+async def test_search_profiles_fuzzy_nickname(db_session, profiles):
+    if await UserService._has_trigram(db_session):
+        assert "beekeeper" in (await search(db_session, "bekeeper"))[0]
+    assert "nightowl" in (await search(db_session, "nightow"))[0]
+
+# Test the LIKE-based fallback used on databases without full-text search
+async def test_search_profiles_like_fallback(db_session, profiles, monkeypatch):
+    async def like_match(session, terms):
+        return UserService._like_profile_match(terms)
+    monkeypatch.setattr(UserService, "_profile_match", like_match)
+    assert set((await search(db_session, "python"))[0]) == {"coder42", "nightowl"}
+    assert (await search(db_session, "GARDEN"))[0][0] == "gardenfan"
+    assert (await search(db_session, "100%"))[0] == []
+
+# Test a sparse fieldset selects only its columns, plus id for links and cursors
+@pytest.mark.parametrize("fields, expected", [
+    (None, [column.key for column in USER_RESPONSE_COLUMNS]),
+    (("nickname", "email"), ["email", "nickname", "id"]),
+    (("links",), ["id"]),
+    (("id", "role"), ["id", "role"]),
+])
+def test_response_columns(fields, expected):
+    assert [column.key for column in UserService.response_columns(fields)] == expected
+
+# Test a sparse read of a single user selects only the requested columns and bypasses the cache
+async def test_get_response_by_id_with_fields(db_session, user, query_counter):
+    query_counter.clear()
+    row = await UserService.get_response_by_id(db_session, user.id, fields=("nickname",))
+    assert row == {"nickname": user.nickname, "id": user.id}
+    select_statement = next(s for s in query_counter if s.startswith("SELECT"))
+    assert "users.bio" not in select_statement and "users.email" not in select_statement
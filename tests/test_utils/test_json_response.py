@@ -0,0 +1,37 @@
+from builtins import dict
+import json
+import uuid
+
+import pytest
+
+from app.models.user_model import UserRole
+from app.schemas.user_schemas import USER_RESPONSE_ADAPTER, UserResponse
+from app.utils.json_response import FastJSONResponse
+
+@pytest.fixture
+def user_data():
+    return {
+        "id": uuid.uuid4(), "email": "fast@example.com", "nickname": "fast_json", "first_name": "Fast",
+        "last_name": None, "bio": None, "preferred_language": None, "profile_picture_url": None,
+        "linkedin_profile_url": "https://linkedin.com/in/fast", "github_profile_url": None,
+        "role": UserRole.MANAGER, "is_professional": True,
+        "links": [{"rel": "self", "href": "http://testserver/users/1", "action": "view", "type": "application/json"}],
+    }
+
+def expected(user_data):
+    return json.loads(UserResponse.model_validate(user_data).model_dump_json())
+
+def test_fast_json_response_matches_model_serialization(user_data):
+    response = FastJSONResponse(user_data, adapter=USER_RESPONSE_ADAPTER, status_code=201)
+    assert response.status_code == 201
+    assert response.headers["content-type"] == "application/json"
+    assert json.loads(response.body) == expected(user_data)
+
+def test_fast_json_response_without_orjson_uses_adapter(user_data, monkeypatch):
+    monkeypatch.setattr("app.utils.json_response.orjson", None)
+    assert json.loads(FastJSONResponse(user_data, adapter=USER_RESPONSE_ADAPTER).body) == expected(user_data)
+    plain = FastJSONResponse(dict(user_data, role=user_data["role"].value))
+    assert json.loads(plain.body) == expected(user_data)
+
+def test_fast_json_response_passes_bytes_through():
+    assert FastJSONResponse(b'{"already":"encoded"}').body == b'{"already":"encoded"}'
@@ -0,0 +1,14 @@
+from builtins import len, range
+import re
+from app.utils.nickname_gen import ADJECTIVES, ANIMALS, generate_nickname, nickname_space_size
+
+def test_generate_nickname_is_url_safe():
+    for _ in range(100):
+        assert re.match(r'^[\w-]+$', generate_nickname())
+
+def test_generate_nickname_respects_number_max():
+    assert generate_nickname(number_max=0).endswith("_0")
+
+def test_nickname_space_size():
+    assert nickname_space_size(9) == len(ADJECTIVES) * len(ANIMALS) * 10
+    assert nickname_space_size() >= 100 * 25000
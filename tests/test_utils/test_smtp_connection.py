@@ -0,0 +1,97 @@
+from builtins import OSError, all, isinstance, len, list, range
+from concurrent.futures import ThreadPoolExecutor
+from app.utils.smtp_connection import SMTPClient, SMTPConnectionPool
+
+def make_client(server, **kwargs):
+    pool = SMTPConnectionPool("127.0.0.1", server.port, "user", "password", use_tls=False, **kwargs)
+    return SMTPClient("127.0.0.1", server.port, "user", "password", use_tls=False, pool=pool)
+
+def test_unpooled_client_connects_per_message(fake_smtp_server):
+    client = SMTPClient("127.0.0.1", fake_smtp_server.port, "user", "password", use_tls=False)
+    for i in range(3):
+        client.send_email("Hi", "<p>hello</p>", f"user{i}@example.com")
+    assert fake_smtp_server.connections == 3
+    assert fake_smtp_server.logins == 3
+
+def test_pooled_client_reuses_one_session(fake_smtp_server):
+    client = make_client(fake_smtp_server)
+    for i in range(5):
+        client.send_email("Hi", "<p>hello</p>", f"user{i}@example.com")
+    client.pool.close()
+    assert len(fake_smtp_server.messages) == 5
+    assert fake_smtp_server.connections == 1
+    assert fake_smtp_server.logins == 1
+    assert client.pool.stats["reused"] == 4
+
+def test_send_emails_sends_a_batch_over_one_session(fake_smtp_server):
+    client = make_client(fake_smtp_server)
+    errors = client.send_emails([("Hi", "<p>hello</p>", f"user{i}@example.com") for i in range(10)])
+    client.pool.close()
+    assert errors == [None] * 10
+    assert len(fake_smtp_server.messages) == 10
+    assert fake_smtp_server.connections == 1
+
+def test_session_recycled_after_max_messages(fake_smtp_server):
+    client = make_client(fake_smtp_server, max_messages=3)
+    client.send_emails([("Hi", "<p>hello</p>", f"user{i}@example.com") for i in range(7)])
+    client.pool.close()
+    assert len(fake_smtp_server.messages) == 7
+    assert fake_smtp_server.connections == 3
+    assert client.pool.stats["recycled"] == 2
+
+def test_session_recycled_after_max_age(fake_smtp_server):
+    client = make_client(fake_smtp_server, max_age=0)
+    client.send_email("Hi", "<p>hello</p>", "a@example.com")
+    client.send_email("Hi", "<p>hello</p>", "b@example.com")
+    client.pool.close()
+    assert fake_smtp_server.connections == 2
+
+def test_failed_health_check_replaces_session(fake_smtp_server):
+    client = make_client(fake_smtp_server, noop_after=0)
+    client.send_email("Hi", "<p>hello</p>", "a@example.com")
+    client.send_email("Hi", "<p>hello</p>", "b@example.com")
+    assert fake_smtp_server.connections == 1
+
+    [conn] = client.pool._idle
+    conn.smtp.close()  # the server side is still up; the session is now dead
+    client.send_email("Hi", "<p>hello</p>", "c@example.com")
+    client.pool.close()
+    assert fake_smtp_server.connections == 2
+    assert client.pool.stats["health_check_failures"] == 1
+    assert len(fake_smtp_server.messages) == 3
+
+def test_stale_session_is_retried_on_a_fresh_one(fake_smtp_server):
+    client = make_client(fake_smtp_server)
+    client.send_email("Hi", "<p>hello</p>", "a@example.com")
+    [conn] = client.pool._idle
+    conn.smtp.close()  # not yet due for a NOOP check, so the send itself hits the dead session
+    client.send_email("Hi", "<p>hello</p>", "b@example.com")
+    client.pool.close()
+    assert len(fake_smtp_server.messages) == 2
+    assert fake_smtp_server.connections == 2
+
+def test_pool_size_bounds_open_sessions(fake_smtp_server):
+    client = make_client(fake_smtp_server, size=2)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda i: client.send_email("Hi", "<p>hello</p>", f"user{i}@example.com"), range(40)))
+    client.pool.close()
+    assert len(results) == 40
+    assert len(fake_smtp_server.messages) == 40
+    assert fake_smtp_server.connections <= 2
+
+def test_sessions_use_the_configured_timeout(fake_smtp_server):
+    client = make_client(fake_smtp_server, timeout=2.5)
+    client.send_email("Hi", "<p>hello</p>", "a@example.com")
+    [conn] = client.pool._idle
+    assert conn.smtp.timeout == 2.5
+    client.pool.close()
+
+def test_connect_failure_is_not_retried(fake_smtp_server):
+    client = make_client(fake_smtp_server)
+    fake_smtp_server.stop()
+    opened = []
+    connect = client.pool._open
+    client.pool._open = lambda: opened.append(1) or connect()
+    errors = client.send_emails([("Hi", "<p>hello</p>", f"user{i}@example.com") for i in range(3)])
+    assert len(opened) == 1
+    assert len(errors) == 3 and all(isinstance(error, OSError) for error in errors)
@@ -1,3 +1,5 @@
+from builtins import KeyError, len
+import os
 import pytest
 from app.utils.template_manager import TemplateManager
 
@@ -37,3 +39,39 @@ def test_render_template_injects_context(monkeypatch, template_manager):
     monkeypatch.setattr(template_manager, '_read_template', lambda filename: "Hi {username}" if filename == "message.md" else "")
     result = template_manager.render_template('message', username="ChatGPT")
     assert "Hi ChatGPT" in result
+
+@pytest.fixture
+def temp_templates(tmp_path):
+    (tmp_path / "header.md").write_text("# Header", encoding="utf-8")
+    (tmp_path / "footer.md").write_text("_Footer_", encoding="utf-8")
+    (tmp_path / "welcome.md").write_text("Hello, {name}! [Go]({url})", encoding="utf-8")
+    manager = TemplateManager()
+    manager.templates_dir = tmp_path
+    return manager
+
+def test_render_template_escapes_values(temp_templates):
+    result = temp_templates.render_template('welcome', name="<script>x</script>", url='http://x/?a=1&b="2"')
+    assert "<script>" not in result
+    assert "&lt;script&gt;x&lt;/script&gt;" in result
+    assert 'href="http://x/?a=1&amp;b=&quot;2&quot;"' in result
+
+def test_template_compiled_once(monkeypatch, temp_templates):
+    reads = []
+    read_template = temp_templates._read_template
+    monkeypatch.setattr(temp_templates, '_read_template', lambda filename: reads.append(filename) or read_template(filename))
+    first = temp_templates.render_template('welcome', name="Ann", url="u")
+    second = temp_templates.render_template('welcome', name="Bob", url="u")
+    assert len(reads) == 3
+    assert "Hello, Ann!" in first and "Hello, Bob!" in second
+
+def test_template_recompiled_when_file_changes(temp_templates):
+    assert "Hello, Ann!" in temp_templates.render_template('welcome', name="Ann", url="u")
+    path = temp_templates.templates_dir / "welcome.md"
+    path.write_text("Goodbye, {name}!", encoding="utf-8")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert "Goodbye, Ann!" in temp_templates.render_template('welcome', name="Ann", url="u")
+
+def test_render_template_missing_value_raises(temp_templates):
+    with pytest.raises(KeyError):
+        temp_templates.render_template('welcome', name="Ann")
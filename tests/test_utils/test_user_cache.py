@@ -0,0 +1,75 @@
+from builtins import ValueError, dict, len
+import fnmatch
+import pytest
+from app.utils.user_cache import LRUTTLCache, SharedUserCache, create_user_cache
+
+pytestmark = pytest.mark.asyncio
+
+class FakeRedis:
+    """Just enough of redis.asyncio.Redis for SharedUserCache."""
+
+    def __init__(self):
+        self.data = dict()
+        self.expiries = dict()
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+        self.expiries[key] = ex
+
+    async def delete(self, key):
+        self.data.pop(key, None)
+
+    async def scan_iter(self, match="*"):
+        for key in [key for key in self.data if fnmatch.fnmatch(key, match)]:
+            yield key
+
+async def test_lru_cache_hits_and_misses():
+    cache = LRUTTLCache(maxsize=10, ttl=60)
+    assert await cache.get("a") is None
+    await cache.set("a", {"id": "a"})
+    assert await cache.get("a") == {"id": "a"}
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["sets"], stats["size"]) == (1, 1, 1, 1)
+    assert stats["hit_rate"] == 0.5
+
+async def test_lru_cache_evicts_least_recently_used():
+    cache = LRUTTLCache(maxsize=2, ttl=60)
+    await cache.set("a", {"id": "a"})
+    await cache.set("b", {"id": "b"})
+    await cache.get("a")
+    await cache.set("c", {"id": "c"})
+    assert await cache.get("b") is None
+    assert await cache.get("a") is not None
+    assert await cache.get("c") is not None
+
+async def test_lru_cache_entries_expire():
+    cache = LRUTTLCache(maxsize=2, ttl=0)
+    await cache.set("a", {"id": "a"})
+    assert await cache.get("a") is None
+    assert cache.stats()["size"] == 0
+
+async def test_lru_cache_delete_counts_invalidation():
+    cache = LRUTTLCache()
+    await cache.set("a", {"id": "a"})
+    await cache.delete("a")
+    assert await cache.get("a") is None
+    assert cache.stats()["invalidations"] == 1
+
+async def test_shared_cache_round_trips_json():
+    client = FakeRedis()
+    cache = SharedUserCache(client, ttl=30)
+    await cache.set("a", {"id": "a", "role": "ADMIN"})
+    assert client.expiries["user:a"] == 30
+    assert await cache.get("a") == {"id": "a", "role": "ADMIN"}
+    await cache.clear()
+    assert len(client.data) == 0
+    assert cache.stats()["backend"] == "redis"
+
+def test_create_user_cache_backends():
+    assert create_user_cache("none", 10, 60, "") is None
+    assert isinstance(create_user_cache("memory", 10, 60, ""), LRUTTLCache)
+    with pytest.raises(ValueError):
+        create_user_cache("memcached", 10, 60, "")